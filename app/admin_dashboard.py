@@ -6,7 +6,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 from flask_login import login_required
 import logging
 import json
-from translator.config import EVENTS_PATH
+from translator.services.event_store import query_events
+from translator.services.event_rollups import read_rollups
 
 admin_bp = Blueprint("admin_bp", __name__)
 logger = logging.getLogger(__name__)  # add logger
@@ -89,10 +90,13 @@ def admin_dashboard():
         "SHALTNOTKILL_CHANNEL": os.getenv("SHALTNOTKILL_CHANNEL", ""),
     }
     try:
-        with open(EVENTS_PATH, "r", encoding="utf-8") as f:
-            stats_json = json.load(f)
-        messages = stats_json.get("messages", [])
-        stats = compute_stats(messages)
+        # O(1) from the bot's rollups; full scan only before they exist
+        rollups = read_rollups()
+        if rollups is not None:
+            stats = rollups.kpis()
+        else:
+            messages = query_events()
+            stats = compute_stats(messages)
     except (FileNotFoundError, json.JSONDecodeError):
         logger.exception("Failed to compute stats, using default values.")
         stats = {
@@ -4,11 +4,13 @@ from translator.config import DEFAULT_STATS
 from html import escape
 import bleach
 from translator.services.event_logger import EventRecorder
+from translator.services.blob_store import BlobStore
 from typing import Dict, Any
 import logging
 
 admin_stats_bp = Blueprint("admin_stats_bp", __name__)
 event_recorder = EventRecorder()
+blob_store = BlobStore()
 
 def escape_json_strings(obj):
     if isinstance(obj, str):
@@ -33,8 +35,8 @@ def get_safe_events() -> Dict[str, Any]:
 @admin_stats_bp.route("/admin/events", methods=["GET"])
 @login_required
 def admin_stats():
-    stats = get_safe_events()
-    return render_template("admin_events.html", stats=stats, active_page="events")
+    # The table is filled by admin_stats_detail, so don't load the history here
+    return render_template("admin_events.html", stats=DEFAULT_STATS, active_page="events")
 
 @admin_stats_bp.route("/admin/events/detail", methods=["GET"])
 def admin_stats_detail():
@@ -42,10 +44,30 @@ def admin_stats_detail():
     if not current_user.is_authenticated:
         return jsonify({"error": "Unauthorized"}), 401
 
-    stats = get_safe_events()
-    raw = stats.get("messages", [])[-100:]  # Get last 100 events
+    # ?since=<cursor> returns only events committed after a previous response
+    since = request.args.get("since")
+    cursor = since
+    try:
+        if since:
+            raw, cursor = event_recorder.read_since(since)
+        else:
+            raw, cursor = event_recorder.tail(100)  # Get last 100 events
+    except Exception as e:
+        logging.error(f"Failed to load events: {e}")
+        raw = []
     safe = escape_json_strings(raw)
-    return jsonify({"events_last_100": safe})
+    key = "events_new" if since else "events_last_100"
+    return jsonify({key: safe, "cursor": cursor})
+
+@admin_stats_bp.route("/admin/events/body/<digest>", methods=["GET"])
+def event_body(digest):
+    """Message body by hash; the table only loads it when a row is opened."""
+    if not current_user.is_authenticated:
+        return jsonify({"error": "Unauthorized"}), 401
+    text = blob_store.get(digest)
+    if text is None:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify({"hash": digest, "text": escape_json_strings(text)})
 
 @admin_stats_bp.route("/admin/events/edit", methods=["POST"])
 @login_required
@@ -67,9 +89,8 @@ def edit_event():
         else:
             msgs.append(data)
         
-        # Update via EventRecorder
-        event_recorder.stats["messages"] = msgs
-        event_recorder.finalize()  # This will write to disk
+        # Update via EventRecorder (rewrites the log atomically)
+        event_recorder.rewrite(msgs)
         return jsonify({"status": "ok"})
     except Exception as e:
         logging.error(f"Failed to edit event: {e}")
@@ -1,7 +1,10 @@
 import os
-from flask import Blueprint, render_template, request, abort, redirect, url_for, flash
+from flask import Blueprint, render_template, request, abort, redirect, url_for, flash, jsonify
 from flask_login import login_required
 from translator.config import CACHE_DIR
+from translator.utils.tail import read_text_since, tail_text
+
+LOG_TAIL_LINES = 500
 
 admin_logs_bp = Blueprint("admin_logs_bp", __name__)
 
@@ -11,13 +14,25 @@ def show_logs():
     log_path = os.path.join(CACHE_DIR, "bot.log")
     if not os.path.exists(log_path):
         return render_template("admin_logs.html", log_lines=["Log file not found."], active_page="logs")    
+    offset = 0
     try:
-        # Show only the last 500 lines for performance
-        with open(log_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()[-500:]
+        # Show only the last 500 lines; reads from the end of the file
+        lines, offset = tail_text(log_path, LOG_TAIL_LINES)
     except Exception as e:
         lines = [f"Error reading log file: {e}"]
-    return render_template("admin_logs.html", log_lines=lines, active_page="logs")
+    return render_template("admin_logs.html", log_lines=lines, log_offset=offset, active_page="logs")
+
+@admin_logs_bp.route("/admin/logs/tail", methods=["GET"])
+@login_required
+def tail_logs():
+    """Lines appended after ?since=<offset>, for incremental polling."""
+    log_path = os.path.join(CACHE_DIR, "bot.log")
+    since = request.args.get("since", type=int, default=0)
+    try:
+        lines, offset = read_text_since(log_path, since, max_lines=LOG_TAIL_LINES)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"lines": lines, "offset": offset})
 
 @admin_logs_bp.route("/admin/logs/clear", methods=["POST"])
 @login_required
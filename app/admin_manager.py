@@ -9,10 +9,14 @@ from flask_login import login_required
 import bleach
 from anthropic import Anthropic
 from translator.services.event_logger import EventRecorder
+from translator.services.blob_store import message_body
 from translator.config import BOT_TOKEN
 
 admin_manager_bp = Blueprint("admin_manager_bp", __name__)
 
+# Newest events scanned when listing a channel's recent messages
+RECENT_EVENTS_LIMIT = 500
+
 
 def fetch_channel_title(channel_id, bot_token=None):
     """Fetch the Telegram channel's current title via Bot API."""
@@ -373,16 +377,14 @@ def channel_translate():
     def get_recent_messages(channel_id):
         from datetime import datetime
 
-        msgs = [
-            m for m in recorder.stats.get("messages", [])
-            if str(m.get("source_channel_id")) == str(channel_id)
-        ]
+        msgs = recorder.query(
+            source_channel_id=channel_id, newest_first=True, limit=RECENT_EVENTS_LIMIT
+        )
         # Sort by timestamp descending
         msgs = sorted(msgs, key=lambda m: m.get("timestamp", ""), reverse=True)
         
         print(f"\n{'='*20} GET_RECENT_MESSAGES DEBUG {'='*20}")
         print(f"Channel ID: {channel_id}")
-        print(f"Total messages in recorder: {len(recorder.stats.get('messages', []))}")
         print(f"Filtered messages for channel: {len(msgs)}")
         
         # Group messages by message_id and keep the best one (with content and successful posting)
@@ -399,23 +401,26 @@ def channel_translate():
             
             # Find the best entry: prioritize ones with content and successful posting
             best_msg = None
+            best_content = ""
             for m in msg_group:
-                source_content = m.get("source_message", "")
+                source_content = message_body(m, "source_message", recorder.blobs)
                 is_successful = m.get("posting_success", False)
                 
                 print(f"  Entry: content_len={len(source_content)}, success={is_successful}")
                 
                 if not best_msg:
                     best_msg = mbest_msg = m
-                elif len(source_content) > len(best_msg.get("source_message", "")) and is_successful:
+                elif len(source_content) > len(best_content) and is_successful:
                     # Better entry: has more content and is successful
                     best_msg = m
-                elif len(source_content) > 0 and len(best_msg.get("source_message", "")) == 0:
+                elif len(source_content) > 0 and len(best_content) == 0:
                     # Better entry: has content when best doesn't
                     best_msg = m
+                if best_msg is m:
+                    best_content = source_content
             
             if best_msg:
-                html_content = best_msg.get("source_message", "")
+                html_content = best_content
                 
                 print(f"  Selected best entry: content_len={len(html_content)}")
                 if html_content:
@@ -584,11 +589,10 @@ def channel_translate():
                 if resp.status_code == 200 and resp.json().get("ok"):
                     delete_result = "Message deleted successfully."
                     # Remove from event log
-                    recorder.stats["messages"] = [
+                    recorder.rewrite([
                         m for m in recorder.stats["messages"]
                         if str(m.get("message_id")) != str(selected_message_id)
-                    ]
-                    recorder.finalize()
+                    ])
                 else:
                     delete_result = f"Failed to delete message: {resp.text}"
             except Exception as e:
@@ -6,14 +6,13 @@ functions used by *flask_app.py* and by unit tests.
 
 from __future__ import annotations
 
-import json
 import datetime
-import os
 from collections import Counter, defaultdict
 from datetime import timedelta, date, timezone
 from typing import Any, Dict, List
 import logging
-from translator.config import EVENTS_PATH
+from translator.services.event_store import query_events
+from translator.services.event_rollups import EventRollups
 
 logger = logging.getLogger(__name__)
 
@@ -22,21 +21,28 @@ logger = logging.getLogger(__name__)
 ###############################################################################
 
 
-def load_messages() -> List[Dict[str, Any]]:
+def load_messages(since: str | None = None, limit: int | None = None) -> List[Dict[str, Any]]:
     """
-    Load all messages from the events file specified by EVENTS_PATH.
+    Load messages from the configured event store (NDJSON log or SQLite),
+    falling back to the legacy events.json if it has not been migrated yet.
+
+    Args:
+        since: Optional ISO timestamp; only events at or after it are returned.
+        limit: Optional cap; when given, the newest `limit` events are returned.
 
     Returns:
         List of message/event dictionaries.
     Raises:
         FileNotFoundError: If the events file does not exist.
     """
-    if not os.path.exists(EVENTS_PATH):
-        raise FileNotFoundError(f"Events file not found: {EVENTS_PATH}")
-    with open(EVENTS_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    msgs = data.get("messages", [])
-    return msgs
+    if limit is None:
+        return query_events(since=since)
+    return query_events(since=since, limit=limit, newest_first=True)
+
+
+def window_start(days: int) -> str:
+    """ISO date of the first day in a `days`-long window ending today."""
+    return (date.today() - timedelta(days=days - 1)).isoformat()
 
 
 def build_summary(messages: List[Dict[str, Any]], days: int = 10) -> Dict[str, List]:
@@ -219,3 +225,46 @@ def build_throughput_latency(messages):
         if m.get("original_size") is not None and m.get("translation_time") is not None
     ]
     return {"points": scatter}
+
+
+def build_from_rollups(rollups: EventRollups, days: int = 10) -> Dict[str, Any]:
+    """
+    Same charts as build_summary, build_10d_channels and build_hourly_matrix,
+    read from the incrementally maintained rollups in O(days) instead of
+    scanning the messages.
+
+    Args:
+        rollups: Loaded EventRollups.
+        days: Number of days to include.
+
+    Returns:
+        Dict with 'posts_10d', 'posts_10d_channels' and 'posts_matrix'.
+    """
+    today = date.today()
+    labels = [(today - timedelta(days=d)).isoformat() for d in reversed(range(days))]
+    buckets = [rollups.day(label) for label in labels]
+
+    chans = sorted({chan for b in buckets for chan in b["channels"]})
+    series = [
+        {"label": chan, "data": [b["channels"].get(chan, 0) for b in buckets]}
+        for chan in chans
+    ]
+
+    cells = rollups.hours_of_week(labels)
+    xLabels = [f"{h:02d}" for h in range(24)]
+    yLabels = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+    data = [
+        {"x": x, "y": y, "v": cells.get((x, y), 0)}
+        for y in yLabels
+        for x in xLabels
+    ]
+    return {
+        "posts_10d": {"labels": labels, "counts": [b["count"] for b in buckets]},
+        "posts_10d_channels": {"labels": labels, "series": series},
+        "posts_matrix": {
+            "data": data,
+            "xLabels": xLabels,
+            "yLabels": yLabels,
+            "max": max(cells.values(), default=0),
+        },
+    }
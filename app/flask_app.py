@@ -9,20 +9,26 @@ from admin_config import admin_config_bp
 from admin_manager import admin_manager_bp
 from admin_logs import admin_logs_bp
 from aggregator import (
+    build_from_rollups,
     build_summary,
     build_10d_channels,
     build_hourly_matrix,
     build_throughput_latency,
-    load_messages
+    load_messages,
+    window_start,
 )
 from app.admin_events import admin_stats_bp
 from translator.config import PROMPT_TEMPLATE_PATH
+from translator.services.event_rollups import read_rollups
 # make sure project root is on sys.path so 'translator' can be found
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 
+# Max points in the throughput/latency scatter when serving from rollups
+SCATTER_POINTS = 1000
+
 app = Flask(__name__)
 app.config["DEBUG"] = True
 app.secret_key = os.getenv("SECRET_KEY") or "dev_secret_key"  # ensure non-empty default
@@ -85,10 +91,19 @@ bp = Blueprint("metrics", __name__, url_prefix="/api")
 def metrics_summary():
     """Return post counts and KPIs with a flexible time window."""
     try:
-        messages = load_messages()
         # Get the days parameter, default to 10 if not provided
         days = int(request.args.get("days", 10))
         include_test = request.args.get("include_test_channels", "1") not in ("0", "false", "False")
+        # Rollups are not split by test channel, so filtering still scans events
+        rollups = read_rollups() if include_test else None
+        if rollups is not None:
+            payload = build_from_rollups(rollups, days)
+            # The scatter plot needs individual points: only the newest ones
+            recent = load_messages(since=window_start(days), limit=SCATTER_POINTS)
+            payload["throughput_latency"] = build_throughput_latency(recent)
+            return jsonify(payload)
+        # Only the event segments inside the window are read
+        messages = load_messages(since=window_start(days))
         # Filter out test channels if needed
         if not include_test:
             test_ids = set()
@@ -420,6 +420,30 @@ function hideModal(modalId) {
     }, 200);
 }
 
+// Message bodies are stored by hash; fetch them only when an event is opened
+const BODY_HASH_FIELDS = {
+    source_message: 'source_message_hash',
+    translated_message: 'translated_message_hash'
+};
+
+async function loadEventBodies(eventObj) {
+    let loaded = false;
+    for (const [field, hashField] of Object.entries(BODY_HASH_FIELDS)) {
+        const digest = eventObj[hashField];
+        if (eventObj[field] || !digest) continue;
+        try {
+            const response = await fetch(`/admin/events/body/${encodeURIComponent(digest)}`);
+            if (!response.ok) continue;
+            const data = await response.json();
+            eventObj[field] = data.text || '';
+            loaded = true;
+        } catch (error) {
+            console.error(`Failed to load ${field}:`, error);
+        }
+    }
+    return loaded;
+}
+
 function showEditModal(eventObj) {
     if (!eventObj) {
         console.error('No event object provided to showEditModal');
@@ -430,6 +454,9 @@ function showEditModal(eventObj) {
     originalValues = {};  // Reset original values
     showModal('edit-modal');
     updateModalFields('edit-modal', eventObj, false);
+    loadEventBodies(eventObj).then(loaded => {
+        if (loaded && currentEventObj === eventObj) updateModalFields('edit-modal', eventObj, false);
+    });
 
     // Set up the edit modal footer with Save and Cancel buttons
     const modalFooter = document.querySelector('#edit-modal .modal-footer');
@@ -464,6 +491,9 @@ function showDetailsModal(eventObj) {
 
     showModal('details-modal');
     updateModalFields('details-modal', eventObj, true);
+    loadEventBodies(eventObj).then(loaded => {
+        if (loaded) updateModalFields('details-modal', eventObj, true);
+    });
 
     // Set up the details modal footer with only a Close button
     const modalFooter = document.querySelector('#details-modal .modal-footer');
@@ -3,7 +3,7 @@ Bidirectional Pyrogram ⇆ PTB relay bot.
 
 • Pyrogram прослушивает исходные каналы.
 • Для каждого сообщения формирует MetadataRequest и кладёт в очередь.
-• Фоновый ptb_worker снимает запрос, вытаскивает максимум метаданных через Bot API
+• Пул фоновых ptb_worker (PTB_WORKERS) снимает запросы, вытаскивает максимум метаданных через Bot API
   и резолвит future.
 • Pyrogram дожидается future, обогащает сообщение и переводит/пересылает.
 
@@ -24,10 +24,40 @@ import html
 import signal
 import time
 import sqlite3
-from typing import Any, Dict, Tuple
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
 
-from anthropic import Anthropic
-from translator.config import CONFIG, CACHE_DIR
+import httpx
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+from translator.config import (
+    CONFIG,
+    ANTHROPIC_MAX_CONNECTIONS,
+    ANTHROPIC_TIMEOUT,
+    PYRO_WORKERS,
+    PTB_WORKERS,
+    CHAT_CACHE_TTL,
+    CHAT_CACHE_PATH,
+    SOURCE_VERSIONS_PATH,
+    TRANSLATION_STREAMING,
+    RETRY_BUDGET,
+    BREAKER_FAILURES,
+    BREAKER_PROBE_DELAY,
+    BREAKER_PROBE_MAX_DELAY,
+    PARKED_PATH,
+    OUTBOX_PATH,
+    CATCHUP_EMPTY_BATCHES,
+    CATCHUP_LIMIT,
+    PIPELINE_CONCURRENCY,
+    PIPELINE_PER_CHANNEL,
+    PIPELINE_DRAIN_TIMEOUT,
+    CACHE_DIR,
+    EVENTS_PATH,
+    EVENTS_LOG_PATH,
+    EVENTS_RETENTION_DAYS,
+    EVENTS_FLUSH_EVERY,
+    EVENTS_FLUSH_MS,
+    EVENTS_BUFFER_SIZE,
+)
 from translator.models import MetadataRequest
 
 from pyrogram import filters
@@ -37,11 +67,29 @@ from telegram.ext import Application
 
 # === Utility imports ===
 from translator.utils.utils_html import entities_to_html
-from translator.utils.utils_async import run_with_retries
-from translator.utils.translation_utils import translate_html
-from translator.utils.message_utils import get_media_info, build_payload
-from translator.services.telegram_sender import TelegramSender
+from translator.utils.utils_async import run_with_retries, RetryBudget
+from translator.utils.translation_utils import (
+    translate_html,
+    align_paragraphs,
+    retranslate_changed,
+    usage_event_fields,
+    stream_translation,
+    ping,
+)
+from translator.utils.circuit_breaker import CircuitBreaker
+from translator.utils.keyed_executor import KeyedExecutor
+from translator.utils.ttl_cache import AsyncTTLCache
+from translator.utils.message_utils import get_media_info, build_payload, message_fingerprint
+from translator.services.telegram_sender import TelegramSender, checked
 from translator.services.event_logger import EventRecorder
+from translator.services.event_writer import EventWriter
+from translator.services.event_rollups import load_rollups
+from translator.services.event_log import migrate_legacy_events
+from translator.services.event_store import migrate_into_store
+from translator.services.message_map import get_message_map
+from translator.services.source_versions import SourceVersions
+from translator.services.parked_messages import ParkedMessages
+from translator.services.outbox import Outbox, SENT, TRANSLATED
 
 # PTB optional rate limiter
 try:
@@ -104,52 +152,209 @@ except OSError as e:
 ###############################################################################
 # PTB‑worker (метаданные вложений)
 ###############################################################################
-async def ptb_worker(ptb_app: Application, stop_event: asyncio.Event):
+# get_chat results per source chat; the set of chats is fixed and tiny
+chat_cache = AsyncTTLCache(CHAT_CACHE_TTL, CHAT_CACHE_PATH or None)
+
+
+# Fingerprint of the last translated version of every source post
+source_versions = SourceVersions(SOURCE_VERSIONS_PATH)
+
+
+# Opens while Anthropic keeps failing; updates are parked until it recovers
+translation_breaker = CircuitBreaker(
+    BREAKER_FAILURES, BREAKER_PROBE_DELAY, BREAKER_PROBE_MAX_DELAY, name="Anthropic"
+)
+parked_messages = ParkedMessages(PARKED_PATH)
+
+
+# Stage of every accepted update, resumed after a crash
+outbox = Outbox(OUTBOX_PATH)
+
+
+async def _chat_meta(bot, chat_id) -> Dict[str, Any]:
+    """Chat‑level information, served from ``chat_cache`` when fresh."""
+
+    async def load() -> Dict[str, Any]:
+        chat_obj = await bot.get_chat(chat_id)
+        link = f"https://t.me/{chat_obj.username}" if getattr(chat_obj, "username", None) else None
+        return {"chat": chat_obj.to_dict(), "chat_link": link}
+
+    try:
+        return dict(await chat_cache.get_or_load(chat_id, load))
+    except TelegramError as e:
+        ptb_log.warning("get_chat failed for %s: %s", chat_id, e)
+        return {"chat_error": str(e)}
+
+
+async def _file_meta(bot, file_id) -> Dict[str, Any]:
+    """File‑level information (<=20 MB)."""
+    if not file_id:
+        return {}
+    try:
+        file_obj = await bot.get_file(file_id)
+        meta: Dict[str, Any] = {"file": file_obj.to_dict()}
+        if file_obj.file_path:
+            meta["file_download_link"] = (
+                f"https://api.telegram.org/file/bot{bot.token}/{file_obj.file_path}"
+            )
+        return meta
+    except TelegramError as e:
+        err_msg = str(e)
+        if "File is too big" in err_msg:
+            ptb_log.warning("File too big (>20MB) %s", file_id)
+            return {"file_error": "too_big"}
+        ptb_log.warning("Bot API error: %s", err_msg)
+        return {"file_error": err_msg}
+
+
+def _base_meta(req: MetadataRequest) -> Dict[str, Any]:
+    # start meta with every attribute present in req
+    meta: Dict[str, Any] = req.__dict__.copy()
+    # ensure future not leaked to meta
+    meta.pop("response", None)
+    meta.pop("enqueued_at", None)
+    meta["chat"] = None
+    meta["file"] = None
+    return meta
+
+
+def local_metadata(req: MetadataRequest, msg) -> Dict[str, Any]:
+    """
+    Metadata available without a Bot API round trip: the cached get_chat
+    result, or the chat link straight from the Pyrogram message.
+    """
+    meta = _base_meta(req)
+    cached = chat_cache.get(req.chat_id)
+    if cached:
+        meta.update(cached)
+    else:
+        username = getattr(msg.chat, "username", None)
+        meta["chat_link"] = f"https://t.me/{username}" if username else None
+    meta["queue_wait"] = 0.0
+    return meta
+
+
+async def resolve_metadata(response: asyncio.Future, fallback: Dict[str, Any]) -> Dict[str, Any]:
+    """Await a queued MetadataRequest; on failure keep ``fallback``."""
+    try:
+        return await response
+    except Exception as e:
+        pyro_log.warning("!!! PTB worker failed: %s", e)
+        return fallback
+
+
+async def fetch_metadata(bot, req: MetadataRequest) -> Dict[str, Any]:
     """Fetch **all** Bot‑API data we can access: chat info + file info."""
+    meta = _base_meta(req)
+    # Both lookups are independent, so issue them together
+    chat_meta, file_meta = await asyncio.gather(
+        _chat_meta(bot, req.chat_id), _file_meta(bot, req.file_id)
+    )
+    meta.update(chat_meta)
+    meta.update(file_meta)
+    return meta
+
+
+async def ptb_worker(ptb_app: Application, stop_event: asyncio.Event):
+    """Serve MetadataRequests from ``query_queue``; several run side by side."""
     bot = ptb_app.bot
     ptb_log.info("PTB‑worker started")
     while not stop_event.is_set():
         req = await query_queue.get()
-        ptb_log.info("Queue GET %s", req)
-
-        # start meta with every attribute present in req
-        meta: Dict[str, Any] = req.__dict__.copy()
-        # ptb_log.info("Initial meta: %s", meta)
-        # ensure future not leaked to meta
-        meta.pop("response", None)
-        meta["chat"] = None
-        meta["file"] = None
-        # 1 Chat‑level information ---------------------------------------
+        queue_wait = time.monotonic() - getattr(req, "enqueued_at", time.monotonic())
+        ptb_log.info("Queue GET %s (waited %.3fs)", req, queue_wait)
         try:
-            chat_obj = await bot.get_chat(req.chat_id)
-            meta["chat"] = chat_obj.to_dict()
-            if getattr(chat_obj, "username", None):
-                meta["chat_link"] = f"https://t.me/{chat_obj.username}"
-            else:
-                meta["chat_link"] = None
-        except TelegramError as e:
-            ptb_log.warning("get_chat failed for %s: %s", req.chat_id, e)
-            meta["chat_error"] = str(e)
+            meta = await fetch_metadata(bot, req)
+            meta["queue_wait"] = queue_wait
+            if not req.response.done():
+                req.response.set_result(meta)
+        except Exception as e:
+            ptb_log.error("Metadata fetch failed for %s: %s", req.chat_id, e)
+            if not req.response.done():
+                req.response.set_exception(e)
+        finally:
+            query_queue.task_done()
 
-        # 2 File‑level information (<=20 MB) -----------------------------
-        if req.file_id:
-            try:
-                file_obj = await bot.get_file(req.file_id)
-                meta["file"] = file_obj.to_dict()
-                if file_obj.file_path:
-                    meta["file_download_link"] = (
-                        f"https://api.telegram.org/file/bot{bot.token}/{file_obj.file_path}"
-                    )
-            except TelegramError as e:
-                err_msg = str(e)
-                if "File is too big" in err_msg:
-                    ptb_log.warning("File too big (>20MB) %s", req.file_id)
-                    meta["file_error"] = "too_big"
-                else:
-                    ptb_log.warning("Bot API error: %s", err_msg)
-                    meta["file_error"] = err_msg
 
-        req.response.set_result(meta)
+def start_ptb_workers(
+    ptb_app: Application, stop_event: asyncio.Event, count: int = PTB_WORKERS
+) -> list:
+    """Start a pool of ``count`` metadata workers sharing ``query_queue``."""
+    return [
+        asyncio.create_task(ptb_worker(ptb_app, stop_event)) for _ in range(max(1, count))
+    ]
+
+
+###############################################################################
+# Event log maintenance
+###############################################################################
+COMPACTION_INTERVAL = 6 * 60 * 60  # seconds
+
+
+async def event_compaction_worker(store, stop_event: asyncio.Event, blobs=None):
+    """Compact finished daily segments and drop bodies past retention."""
+    while not stop_event.is_set():
+        try:
+            await asyncio.to_thread(store.compact, EVENTS_RETENTION_DAYS)
+            if blobs is not None:
+                await asyncio.to_thread(blobs.prune, EVENTS_RETENTION_DAYS)
+        except Exception as e:
+            logger.error("Event compaction failed: %s", e)
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=COMPACTION_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def breaker_worker(breaker: CircuitBreaker, probe, stop_event: asyncio.Event):
+    """Probe while the circuit is open; closing it drains the parked updates."""
+    while await breaker.wait_open(stop_event):
+        await breaker.recover(probe, stop_event)
+
+
+async def fetch_messages(pyro: Client, chat_id, message_ids: List[int]) -> Dict[int, Any]:
+    """Current versions of ``message_ids`` by id; deleted messages are left out."""
+    found: Dict[int, Any] = {}
+    # get_messages accepts up to 200 ids per call
+    for i in range(0, len(message_ids), 200):
+        for msg in await pyro.get_messages(chat_id, message_ids[i : i + 200]) or []:
+            if msg is not None and not getattr(msg, "empty", False):
+                found[msg.id] = msg
+    return found
+
+
+async def fetch_since(pyro: Client, chat_id, last_id: int) -> List[Any]:
+    """
+    Messages after ``last_id``, oldest first. Bots cannot read chat history,
+    so ids are looked up 200 at a time until ``CATCHUP_EMPTY_BATCHES``
+    batches in a row come back empty; a run of deleted posts is skipped over.
+    """
+    missed: List[Any] = []
+    start = last_id + 1
+    empty = 0
+    while empty < CATCHUP_EMPTY_BATCHES:
+        batch = await fetch_messages(pyro, chat_id, list(range(start, start + 200)))
+        empty = 0 if batch else empty + 1
+        missed.extend(batch[i] for i in sorted(batch))
+        start += 200
+    return missed
+
+
+async def fetch_current(pyro: Client, keys) -> Dict[str, Dict[int, Any]]:
+    """
+    Current versions of ``(chat_id, message_id)`` pairs, by chat. Chats whose
+    lookup failed are left out, so their updates can be tried again later.
+    """
+    wanted: Dict[str, set] = {}
+    for chat_id, message_id in keys:
+        wanted.setdefault(str(chat_id), set()).add(int(message_id))
+    current: Dict[str, Dict[int, Any]] = {}
+    for chat_id, ids in wanted.items():
+        try:
+            current[chat_id] = await fetch_messages(pyro, int(chat_id), sorted(ids))
+        except Exception as e:
+            pyro_log.error("Cannot fetch messages of %s: %s", chat_id, e)
+    return current
 
 
 ###############################################################################
@@ -158,131 +363,253 @@ async def ptb_worker(ptb_app: Application, stop_event: asyncio.Event):
 
 
 def register_handlers(
-    pyro: Client, anthropic: Anthropic, sender: TelegramSender, recorder: EventRecorder
-):
+    pyro: Client,
+    anthropic: AsyncAnthropic,
+    sender: TelegramSender,
+    recorder: EventRecorder,
+    executor: KeyedExecutor | None = None,
+) -> Tuple[KeyedExecutor, Callable[[], Awaitable[None]]]:
+    """
+    Install the Pyrogram handlers. Returns the executor that runs them and
+    ``recover()``, which finishes the previous run's work; live updates are
+    held until it has been awaited.
+    """
     max_size = 20 * 1024 * 1024
+    # Updates of one source channel are processed strictly in arrival order
+    # (an edit never overtakes its post); different channels run in parallel
+    if executor is None:
+        executor = KeyedExecutor(PIPELINE_CONCURRENCY, PIPELINE_PER_CHANNEL)
+    drain_lock = asyncio.Lock()
+    live = asyncio.Event()
+    # Drain retried after a channel could not be fetched, with its backoff
+    drain_retry: asyncio.Task | None = None
+    drain_delay = translation_breaker.probe_delay
 
-    # The following handler matches ALL channel messages, which can cause duplicate handling
-    @pyro.on_message(filters.channel & filters.chat(CONFIG.get_source_channel_ids()))
-    async def handle_message(_: Client, msg):
+    def drain_pending() -> bool:
+        return drain_lock.locked() or (drain_retry is not None and not drain_retry.done())
+
+    async def should_park(msg, drained: bool) -> bool:
+        if drained:
+            return False
+        if translation_breaker.is_open:
+            return True
+        # Nothing may overtake updates of its channel that a drain is about to run
+        return drain_pending() and await asyncio.to_thread(parked_messages.has, msg.chat.id)
+
+    async def park(rec, msg, kind: str, handling_start: float, seq: int | None) -> None:
+        await asyncio.to_thread(parked_messages.park, msg.chat.id, msg.id, kind)
+        # The parked queue owns it from here
+        await asyncio.to_thread(outbox.discard, seq)
+        dest_channel_id = CONFIG.get_destination_id(msg.chat.id)
+        rec.set(
+            event_type="parked",
+            message_id=str(msg.id),
+            dest_channel_id=dest_channel_id,
+            dest_channel_name=CONFIG.get_channel_name(dest_channel_id),
+            # Not a post attempt yet: it is retried once translation is back
+            posting_success=None,
+            translation_time=None,
+            end_to_end_time=time.monotonic() - handling_start,
+        )
+        rec.finalize()
+        pyro_log.warning("==== TRANSLATION UNAVAILABLE, %s %s PARKED ====", kind.upper(), msg.id)
+
+    async def process_message(
+        msg, drained: bool = False, resumed: str | None = None, seq: int | None = None
+    ):
         pyro_log.info("\n\n")
         pyro_log.info("=============================================")
         pyro_log.info("==== BEGIN HANDLING MESSAGE %s ====", msg.id)
         pyro_log.info("=============================================")
+        handling_start = time.monotonic()
+        # Retries all calls for this message may spend together
+        budget = RetryBudget(RETRY_BUDGET)
 
         # === 0. Prepare recorder and extract metadata ===
-        recorder.set(timestamp=datetime.now(timezone.utc).isoformat())
-        recorder.set(source_channel_id=msg.chat.id, source_channel_name=msg.chat.title)
-        recorder.set(event_type="create")
+        # Each update records into its own context, so handlers can overlap
+        rec = recorder.context()
+        rec.set(timestamp=datetime.now(timezone.utc).isoformat())
+        rec.set(source_channel_id=msg.chat.id, source_channel_name=msg.chat.title)
+        rec.set(event_type="create")
         text = msg.text or msg.caption or ""
         file_id, file_size_bytes, media_type = get_media_info(msg, max_size)
 
-        recorder.set(
+        rec.set(
             media_type=media_type,
             file_size_bytes=file_size_bytes,
             original_size=len(text),
         )
+        if await should_park(msg, drained):
+            await park(rec, msg, "new", handling_start, seq)
+            return
         # === 1. Request metadata from PTB ===
         req = MetadataRequest(msg.chat.id, msg.id, file_id)
         raw_entities = msg.entities or msg.caption_entities or []
         req.message_entities = [
             e.to_dict() if hasattr(e, "to_dict") else e for e in raw_entities
         ]
-        try:
+        # Text-only posts need nothing from the Bot API; for media the lookup
+        # runs while we translate and is awaited only before sending
+        meta = local_metadata(req, msg)
+        pending_meta = None
+        if file_id:
             await query_queue.put(req)
-            meta = await req.response
-            file_path = meta.get("file").get("file_path")
-            recorder.set(file_path=file_path)
+            pending_meta = req.response
+        try:
             # Convert entities to HTML
             html_text = entities_to_html(text, msg.entities or msg.caption_entities)
         except Exception as e:
-            pyro_log.warning("!!! PTB worker failed: %s", e)
-            meta = {}
+            pyro_log.warning("!!! Entity conversion failed: %s", e)
             html_text = text
 
         # === 2. Build payload and log original message ===
         payload = build_payload(msg, html_text, meta)
-        recorder.set(
+        rec.set(
             message_id=(getattr(msg, "id", None) or getattr(msg, "message_id", None))
         )
 
         # === 3. Translate message ===
         translation_start = time.monotonic()
-        retry_count = 0
         translation_time = None
         translated = ""
         exception_message = None
         api_error_code = None
 
-        dest_id = CONFIG.get_destination_id(recorder.get("source_channel_id"))
-        recorder.set(dest_channel_id=dest_id)
-        recorder.set(dest_channel_name=CONFIG.get_channel_name(dest_id))
+        dest_id = CONFIG.get_destination_id(rec.get("source_channel_id"))
+        rec.set(dest_channel_id=dest_id)
+        rec.set(dest_channel_name=CONFIG.get_channel_name(dest_id))
         pyro_log.info(
             "Source channel: %s (%s), Dest - id: %s name: %s",
-            recorder.get("source_channel_name"),
-            recorder.get("source_channel_id"),
+            rec.get("source_channel_name"),
+            rec.get("source_channel_id"),
             dest_id,
-            recorder.get("dest_channel_name"),
+            rec.get("dest_channel_name"),
         )
+        # Opt-in: text posts go out while the translation streams in
+        # (no retries or parking once part of the post is published)
+        streamed = TRANSLATION_STREAMING and pending_meta is None and resumed is None
         try:
-            translated = await run_with_retries(translate_html, anthropic, payload)
+            usage: Dict[str, int] = {}
+            if streamed:
+                try:
+                    translated = await sender.publish_stream(
+                        stream_translation(anthropic, payload, usage), rec
+                    )
+                except Exception as exc:
+                    if rec.get("dest_message_id"):
+                        raise
+                    pyro_log.warning("Stream of %s failed before posting: %s", msg.id, exc)
+                # Nothing went out: translate (a finished stream is cached)
+                # and send it like any other post
+                streamed = bool(rec.get("dest_message_id"))
+            if resumed is not None:
+                # Translated before a restart; only posting is left
+                translated = resumed
+            elif not streamed:
+                translated = await translation_breaker.call(
+                    run_with_retries, translate_html, anthropic, payload, usage, budget=budget
+                )
             translation_time = time.monotonic() - translation_start
+            rec.set(**usage_event_fields(usage))
+            if not streamed:
+                await asyncio.to_thread(outbox.translated, seq, translated)
             # pyro_log.info("Translated message: %s", translated)
-            recorder.set(
+            rec.set(
                 source_message=html.escape(html_text),
                 translated_size=len(translated),
                 translated_message=html.escape(translated),
                 translation_time=translation_time,
-                retry_count=retry_count,
             )
-            if (
-                media_type == "photo"
-                and meta.get("file_download_link")
-                and len(translated) < 1024
-            ):
-                pyro_log.info(
-                    "Detected photo message; ready to process photo with file download link."
+            if pending_meta is not None:
+                meta = await resolve_metadata(pending_meta, meta)
+                payload["Meta"] = meta
+                rec.set(
+                    file_path=(meta.get("file") or {}).get("file_path") or "",
+                    metadata_wait_time=meta.get("queue_wait") or 0.0,
                 )
-                await run_with_retries(
-                    sender.send_photo_message, file_id, translated, recorder
-                )
-            else:
-                await run_with_retries(sender.send_message, translated, recorder)
+            # A streamed post is already out
+            if not streamed:
+                if (
+                    media_type == "photo"
+                    and meta.get("file_download_link")
+                    and len(translated) < 1024
+                ):
+                    pyro_log.info(
+                        "Detected photo message; ready to process photo with file download link."
+                    )
+                    await run_with_retries(
+                        checked, sender.send_photo_message, file_id, translated, rec,
+                        budget=budget,
+                    )
+                else:
+                    await run_with_retries(
+                        checked, sender.send_message, translated, rec, budget=budget
+                    )
+            if rec.get("posting_success") is True:
+                # Saved before anything else, so a restart cannot post it again
+                await asyncio.to_thread(outbox.sent, seq, rec.get("dest_message_id"))
             pyro_log.info(
                 "DONE chat:%s msg:%s → destination msg: %s",
                 msg.chat.title,
                 msg.id,
                 dest_id,
             )
+            if rec.get("posting_success") is True:
+                await asyncio.to_thread(
+                    source_versions.remember,
+                    msg.chat.id,
+                    msg.id,
+                    message_fingerprint(text, raw_entities),
+                )
+                pairs = align_paragraphs(payload["Html"], translated)
+                if pairs:
+                    await asyncio.to_thread(
+                        source_versions.remember_paragraphs, msg.chat.id, msg.id, *pairs
+                    )
         except Exception as exc:
             exception_message = str(exc)
-            api_error_code = getattr(exc, "status", None)
-            recorder.set(
+            api_error_code = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+            rec.set(
                 exception_message=exception_message, api_error_code=api_error_code
             )
+            if not translated and not streamed and translation_breaker.is_open:
+                await park(rec, msg, "new", handling_start, seq)
+                return
             pyro_log.error("FAILED %s: %s", msg.id, exc)
-        # === 4. Log event and finalize recorder ===
-        recorder.finalize()
+        # === 4. Log event and finalize recorder context ===
+        if rec.get("posting_success") is True:
+            await asyncio.to_thread(outbox.posted, seq)
+        else:
+            # Failed for good; the event keeps the error
+            await asyncio.to_thread(outbox.discard, seq)
+        rec.set(
+            retry_count=budget.used,
+            end_to_end_time=time.monotonic() - handling_start,
+        )
+        rec.finalize()
         pyro_log.info("=============================================")
         pyro_log.info("==== END HANDLING MESSAGE %s ====", msg.id)
         pyro_log.info("=============================================")
 
-    @pyro.on_edited_message(
-        filters.channel & filters.chat(CONFIG.get_source_channel_ids())
-    )
-    async def handle_edit_message(_: Client, msg):
+    async def process_edit_message(
+        msg, drained: bool = False, resumed: str | None = None, seq: int | None = None
+    ):
         pyro_log.info("\n\n")
         pyro_log.info("=============================================")
         pyro_log.info("==== BEGIN HANDLING EDITED MESSAGE %s ====", msg.id)
         pyro_log.info("=============================================")
+        handling_start = time.monotonic()
+        # Retries all calls for this message may spend together
+        budget = RetryBudget(RETRY_BUDGET)
         # === 0. Prepare recorder and extract metadata ===
-        recorder.set(timestamp=datetime.now(timezone.utc).isoformat())
-        recorder.set(source_channel_id=msg.chat.id, source_channel_name=msg.chat.title)
-        recorder.set(event_type="create")
+        rec = recorder.context()
+        rec.set(timestamp=datetime.now(timezone.utc).isoformat())
+        rec.set(source_channel_id=msg.chat.id, source_channel_name=msg.chat.title)
+        rec.set(event_type="create")
         text = msg.text or msg.caption or ""
         file_id, file_size_bytes, media_type = get_media_info(msg, max_size)
 
-        recorder.set(
+        rec.set(
             media_type=media_type,
             file_size_bytes=file_size_bytes,
             original_size=len(text),
@@ -291,29 +618,48 @@ def register_handlers(
         text = msg.text or msg.caption or ""
         file_id, file_size_bytes, media_type = get_media_info(msg, max_size)
 
-        # === 1. Request metadata from PTB ===TB
+        # === 0.1 Skip edits that leave the text and formatting unchanged ===
+        fingerprint = message_fingerprint(text, msg.entities or msg.caption_entities)
+        if await asyncio.to_thread(source_versions.fingerprint, msg.chat.id, msg.id) == fingerprint:
+            dest_channel_id = CONFIG.get_destination_id(msg.chat.id)
+            rec.set(
+                event_type="edit_skipped",
+                message_id=str(msg.id),
+                dest_channel_id=dest_channel_id,
+                dest_channel_name=CONFIG.get_channel_name(dest_channel_id),
+                # Not a post attempt: keep it out of success rate and latency
+                posting_success=None,
+                translation_time=None,
+                end_to_end_time=time.monotonic() - handling_start,
+            )
+            rec.finalize()
+            await asyncio.to_thread(outbox.discard, seq)
+            pyro_log.info("==== EDIT %s DOES NOT CHANGE THE TEXT, SKIPPED ====", msg.id)
+            return
+        if await should_park(msg, drained):
+            await park(rec, msg, "edit", handling_start, seq)
+            return
+
+        # === 1. Metadata: an edit never needs the Bot API lookups ===
         req = MetadataRequest(msg.chat.id, msg.id, file_id)
         raw_entities = msg.entities or msg.caption_entities or []
         req.message_entities = [
             e.to_dict() if hasattr(e, "to_dict") else e for e in raw_entities
         ]
+        meta = local_metadata(req, msg)
         try:
-            await query_queue.put(req)
-            meta = await req.response
             html_text = entities_to_html(text, msg.entities or msg.caption_entities)
         except Exception as e:
-            pyro_log.warning("!!! PTB worker failed: %s", e)
-            meta = {}
+            pyro_log.warning("!!! Entity conversion failed: %s", e)
             html_text = text
 
         # === 2. Build payload and log original message ===
         payload = build_payload(msg, html_text, meta)
-        recorder.set(
+        rec.set(
             message_id=(getattr(msg, "id", None) or getattr(msg, "message_id", None))
         )
         # === 3. Translate message ===
         translation_start = time.monotonic()
-        retry_count = 0
         translation_time = None
         translated = ""
         exception_message = None
@@ -325,7 +671,7 @@ def register_handlers(
             message_id: str = str(msg.id)  # Convert message ID to string
             
             # Record source info first
-            recorder.set(
+            rec.set(
                 source_channel_id=source_channel_id,
                 message_id=message_id
             )
@@ -340,7 +686,7 @@ def register_handlers(
 
             # Get destination channel info
             dest_channel_id = CONFIG.get_destination_id(source_channel_id)
-            recorder.set(
+            rec.set(
                 dest_channel_id=dest_channel_id,
                 dest_channel_name=CONFIG.get_channel_name(dest_channel_id)
             )
@@ -349,18 +695,44 @@ def register_handlers(
                 "Source channel: %s (%s), Dest channel: %s (%s), Dest msg: %s",
                 msg.chat.title,
                 source_channel_id,
-                recorder.get("dest_channel_name"),
+                rec.get("dest_channel_name"),
                 dest_channel_id,
                 dest_id
             )
 
             pyro_log.info("Translating edited message %s → %s...", msg.id, dest_id)
-            translated = await run_with_retries(translate_html, anthropic, payload)
+            # Reuse the translations of paragraphs the edit did not touch
+            pairs = None
+            usage: Dict[str, int] = {}
+            previous = None
+            if resumed is not None:
+                # Translated before a restart; only the edit is left
+                translated = resumed
+                pairs = align_paragraphs(payload["Html"], translated) or ()
+            else:
+                previous = await asyncio.to_thread(
+                    source_versions.paragraphs, source_channel_id, message_id
+                )
+            if previous:
+                incremental = await translation_breaker.call(
+                    run_with_retries, retranslate_changed, anthropic, payload, *previous, usage,
+                    budget=budget,
+                )
+                if incremental:
+                    translated, *pairs = incremental
+            if pairs is None:
+                translated = await translation_breaker.call(
+                    run_with_retries, translate_html, anthropic, payload, usage, budget=budget
+                )
+                pairs = align_paragraphs(payload["Html"], translated)
+            rec.set(**usage_event_fields(usage))
+            await asyncio.to_thread(outbox.translated, seq, translated)
             pyro_log.info("Translated.")
 
             # Now edit the message in the dest channel
             await run_with_retries(
-                sender.edit_message, dest_channel_id, dest_id, translated, recorder
+                checked, sender.edit_message, dest_channel_id, dest_id, translated, rec,
+                budget=budget,
             )
             pyro_log.info(
                 "EDIT DONE chat:%s msg:%s → destination msg: %s",
@@ -368,17 +740,190 @@ def register_handlers(
                 msg.id,
                 dest_id,
             )
+            if rec.get("posting_success") is True:
+                await asyncio.to_thread(source_versions.remember, msg.chat.id, msg.id, fingerprint)
+                if pairs:
+                    await asyncio.to_thread(
+                        source_versions.remember_paragraphs, msg.chat.id, msg.id, *pairs
+                    )
         except Exception as exc:
-            pyro_log.error("FAILED TO EDIT %s: %s", msg.id, exc)
-            recorder.set(
+            exception_message = str(exc)
+            api_error_code = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+            rec.set(
                 exception_message=exception_message, api_error_code=api_error_code
             )
+            if not translated and translation_breaker.is_open:
+                await park(rec, msg, "edit", handling_start, seq)
+                return
+            pyro_log.error("FAILED TO EDIT %s: %s", msg.id, exc)
 
-        recorder.finalize()
+        if rec.get("posting_success") is True:
+            await asyncio.to_thread(outbox.posted, seq)
+        else:
+            await asyncio.to_thread(outbox.discard, seq)
+        rec.set(
+            retry_count=budget.used,
+            end_to_end_time=time.monotonic() - handling_start,
+        )
+        rec.finalize()
         pyro_log.info("=============================================")
         pyro_log.info("==== END HANDLING EDITED MESSAGE %s ======", msg.id)
         pyro_log.info("=============================================")
 
+    processors = {"new": process_message, "edit": process_edit_message}
+
+    async def run_parked(seq: int, kind: str, msg) -> None:
+        await processors[kind](msg, True)
+        # Parked again meanwhile? Then it is a new row with another seq
+        await asyncio.to_thread(parked_messages.remove, seq)
+
+    async def drain_parked() -> None:
+        """Re-run parked updates, per channel in parking order, while the circuit is closed."""
+        nonlocal drain_delay
+        failed = set()
+        async with drain_lock:
+            while not translation_breaker.is_open:
+                rows = await asyncio.to_thread(parked_messages.pending)
+                rows = [r for r in rows if r[1] not in failed]
+                if not rows:
+                    break
+                pyro_log.info("Draining %d parked updates", len(rows))
+                current = await fetch_current(pyro, [(r[1], r[2]) for r in rows])
+                jobs = []
+                for seq, chat_id, message_id, kind in rows:
+                    if chat_id not in current:
+                        # Left parked for the retry
+                        failed.add(chat_id)
+                        continue
+                    msg = current[chat_id].get(int(message_id))
+                    if msg is None:
+                        # Deleted in the meantime
+                        await asyncio.to_thread(parked_messages.remove, seq)
+                        continue
+                    jobs.append(executor.submit(msg.chat.id, run_parked, seq, kind, msg))
+                if not jobs:
+                    break
+                await asyncio.gather(*jobs, return_exceptions=True)
+        if failed:
+            schedule_drain()
+        else:
+            drain_delay = translation_breaker.probe_delay
+
+    def schedule_drain() -> None:
+        nonlocal drain_retry, drain_delay
+        if drain_retry is not None and not drain_retry.done():
+            if drain_retry is not asyncio.current_task():
+                return
+        pyro_log.warning("Parked updates could not be fetched, next drain in %.0fs", drain_delay)
+        drain_retry = asyncio.create_task(retry_drain(drain_delay))
+        drain_delay = min(translation_breaker.max_probe_delay, drain_delay * 2)
+
+    async def retry_drain(delay: float) -> None:
+        await asyncio.sleep(delay)
+        await drain_parked()
+
+    translation_breaker.on_close = drain_parked
+
+    async def resume_outbox() -> None:
+        """Run updates a previous process accepted but did not finish, from their last stage."""
+        rows = await asyncio.to_thread(outbox.incomplete)
+        if not rows:
+            return
+        pyro_log.info("Resuming %d unfinished updates", len(rows))
+        current = await fetch_current(pyro, [(r[1], r[2]) for r in rows if r[4] != SENT])
+        jobs = []
+        for seq, chat_id, message_id, kind, stage, translated, dest_message_id in rows:
+            if stage == SENT:
+                # Went out right before the crash; only its mapping may be missing
+                await asyncio.to_thread(
+                    get_message_map().add, chat_id, message_id, dest_message_id
+                )
+                await asyncio.to_thread(outbox.posted, seq)
+                continue
+            if chat_id not in current:
+                # Kept for the next start
+                continue
+            msg = current[chat_id].get(int(message_id))
+            if msg is None:
+                await asyncio.to_thread(outbox.discard, seq)
+                continue
+            resumed = translated if stage == TRANSLATED else None
+            jobs.append(
+                executor.submit(msg.chat.id, processors[kind], msg, False, resumed, seq)
+            )
+        await asyncio.gather(*jobs, return_exceptions=True)
+
+    async def catch_up() -> None:
+        """Process posts published while the bot was down, per channel in order."""
+        jobs = []
+        for chat_id in CONFIG.get_source_channel_ids():
+            last_id = await asyncio.to_thread(source_versions.last_message_id, chat_id)
+            if last_id is None:
+                # Never seen this channel: start from its next post
+                continue
+            try:
+                missed = await fetch_since(pyro, chat_id, last_id)
+            except Exception as e:
+                pyro_log.error("Catch-up of %s failed: %s", chat_id, e)
+                continue
+            missed = [m for m in missed if not getattr(m, "service", None)]
+            if len(missed) > CATCHUP_LIMIT:
+                pyro_log.warning(
+                    "Catch-up of %s: %d posts missed, only the last %d are translated",
+                    chat_id, len(missed), CATCHUP_LIMIT,
+                )
+                missed = missed[-CATCHUP_LIMIT:]
+            if missed:
+                pyro_log.info("Catch-up of %s: %d missed posts", chat_id, len(missed))
+            for msg in missed:
+                seq = await accept(msg, "new")
+                jobs.append(executor.submit(msg.chat.id, process_message, msg, False, None, seq))
+        await asyncio.gather(*jobs, return_exceptions=True)
+
+    async def recover() -> None:
+        """
+        Resume the outbox, drain parked updates and catch up on missed posts,
+        then let live updates in.
+        """
+        try:
+            await asyncio.to_thread(outbox.prune)
+            await resume_outbox()
+            await drain_parked()
+            await catch_up()
+        except Exception as e:
+            logger.error("Recovery failed: %s", e)
+        finally:
+            live.set()
+
+    async def accept(msg, kind: str) -> int:
+        # Recorded before queueing, so a crash cannot lose it
+        seq = await asyncio.to_thread(outbox.receive, msg.chat.id, msg.id, kind)
+        if kind == "new":
+            await asyncio.to_thread(source_versions.advance, msg.chat.id, msg.id)
+        return seq
+
+    # Handlers only enqueue, so a single Pyrogram worker keeps arrival order
+    # The following handler matches ALL channel messages, which can cause duplicate handling
+    @pyro.on_message(filters.channel & filters.chat(CONFIG.get_source_channel_ids()))
+    async def handle_message(_: Client, msg):
+        await live.wait()
+        last_id = await asyncio.to_thread(source_versions.last_message_id, msg.chat.id)
+        if last_id is not None and msg.id <= last_id:
+            # Already taken in, e.g. by the catch-up
+            return
+        seq = await accept(msg, "new")
+        executor.submit(msg.chat.id, process_message, msg, False, None, seq)
+
+    @pyro.on_edited_message(
+        filters.channel & filters.chat(CONFIG.get_source_channel_ids())
+    )
+    async def handle_edit_message(_: Client, msg):
+        await live.wait()
+        seq = await accept(msg, "edit")
+        executor.submit(msg.chat.id, process_edit_message, msg, False, None, seq)
+
+    return executor, recover
+
 
 ###############################################################################
 # Main                                                                        #
@@ -401,9 +946,27 @@ async def main_async():
                 raise
     # --- end session lock check ---
 
+    # One-shot move of the legacy events.json into the append-only log
+    migrate_legacy_events(EVENTS_PATH, EVENTS_LOG_PATH)
+
     pyro, ptb_app, anthropic, sender, event_recorder = init_clients()
+    migrate_into_store(event_recorder.store)
+    # Load (or rebuild from history) the source → destination index for edits
+    get_message_map()
+    # Dashboard counters, updated after every committed batch
+    event_recorder.rollups = load_rollups(event_recorder.store)
+    # Persist events off the event loop with group commit
+    event_writer = EventWriter(
+        event_recorder.store,
+        max_batch=EVENTS_FLUSH_EVERY,
+        max_delay=EVENTS_FLUSH_MS / 1000,
+        max_buffer=EVENTS_BUFFER_SIZE,
+        on_commit=event_recorder.rollups.update,
+        prepare=event_recorder.externalize,
+    ).start()
+    event_recorder.writer = event_writer
 
-    register_handlers(pyro, anthropic, sender, event_recorder)
+    executor, recover = register_handlers(pyro, anthropic, sender, event_recorder)
     # register_channel_logger(pyro)
 
     await ptb_app.initialize()
@@ -416,27 +979,53 @@ async def main_async():
         except NotImplementedError:
             pass
 
-    asyncio.create_task(ptb_worker(ptb_app, stop_event))
+    start_ptb_workers(ptb_app, stop_event)
+    asyncio.create_task(
+        event_compaction_worker(event_recorder.store, stop_event, event_recorder.blobs)
+    )
+
+    # Open Bot API connections before the first message arrives
+    await sender.warm_up()
 
     await pyro.start()
     pyro_log.info("Pyrogram started — Ctrl-C to exit")
+    # Finish what the last run left (this needs Pyrogram) before going live
+    await recover()
+    asyncio.create_task(
+        breaker_worker(translation_breaker, partial(ping, anthropic), stop_event)
+    )
 
     await stop_event.wait()
 
     pyro_log.info("Shutting down …")
-    await ptb_app.stop()
-    await pyro.stop()
+    try:
+        # ptb_app is only initialize()d; stop() raises unless it was start()ed
+        if ptb_app.running:
+            await ptb_app.stop()
+        await ptb_app.shutdown()
+        await pyro.stop()
+    finally:
+        try:
+            # Let in-flight and queued messages finish before closing the clients
+            if not await executor.join(PIPELINE_DRAIN_TIMEOUT):
+                logger.warning("Shutdown: %d queued messages not processed", executor.queued())
+            await anthropic.close()
+            await sender.close()
+        finally:
+            # Flush-on-shutdown: commit every event still buffered in memory
+            await asyncio.to_thread(event_writer.close)
     logger.info("=== BOT SHUTDOWN COMPLETE ===")
 
 
 def init_clients() -> (
-    Tuple[Client, Application, Anthropic, TelegramSender, EventRecorder]
+    Tuple[Client, Application, AsyncAnthropic, TelegramSender, EventRecorder]
 ):
     pyro = Client(
         "bot",
         api_id=CONFIG.TELEGRAM_API_ID,
         api_hash=CONFIG.TELEGRAM_API_HASH,
         bot_token=CONFIG.TELEGRAM_BOT_TOKEN,
+        workers=PYRO_WORKERS,
     )
     builder = Application.builder().token(CONFIG.TELEGRAM_BOT_TOKEN)
     if AIORateLimiter is not None:
@@ -446,7 +1035,18 @@ def init_clients() -> (
             pass
     ptb_app = builder.build()
     recorder = EventRecorder()
-    anthropic_client = Anthropic(api_key=CONFIG.ANTHROPIC_API_KEY)
+    # One pooled keep-alive client for the whole process, so several
+    # translations can be in flight without blocking the event loop
+    anthropic_client = AsyncAnthropic(
+        api_key=CONFIG.ANTHROPIC_API_KEY,
+        timeout=ANTHROPIC_TIMEOUT,
+        http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=ANTHROPIC_MAX_CONNECTIONS,
+                max_keepalive_connections=ANTHROPIC_MAX_CONNECTIONS,
+            ),
+        ),
+    )
     sender = TelegramSender()
     return pyro, ptb_app, anthropic_client, sender, recorder
 
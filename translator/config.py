@@ -175,6 +175,8 @@ class Config:
     def get_destination_msg_id(self, source_channel_id: int, message_id: str) -> str | None:
         """
         Get the destination message ID for a given source channel and message ID.
+        Served from the in-memory mapping index, so the cost does not depend
+        on the size of the events log.
         
         Args:
             source_channel_id (int): The source channel ID
@@ -185,67 +187,104 @@ class Config:
 
         Raises:
             ValueError: If the input parameters are invalid
-            FileNotFoundError: If events.json cannot be loaded
-            json.JSONDecodeError: If events.json is malformed
         """
-        import json
         import logging
-        from pathlib import Path
-        from .models import MessageEvent
+        from translator.services.message_map import get_message_map
 
         if not isinstance(source_channel_id, int):
             raise ValueError("source_channel_id must be an integer")
         if not message_id:
             raise ValueError("message_id cannot be empty")
 
-        # Convert to strings for comparison since events log stores them as strings
-        source_channel_id_str = str(source_channel_id)
-        message_id_str = str(message_id)
-
-        # Get path to events.json
-        events_path = Path(EVENTS_PATH)
-        if not events_path.exists():
-            logging.warning(f"Events file not found: {events_path}")
-            return None
-
-        try:
-            # Load and parse events.json
-            with open(events_path, "r", encoding="utf-8") as f:
-                events_data = json.load(f)
-                
-            # Search through messages in reverse order (newest first) to get the latest state
-            # This handles cases where a message may have been reposted or edited
-            for event in reversed(events_data.get("messages", [])):
-                if (str(event["source_channel_id"]) == source_channel_id_str and 
-                    str(event["message_id"]) == message_id_str and
-                    event["dest_message_id"] is not None):  # Ensure we have a valid destination ID
-                    # Found a match - return the destination message ID
-                    logging.debug(
-                        f"Found mapping: source channel {source_channel_id}, "
-                        f"message {message_id} -> destination message {event['dest_message_id']}"
-                    )
-                    return str(event["dest_message_id"])
-
-            # No matching event found
+        dest_id = get_message_map().get(source_channel_id, message_id)
+        if dest_id:
             logging.debug(
-                f"No event found mapping source channel {source_channel_id}, "
+                f"Found mapping: source channel {source_channel_id}, "
+                f"message {message_id} -> destination message {dest_id}"
+            )
+        else:
+            logging.debug(
+                f"No mapping for source channel {source_channel_id}, "
                 f"message {message_id} to a destination message"
             )
-            return None
-
-        except json.JSONDecodeError as e:
-            logging.error(f"Failed to parse events.json: {e}")
-            raise
-        except Exception as e:
-            logging.error(f"Error searching events log: {e}")
-            return None
+        return dest_id
 
 # Singleton config
 CONFIG = Config()
 
 # Paths and defaults
 CACHE_DIR = os.path.join(os.path.dirname(__file__), "cache")
-EVENTS_PATH = os.path.join(CACHE_DIR, "events.json")
+EVENTS_PATH = os.path.join(CACHE_DIR, "events.json")  # legacy, migrated to EVENTS_LOG_PATH
+EVENTS_LOG_PATH = os.path.join(CACHE_DIR, "events.ndjson")  # pre-segmentation single log
+EVENTS_DIR = os.path.join(CACHE_DIR, "events")  # daily NDJSON segments
+ROLLUPS_PATH = os.path.join(EVENTS_DIR, "rollups.json")  # dashboard counters
+BLOBS_DIR = os.path.join(CACHE_DIR, "blobs")  # message bodies by content hash
+EVENTS_RETENTION_DAYS = int(os.getenv("EVENTS_RETENTION_DAYS", "90"))  # keep message bodies this long
+EVENTS_DB_PATH = os.path.join(CACHE_DIR, "events.sqlite3")
+EVENT_STORE = os.getenv("EVENT_STORE", "ndjson").lower()  # "ndjson" or "sqlite"
+# Background event writer: group commit every N events or T ms, fsync "batch" or "off"
+EVENTS_FLUSH_EVERY = int(os.getenv("EVENTS_FLUSH_EVERY", "50"))
+EVENTS_FLUSH_MS = int(os.getenv("EVENTS_FLUSH_MS", "500"))
+EVENTS_BUFFER_SIZE = int(os.getenv("EVENTS_BUFFER_SIZE", "10000"))
+EVENTS_FSYNC = os.getenv("EVENTS_FSYNC", "batch").lower()
+# Pyrogram update workers; handlers only enqueue into the pipeline, and a
+# single worker keeps updates of a channel in arrival order
+PYRO_WORKERS = int(os.getenv("PYRO_WORKERS", "1"))
+# Bot API metadata workers (get_chat/get_file lookups) serving query_queue
+PTB_WORKERS = int(os.getenv("PTB_WORKERS", "4"))
+# get_chat cache: lifetime (s) and file kept for warm restarts ("" = memory only)
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "3600"))
+CHAT_CACHE_PATH = os.getenv("CHAT_CACHE_PATH", os.path.join(CACHE_DIR, "chat_cache.json"))
+# Message pipeline: messages processed at once overall and per source channel
+PIPELINE_CONCURRENCY = int(os.getenv("PIPELINE_CONCURRENCY", "8"))
+PIPELINE_PER_CHANNEL = int(os.getenv("PIPELINE_PER_CHANNEL", "1"))
+# Seconds to wait for queued messages on shutdown
+PIPELINE_DRAIN_TIMEOUT = float(os.getenv("PIPELINE_DRAIN_TIMEOUT", "30"))
+# Shared Anthropic HTTP pool: concurrent translations and per-request timeout (s)
+ANTHROPIC_MAX_CONNECTIONS = int(os.getenv("ANTHROPIC_MAX_CONNECTIONS", "10"))
+ANTHROPIC_TIMEOUT = float(os.getenv("ANTHROPIC_TIMEOUT", "60"))
+# Opt-in: post long translations while they stream in, extending the post with
+# editMessageText at most every STREAM_EDIT_INTERVAL seconds
+TRANSLATION_STREAMING = os.getenv("TRANSLATION_STREAMING", "0").lower() in ("1", "true", "yes")
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.5"))
+# Bot API connection pool and per-request timeouts (s)
+TELEGRAM_MAX_CONNECTIONS = int(os.getenv("TELEGRAM_MAX_CONNECTIONS", "20"))
+TELEGRAM_TIMEOUT = float(os.getenv("TELEGRAM_TIMEOUT", "10"))
+TELEGRAM_CONNECT_TIMEOUT = float(os.getenv("TELEGRAM_CONNECT_TIMEOUT", "5"))
+# Finished translations by (model, prompt version, HTML); 0 entries disables it
+TRANSLATION_CACHE_PATH = os.path.join(CACHE_DIR, "translations.sqlite3")
+TRANSLATION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "5000"))
+TRANSLATION_CACHE_TTL_DAYS = float(os.getenv("TRANSLATION_CACHE_TTL_DAYS", "30"))
+# Last translated version of every source message (edit no-op detection)
+SOURCE_VERSIONS_PATH = os.path.join(CACHE_DIR, "sources.sqlite3")
+# Retries of transient failures: attempts per call, backoff base/cap (s), and
+# the retries one message may spend across all its calls
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30"))
+RETRY_BUDGET = int(os.getenv("RETRY_BUDGET", "4"))
+# Translation circuit breaker: consecutive failed messages that open it, and
+# the first/maximum delay (s) between health probes while it is open
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "3"))
+BREAKER_PROBE_DELAY = float(os.getenv("BREAKER_PROBE_DELAY", "10"))
+BREAKER_PROBE_MAX_DELAY = float(os.getenv("BREAKER_PROBE_MAX_DELAY", "300"))
+# Updates held back while the circuit is open
+PARKED_PATH = os.path.join(CACHE_DIR, "parked.sqlite3")
+# Stage (received/translated/posted) of every accepted update, for crash recovery
+OUTBOX_PATH = os.path.join(CACHE_DIR, "outbox.sqlite3")
+# Posts missed while the bot was down are translated on startup, at most this
+# many (the newest) per source channel
+CATCHUP_LIMIT = int(os.getenv("CATCHUP_LIMIT", "100"))
+# Deleted posts leave gaps in the ids; the catch-up only stops after this
+# many consecutive batches of 200 ids come back empty
+CATCHUP_EMPTY_BATCHES = int(os.getenv("CATCHUP_EMPTY_BATCHES", "3"))
+# Bot API pacing: messages per second for the bot, per minute per chat
+# (sends and edits counted separately), and the per-chat burst
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "20"))
+TELEGRAM_EDIT_RATE = float(os.getenv("TELEGRAM_EDIT_RATE", "20"))
+TELEGRAM_CHAT_BURST = float(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+MESSAGE_MAP_PATH = os.path.join(CACHE_DIR, "message_map.tsv")
 STORE_PATH = os.path.join(CACHE_DIR, "channel_cache.json")
 DEFAULT_STATS = {"messages": []}
 MESSAGES_LIMIT = 9
@@ -1,6 +1,7 @@
 from dataclasses import dataclass, field, asdict
 from typing import Optional, List, Dict, Any
 import asyncio
+import time
 
 @dataclass
 class ChannelConfig:
@@ -15,6 +16,8 @@ class MetadataRequest:
     message_id: int
     file_id: Optional[str] = None
     message_entities: Optional[List[Dict[str, Any]]] = None
+    # time.monotonic() at creation, to measure how long it waited in the queue
+    enqueued_at: float = field(default_factory=time.monotonic)
     response: asyncio.Future = field(
         default_factory=lambda: asyncio.get_event_loop().create_future()
     )
@@ -34,6 +37,17 @@ class MessageEvent:
     original_size: int = 0
     translated_size: int = 0
     translation_time: float = 0.0
+    # Seconds the metadata request waited for a free PTB worker
+    metadata_wait_time: float = 0.0
+    # Seconds from picking up the update to recording the event
+    end_to_end_time: float = 0.0
+    # Anthropic token usage; prompt_cache is "hit", "miss", "below_min" (marked
+    # but too short to be cached) or "" (no cache marker sent)
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    prompt_cache: str = ""
     retry_count: int = 0
     posting_success: bool = False
     api_error_code: int = 0
@@ -44,6 +58,9 @@ class MessageEvent:
     new_size: int = 0
     source_message: str = ""
     translated_message: str = ""
+    # Bodies live in the blob store; events written since then only keep the hashes
+    source_message_hash: str = ""
+    translated_message_hash: str = ""
     dest_message_id: str = ""
     file_path: str = ""  
 
@@ -0,0 +1,112 @@
+"""
+Content-addressed store for message bodies.
+
+Source and translated HTML are kept out of the event log: each body is
+stored once under the SHA-256 of its text, zlib-compressed, in
+``<dir>/<first 2 hex chars>/<hash>.z``. Events only carry the hash
+(``source_message_hash`` / ``translated_message_hash``), so re-translations,
+edits and reposts of the same text cost no extra space and loading the
+history never reads the bodies.
+"""
+
+import os
+import re
+import time
+import zlib
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+from translator.config import BLOBS_DIR
+
+logger = logging.getLogger(__name__)
+
+# Event field -> field holding the hash of its blob
+BODY_HASH_FIELDS = {
+    "source_message": "source_message_hash",
+    "translated_message": "translated_message_hash",
+}
+
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def body_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class BlobStore:
+    def __init__(self, directory: str = BLOBS_DIR) -> None:
+        self.directory = directory
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest + ".z")
+
+    def put(self, text: str) -> str:
+        """Store ``text`` (once) and return its hash."""
+        digest = body_hash(text)
+        path = self._path(digest)
+        if os.path.exists(path):
+            # Refresh the mtime so prune() keeps bodies that are still in use
+            os.utime(path)
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(text.encode("utf-8")))
+        os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest: str) -> Optional[str]:
+        """The body stored under ``digest``, or None if unknown (or pruned)."""
+        if not _HASH_RE.match(digest or ""):
+            return None
+        try:
+            with open(self._path(digest), "rb") as f:
+                return zlib.decompress(f.read()).decode("utf-8")
+        except FileNotFoundError:
+            return None
+        except (OSError, zlib.error) as e:
+            logger.error("BlobStore: cannot read %s: %s", digest, e)
+            return None
+
+    def prune(self, older_than_days: int) -> int:
+        """Remove bodies not stored or reused for ``older_than_days``."""
+        if not os.path.isdir(self.directory):
+            return 0
+        cutoff = time.time() - older_than_days * 86400
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        if removed:
+            logger.info("BlobStore: pruned %d bodies older than %d days", removed, older_than_days)
+        return removed
+
+
+def externalize_bodies(evt: Dict[str, Any], blobs: BlobStore) -> Dict[str, Any]:
+    """Move inline bodies of ``evt`` into the blob store, leaving their hashes."""
+    for field, hash_field in BODY_HASH_FIELDS.items():
+        text = evt.get(field)
+        if text:
+            evt[hash_field] = blobs.put(text)
+            evt[field] = ""
+    return evt
+
+
+def message_body(evt: Dict[str, Any], field: str, blobs: Optional[BlobStore] = None) -> str:
+    """Inline body (old events) or the body fetched from the blob store."""
+    text = evt.get(field) or ""
+    digest = evt.get(BODY_HASH_FIELDS[field])
+    if text or not digest:
+        return text
+    return (blobs or BlobStore()).get(digest) or ""
+
+
+def externalize_all(events: Iterable[Dict[str, Any]], blobs: BlobStore) -> list:
+    return [externalize_bodies(dict(evt), blobs) for evt in events]
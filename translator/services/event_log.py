@@ -0,0 +1,231 @@
+"""
+Append-only, line-delimited (NDJSON) event log.
+
+Every event is a single JSON object on its own line. Appending an event is
+one ``O_APPEND`` write, so recording a message costs O(1) regardless of how
+much history is on disk. A crash in the middle of a write can leave a torn
+trailing line; readers ignore it and the next writer truncates it away.
+"""
+
+import os
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from translator.utils.tail import read_since, tail_lines
+
+logger = logging.getLogger(__name__)
+
+
+class EventLog:
+    """A single NDJSON file of message events."""
+
+    def __init__(self, path: str, fsync: bool = True) -> None:
+        self.path = path
+        self.fsync = fsync
+        self._recovered = False
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def recover(self) -> int:
+        """
+        Truncate a partial trailing line left behind by an interrupted write.
+        Returns the number of bytes dropped.
+        """
+        self._recovered = True
+        if not self.exists():
+            return 0
+        with open(self.path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return 0
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return 0
+            # Walk back to the last complete line
+            pos = size
+            block = 4096
+            keep = 0
+            while pos > 0:
+                step = min(block, pos)
+                pos -= step
+                f.seek(pos)
+                chunk = f.read(step)
+                idx = chunk.rfind(b"\n")
+                if idx != -1:
+                    keep = pos + idx + 1
+                    break
+            f.truncate(keep)
+        dropped = size - keep
+        logger.warning("EventLog: dropped %d bytes of partial line from %s", dropped, self.path)
+        return dropped
+
+    def append(self, event: Dict[str, Any]) -> None:
+        """Append one event as a single line."""
+        self.append_many([event])
+
+    def append_many(self, events: Iterable[Dict[str, Any]]) -> None:
+        """Append several events with one write (and at most one fsync)."""
+        data = "".join(
+            json.dumps(evt, ensure_ascii=False) + "\n" for evt in events
+        ).encode("utf-8")
+        if not data:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if not self._recovered:
+            self.recover()
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+            if self.fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def iter_events(self) -> Iterator[Dict[str, Any]]:
+        """Yield events in write order, skipping torn or corrupt lines."""
+        if not self.exists():
+            return
+        with open(self.path, "rb") as f:
+            for lineno, raw in enumerate(f, 1):
+                if not raw.endswith(b"\n"):
+                    logger.warning("EventLog: ignoring partial line %d in %s", lineno, self.path)
+                    break
+                raw = raw.strip()
+                if not raw:
+                    continue
+                try:
+                    yield json.loads(raw)
+                except json.JSONDecodeError as e:
+                    logger.warning("EventLog: skipping corrupt line %d in %s: %s", lineno, self.path, e)
+
+    def read_events(self) -> List[Dict[str, Any]]:
+        return list(self.iter_events())
+
+    def tail(self, n: int) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Last ``n`` events (oldest first) in time proportional to ``n``, and
+        the byte offset after them for ``read_since``.
+        """
+        lines, end = tail_lines(self.path, n)
+        return self._parse(lines), end
+
+    def read_since(self, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Events appended after byte ``offset`` and the new offset."""
+        lines, end = read_since(self.path, offset)
+        return self._parse(lines), end
+
+    def _parse(self, lines: List[bytes]) -> List[Dict[str, Any]]:
+        events = []
+        for raw in lines:
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                events.append(json.loads(raw))
+            except json.JSONDecodeError as e:
+                logger.warning("EventLog: skipping corrupt line in %s: %s", self.path, e)
+        return events
+
+    def query(self, **filters: Any) -> List[Dict[str, Any]]:
+        """Linear-scan equivalent of SqliteEventStore.query (see filter_events)."""
+        return filter_events(self.iter_events(), **filters)
+
+    def rewrite(self, events: Iterable[Dict[str, Any]]) -> None:
+        """Atomically replace the whole log (admin edits only, not the hot path)."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for evt in events:
+                f.write(json.dumps(evt, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._recovered = True
+
+
+def filter_events(
+    events: Iterable[Dict[str, Any]],
+    source_channel_id: Any = None,
+    message_id: Any = None,
+    dest_channel_id: Any = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: Optional[int] = None,
+    newest_first: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Filter events by channel/message ids and an ISO timestamp range
+    (``since`` inclusive, ``until`` exclusive), then apply order and limit.
+    """
+    wanted = {
+        "source_channel_id": source_channel_id,
+        "message_id": message_id,
+        "dest_channel_id": dest_channel_id,
+    }
+    wanted = {k: str(v) for k, v in wanted.items() if v is not None}
+    matched = []
+    for evt in events:
+        if any(str(evt.get(k)) != v for k, v in wanted.items()):
+            continue
+        ts = evt.get("timestamp") or ""
+        if since is not None and ts < since:
+            continue
+        if until is not None and ts >= until:
+            continue
+        matched.append(evt)
+    if newest_first:
+        matched.reverse()
+    if limit is not None:
+        matched = matched[:limit]
+    return matched
+
+
+def load_legacy_events(json_path: str) -> List[Dict[str, Any]]:
+    """Read the messages list from the old single-document events.json."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data.get("messages", [])
+
+
+def load_events(log_path: str, legacy_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Load all events from the NDJSON log. Until the one-shot migration has run,
+    falls back to the legacy events.json document when it is the only file present.
+
+    Raises:
+        FileNotFoundError: If neither file exists.
+        json.JSONDecodeError: If the legacy document is malformed.
+    """
+    log = EventLog(log_path)
+    if log.exists():
+        return log.read_events()
+    if legacy_path and os.path.exists(legacy_path):
+        return load_legacy_events(legacy_path)
+    raise FileNotFoundError(f"Events file not found: {log_path}")
+
+
+def migrate_legacy_events(json_path: str, log_path: str) -> int:
+    """
+    One-shot migration from events.json to the NDJSON log.
+
+    Does nothing if the log already exists or there is no legacy file. On
+    success the legacy file is renamed to ``<name>.migrated`` so it is kept
+    as a backup but never read again. Returns the number of migrated events.
+    """
+    if os.path.exists(log_path) or not os.path.exists(json_path):
+        return 0
+    try:
+        messages = load_legacy_events(json_path)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error("EventLog: cannot migrate %s: %s", json_path, e)
+        return 0
+    EventLog(log_path).rewrite(messages)
+    os.replace(json_path, json_path + ".migrated")
+    logger.info("EventLog: migrated %d events from %s to %s", len(messages), json_path, log_path)
+    return len(messages)
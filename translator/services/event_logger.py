@@ -1,27 +1,35 @@
 import os
 import json
-from typing import Any, Dict,  Tuple
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 import logging
-from translator.config import EVENTS_PATH, DEFAULT_STATS
+from translator.config import (
+    EVENTS_PATH,
+    EVENTS_LOG_PATH,
+    ROLLUPS_PATH,
+    BLOBS_DIR,
+    DEFAULT_STATS,
+)
 
 from translator.models import MessageEvent
+from translator.services.blob_store import BlobStore, externalize_all, externalize_bodies
+from translator.services.event_log import filter_events, load_events
+from translator.services.event_rollups import EventRollups
+from translator.services.event_store import open_event_store
+from translator.services.message_map import record_mapping
 
-class EventRecorder:
-    stats: Dict[str, Any]
+class EventContext:
+    """
+    Recording context for a single message. Each handler invocation gets its
+    own from ``EventRecorder.context()``, so overlapping messages never share
+    a payload; ``finalize()`` commits the event through the recorder.
+    """
     payload: Dict[str, Any]
 
-    def __init__(self) -> None:
-        self._load_base()
+    def __init__(self, recorder: "EventRecorder") -> None:
+        self.recorder = recorder
         self.reset()
 
-    def _load_base(self) -> None:
-        try:
-            with open(EVENTS_PATH, "r", encoding="utf-8") as f:
-                self.stats = json.load(f)
-        except:
-            self.stats = DEFAULT_STATS.copy()
-        self.stats.setdefault("messages", [])
-
     def prefill(self) -> None:
         """
         Fill all fields of payload with default values (0, "", or None as appropriate).
@@ -60,22 +68,132 @@ class EventRecorder:
         return values[0] if len(fields) == 1 else tuple(values)
 
     def finalize(self) -> None:
+        self.recorder.commit(self.payload)
+        # Optionally reset for reuse
+        self.reset()
+
+
+class EventRecorder(EventContext):
+    """
+    Event store access plus a payload of its own for single-threaded callers
+    (the admin app); concurrent handlers should use ``context()``.
+    """
+
+    def __init__(self) -> None:
+        self.store = self._open_store()
+        self.blobs = BlobStore(BLOBS_DIR)
+        # Optional EventWriter; when set, commit() hands events to its
+        # background thread instead of writing on the caller's thread
+        self.writer = None
+        # Optional EventRollups kept up to date with every committed event
+        self.rollups: Optional[EventRollups] = None
+        self._stats: Optional[Dict[str, Any]] = None
+        self._commit_lock = threading.Lock()
+        super().__init__(self)
+
+    @staticmethod
+    def _open_store():
+        """Daily NDJSON segments by default, SQLite when EVENT_STORE=sqlite."""
+        return open_event_store()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Full event history, loaded lazily. Recording an event never needs it;
+        only readers that really want every event pay for the load.
+        """
+        if self._stats is None:
+            self._load_base()
+        return self._stats  # type: ignore[return-value]
+
+    @stats.setter
+    def stats(self, value: Dict[str, Any]) -> None:
+        self._stats = value
+
+    def _load_base(self) -> None:
+        try:
+            if self.store.exists():
+                messages = self.store.read_events()
+            else:
+                messages = load_events(EVENTS_LOG_PATH, legacy_path=EVENTS_PATH)
+        except Exception:
+            messages = []
+        self._stats = {**DEFAULT_STATS, "messages": messages}
+
+    def query(self, **filters: Any) -> List[Dict[str, Any]]:
+        """
+        Filtered read of the history (source_channel_id, message_id,
+        dest_channel_id, since, until, limit, newest_first). Indexed on the
+        SQLite store; over NDJSON only the segments in the time window are read.
+        """
+        if self.store.exists():
+            return self.store.query(**filters)
+        try:
+            events = load_events(EVENTS_LOG_PATH, legacy_path=EVENTS_PATH)
+        except Exception:
+            events = []
+        return filter_events(events, **filters)
+
+    def tail(self, n: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Last ``n`` events (oldest first) without reading the whole history,
+        and a cursor to poll for newer ones with ``read_since``.
+        """
+        if self.store.exists():
+            return self.store.tail(n)
+        return self.query(limit=n, newest_first=True)[::-1], None
+
+    def read_since(self, cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Events committed after ``cursor`` (from ``tail``) and the new cursor."""
+        if not self.store.exists():
+            return [], cursor
+        return self.store.read_since(cursor)
+
+    def context(self) -> "EventContext":
+        """A fresh recording context for one message (safe for concurrent handlers)."""
+        return EventContext(self)
+
+    def commit(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn a finished payload into an event and persist it."""
+        payload = dict(payload)
         # Derive event_type if needed
-        if self.payload["event_type"] is None:
-            self.payload["event_type"] = (
-                "edit" if self.payload["edit_timestamp"] else "create"
+        if payload["event_type"] is None:
+            payload["event_type"] = (
+                "edit" if payload["edit_timestamp"] else "create"
             )
-        # Create MessageEvent and append
-        evt = MessageEvent(**self.payload)
-        self.stats["messages"].append(evt.to_dict())
-
-        # Write stats
-        os.makedirs(os.path.dirname(EVENTS_PATH), exist_ok=True)
-        with open(EVENTS_PATH, "w", encoding="utf-8") as f:
-            json.dump(self.stats, f, ensure_ascii=False, indent=2)
+        # Create MessageEvent and append a single line to today's segment;
+        # the bodies go to the blob store and the event keeps their hashes.
+        # With a writer that happens on its thread (see externalize), so
+        # the handler does no disk I/O
+        evt = MessageEvent(**payload).to_dict()
+        with self._commit_lock:
+            if self.writer is not None:
+                self.writer.submit(evt)
+            else:
+                evt = self.externalize(evt)
+                self.store.append(evt)
+                if self.rollups is not None:
+                    self.rollups.update([evt])
+            record_mapping(evt)
+            if self._stats is not None:
+                self._stats["messages"].append(evt)
         logging.info("Event recorded")
-        # Optionally reset for reuse
-        self.reset()
+        return evt
+
+    def externalize(self, evt: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Copy of ``evt`` with its bodies moved to the blob store; the
+        EventWriter's ``prepare`` hook, so it runs off the event loop.
+        """
+        return externalize_bodies(dict(evt), self.blobs)
+
+    def rewrite(self, messages: List[Dict[str, Any]]) -> None:
+        """Replace the whole history, e.g. after an admin edits an event."""
+        messages = externalize_all(messages, self.blobs)
+        self.store.rewrite(messages)
+        self._stats = {**DEFAULT_STATS, "messages": list(messages)}
+        # Counters cannot be decremented reliably, so recount the new history
+        (self.rollups or EventRollups(ROLLUPS_PATH)).rebuild(messages)
 
     def get_channel_cache(self) -> Dict[str, Any]:
         """Get the channel cache data for looking up source messages"""
@@ -0,0 +1,231 @@
+"""
+Incrementally maintained rollups of the message event history.
+
+The dashboard KPIs (success rate, average latency and size, busiest channel
+pair) and the per-day, per-channel and hour-of-week counts are kept as
+counters. They are updated when events are committed and persisted to a
+small JSON file next to the event log, so ``/admin`` and
+``/api/metrics/summary`` read O(buckets) instead of scanning every event.
+"""
+
+import os
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from translator.config import ROLLUPS_PATH
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_VERSION = 1
+
+
+def _empty() -> Dict[str, Any]:
+    return {
+        "version": ROLLUPS_VERSION,
+        "totals": {
+            "posts": 0,
+            "successes": 0,
+            "errors": 0,
+            "size_sum": 0,
+            "size_count": 0,
+            "latency_sum": 0.0,
+            "latency_count": 0,
+            "latest_timestamp": "",
+        },
+        "pairs": {},
+        "days": {},
+    }
+
+
+def _empty_day() -> Dict[str, Any]:
+    return {"count": 0, "successes": 0, "latency_sum": 0.0, "latency_count": 0,
+            "channels": {}, "hours": {}}
+
+
+def _pair(evt: Dict[str, Any]) -> str:
+    src = evt.get("source_channel_name", "") or evt.get("source_channel", "")
+    dest = evt.get("dest_channel_name", "") or evt.get("dest_channel", "")
+    return f"{src} → {dest}"
+
+
+def _bump(counter: Dict[str, int], key: str) -> None:
+    counter[key] = counter.get(key, 0) + 1
+
+
+class EventRollups:
+    def __init__(self, path: str = ROLLUPS_PATH) -> None:
+        self.path = path
+        self.data = _empty()
+        # (mtime_ns, size) of the file as we last read or wrote it
+        self._stamp: Optional[Tuple[int, int]] = None
+
+    # ------------------------------------------------------------------ write
+
+    def add(self, evt: Dict[str, Any]) -> None:
+        totals = self.data["totals"]
+        success = evt.get("posting_success")
+        if success is not None:
+            totals["posts"] += 1
+        if success is True:
+            totals["successes"] += 1
+        elif success is False:
+            totals["errors"] += 1
+        if evt.get("original_size") is not None:
+            totals["size_sum"] += evt.get("original_size") or 0
+            totals["size_count"] += 1
+        latency = evt.get("translation_time")
+        if latency is not None:
+            totals["latency_sum"] += latency or 0
+            totals["latency_count"] += 1
+        ts = evt.get("timestamp")
+        if ts and ts > totals["latest_timestamp"]:
+            totals["latest_timestamp"] = ts
+        _bump(self.data["pairs"], _pair(evt))
+
+        if not ts:
+            return
+        try:
+            dt = datetime.fromisoformat(ts)
+        except ValueError:
+            logger.warning("EventRollups: skip evt %s, bad timestamp %r", evt.get("message_id"), ts)
+            return
+        day = self.data["days"].setdefault(dt.date().isoformat(), _empty_day())
+        day["count"] += 1
+        if success is True:
+            day["successes"] += 1
+        if latency is not None:
+            day["latency_sum"] += latency or 0
+            day["latency_count"] += 1
+        _bump(day["channels"], evt.get("source_channel_name") or evt.get("source_channel", ""))
+        # The heatmap only counts new posts, like build_hourly_matrix
+        kind = evt.get("event_type") or evt.get("event") or ""
+        if not kind or kind == "create":
+            _bump(day["hours"], dt.strftime("%H"))
+
+    def add_many(self, events: Iterable[Dict[str, Any]]) -> int:
+        n = 0
+        for evt in events:
+            self.add(evt)
+            n += 1
+        return n
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def load(self) -> bool:
+        """Load persisted rollups. Returns False if missing, corrupt or outdated."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("EventRollups: cannot read %s: %s", self.path, e)
+            return False
+        if data.get("version") != ROLLUPS_VERSION:
+            return False
+        self.data = data
+        self._stamp = self._file_stamp()
+        return True
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._stamp = self._file_stamp()
+
+    def update(self, events: List[Dict[str, Any]]) -> None:
+        """Add committed events and persist. Used as the EventWriter commit hook."""
+        if self._stamp is not None and self._file_stamp() != self._stamp:
+            # Rebuilt by another process (admin edit/delete): start from its copy
+            self.load()
+        self.add_many(events)
+        self.save()
+
+    def rebuild(self, events: Iterable[Dict[str, Any]]) -> None:
+        self.data = _empty()
+        n = self.add_many(events)
+        self.save()
+        logger.info("EventRollups: rebuilt from %d events into %s", n, self.path)
+
+    def catch_up(self, store) -> int:
+        """Add events committed after the last persisted one (e.g. before a crash)."""
+        watermark = self.data["totals"]["latest_timestamp"]
+        if not watermark or not store.exists():
+            return 0
+        missed = [e for e in store.query(since=watermark) if (e.get("timestamp") or "") > watermark]
+        if missed:
+            self.add_many(missed)
+            self.save()
+            logger.info("EventRollups: caught up %d events", len(missed))
+        return len(missed)
+
+    # ------------------------------------------------------------------- read
+
+    def kpis(self) -> Dict[str, Any]:
+        """Same keys as admin_dashboard.compute_stats."""
+        t = self.data["totals"]
+        posts = t["posts"]
+        pairs = self.data["pairs"]
+        if pairs and posts:
+            busiest = max(pairs, key=pairs.get)
+            busiest_percent = round(100 * pairs[busiest] / posts)
+        else:
+            busiest, busiest_percent = "-", 0
+        return {
+            "total_posts": posts,
+            "successful_posts": t["successes"],
+            "failed_posts": posts - t["successes"],
+            "error_count": t["errors"],
+            "success_rate": round(100 * t["successes"] / posts, 1) if posts else 0,
+            "avg_latency": round(t["latency_sum"] / t["latency_count"], 2) if t["latency_count"] else 0,
+            "avg_msg_size": round(t["size_sum"] / t["size_count"]) if t["size_count"] else 0,
+            "latest_timestamp": t["latest_timestamp"] or "-",
+            "busiest_pair": busiest,
+            "busiest_pair_percent": busiest_percent,
+        }
+
+    def day(self, label: str) -> Dict[str, Any]:
+        return self.data["days"].get(label) or _empty_day()
+
+    def hours_of_week(self, labels: Iterable[str]) -> Dict[Tuple[str, str], int]:
+        """(hour "HH", weekday "Mon") -> new posts, summed over the given days."""
+        cells: Dict[Tuple[str, str], int] = {}
+        for label in labels:
+            hours = self.day(label)["hours"]
+            if not hours:
+                continue
+            dow = date.fromisoformat(label).strftime("%a")
+            for hour, n in hours.items():
+                cells[(hour, dow)] = cells.get((hour, dow), 0) + n
+        return cells
+
+
+def load_rollups(store, path: str = ROLLUPS_PATH) -> EventRollups:
+    """
+    Rollups for the bot process: the persisted file brought up to date, or a
+    full rebuild from the store when there is no usable file.
+    """
+    rollups = EventRollups(path)
+    if rollups.load():
+        rollups.catch_up(store)
+        return rollups
+    try:
+        rollups.rebuild(store.iter_events() if store.exists() else [])
+    except Exception as e:
+        logger.error("EventRollups: rebuild failed: %s", e)
+    return rollups
+
+
+def read_rollups(path: str = ROLLUPS_PATH) -> Optional[EventRollups]:
+    """Fresh read for the admin app; None when the bot has not written any yet."""
+    rollups = EventRollups(path)
+    return rollups if rollups.load() else None
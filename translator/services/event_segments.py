@@ -0,0 +1,244 @@
+"""
+Daily-segmented NDJSON event store.
+
+Events are appended to ``<dir>/YYYY-MM-DD.ndjson`` by the UTC day of their
+timestamp. ``compact()`` turns finished days into gzip-compressed,
+read-only ``YYYY-MM-DD.ndjson.gz`` segments and, past the retention
+window, drops the message bodies (``.lite.ndjson.gz``) while keeping every
+numeric field. Readers given a ``since``/``until`` window only open the
+segments that overlap it.
+"""
+
+import os
+import re
+import gzip
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from translator.services.event_log import EventLog, filter_events
+
+logger = logging.getLogger(__name__)
+
+# Text fields (and blob references) removed from events older than the retention window
+BODY_FIELDS = (
+    "source_message",
+    "translated_message",
+    "source_message_hash",
+    "translated_message_hash",
+)
+
+ACTIVE_SUFFIX = ".ndjson"
+COMPACT_SUFFIX = ".ndjson.gz"
+LITE_SUFFIX = ".lite.ndjson.gz"
+
+_SEGMENT_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})(\.lite\.ndjson\.gz|\.ndjson\.gz|\.ndjson)$")
+
+
+def event_day(evt: Dict[str, Any]) -> str:
+    """UTC day (YYYY-MM-DD) of an event; undated events go to today."""
+    ts = evt.get("timestamp") or ""
+    try:
+        dt = datetime.fromisoformat(ts)
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(timezone.utc)
+        return dt.date().isoformat()
+    except (TypeError, ValueError):
+        return datetime.now(timezone.utc).date().isoformat()
+
+
+def strip_bodies(evt: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: ("" if k in BODY_FIELDS else v) for k, v in evt.items()}
+
+
+class SegmentedEventLog:
+    def __init__(self, directory: str, fsync: bool = True) -> None:
+        self.directory = directory
+        self.fsync = fsync
+        # Serialises appends with compaction/rewrite of the same segments
+        self._lock = threading.RLock()
+
+    def exists(self) -> bool:
+        return bool(self.segments())
+
+    def _path(self, day: str, suffix: str = ACTIVE_SUFFIX) -> str:
+        return os.path.join(self.directory, day + suffix)
+
+    def segments(self) -> List[Tuple[str, str]]:
+        """All (day, path) pairs in chronological order."""
+        if not os.path.isdir(self.directory):
+            return []
+        found = []
+        for name in os.listdir(self.directory):
+            m = _SEGMENT_RE.match(name)
+            if m:
+                found.append((m.group(1), os.path.join(self.directory, name)))
+        # Within a day, compacted data precedes late events in an active segment
+        found.sort(key=lambda seg: (seg[0], seg[1].endswith(ACTIVE_SUFFIX)))
+        return found
+
+    def segments_between(self, since: Optional[str] = None, until: Optional[str] = None) -> List[Tuple[str, str]]:
+        """Segments overlapping [since, until) (ISO dates or timestamps)."""
+        return [
+            (day, path)
+            for day, path in self.segments()
+            if (since is None or day >= since[:10]) and (until is None or day < until)
+        ]
+
+    def append(self, event: Dict[str, Any]) -> None:
+        self.append_many([event])
+
+    def append_many(self, events: Iterable[Dict[str, Any]]) -> None:
+        by_day: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        for evt in events:
+            by_day.setdefault(event_day(evt), []).append(evt)
+        with self._lock:
+            for day, day_events in by_day.items():
+                # A late event for an already compacted day starts a new active
+                # segment for that day; the next compact() merges the two
+                EventLog(self._path(day), fsync=self.fsync).append_many(day_events)
+
+    @staticmethod
+    def _iter_segment(path: str) -> Iterator[Dict[str, Any]]:
+        if path.endswith(ACTIVE_SUFFIX):
+            yield from EventLog(path).iter_events()
+            return
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def iter_events(self, since: Optional[str] = None, until: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield events from the overlapping segments only, oldest day first."""
+        for _, path in self.segments_between(since, until):
+            yield from self._iter_segment(path)
+
+    def read_events(self) -> List[Dict[str, Any]]:
+        return list(self.iter_events())
+
+    def tail(self, n: int) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Last ``n`` events (oldest first), reading segments newest first and
+        only the end of active ones, plus a cursor for ``read_since``.
+        """
+        segments = self.segments()
+        events: List[Dict[str, Any]] = []
+        cursor = None
+        for day, path in reversed(segments):
+            if len(events) >= n:
+                break
+            need = n - len(events)
+            if path.endswith(ACTIVE_SUFFIX):
+                chunk, end = EventLog(path).tail(need)
+                if cursor is None:
+                    cursor = f"{day}:{end}"
+            else:
+                chunk = list(self._iter_segment(path))[-need:]
+            events[:0] = chunk
+        if cursor is None:
+            # Only compacted data so far: anything active on or after that day is new
+            cursor = f"{segments[-1][0]}:0" if segments else ":0"
+        return events, cursor
+
+    def read_since(self, cursor: str) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Events appended to active segments after ``cursor`` ("<day>:<offset>",
+        as returned by ``tail`` or a previous call) and the new cursor.
+        """
+        day, _, offset = (cursor or ":0").partition(":")
+        events: List[Dict[str, Any]] = []
+        for seg_day, path in self.segments():
+            if seg_day < day or not path.endswith(ACTIVE_SUFFIX):
+                continue
+            start = int(offset or 0) if seg_day == day else 0
+            chunk, end = EventLog(path).read_since(start)
+            events.extend(chunk)
+            cursor = f"{seg_day}:{end}"
+        return events, cursor
+
+    def query(self, since: Optional[str] = None, until: Optional[str] = None, **filters: Any) -> List[Dict[str, Any]]:
+        return filter_events(self.iter_events(since, until), since=since, until=until, **filters)
+
+    def _write_segment(self, day: str, suffix: str, events: List[Dict[str, Any]]) -> str:
+        path = self._path(day, suffix)
+        tmp_path = path + ".tmp"
+        if suffix == ACTIVE_SUFFIX:
+            EventLog(tmp_path).rewrite(events)
+        else:
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                for evt in events:
+                    f.write(json.dumps(evt, ensure_ascii=False) + "\n")
+            os.chmod(tmp_path, 0o444)
+        if os.path.exists(path):
+            os.chmod(path, 0o644)
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        os.chmod(path, 0o644)  # read-only files cannot be removed on Windows
+        os.remove(path)
+
+    def rewrite(self, events: Iterable[Dict[str, Any]]) -> None:
+        """Replace the whole history (admin edits only), keeping segment layout."""
+        with self._lock:
+            self._rewrite(events)
+
+    def _rewrite(self, events: Iterable[Dict[str, Any]]) -> None:
+        old = self.segments()
+        os.makedirs(self.directory, exist_ok=True)
+        by_day: Dict[str, List[Dict[str, Any]]] = {}
+        for evt in events:
+            by_day.setdefault(event_day(evt), []).append(evt)
+        written = {self._write_segment(day, ACTIVE_SUFFIX, evts) for day, evts in by_day.items()}
+        for _, path in old:
+            if path not in written:
+                self._remove(path)
+
+    def compact(self, retention_days: Optional[int] = None, today: Optional[date] = None) -> int:
+        """
+        Compress every finished day into one read-only segment and strip
+        bodies from days older than ``retention_days``. Returns the number of
+        segments written.
+        """
+        with self._lock:
+            return self._compact(retention_days, today)
+
+    def _compact(self, retention_days: Optional[int], today: Optional[date]) -> int:
+        today = today or datetime.now(timezone.utc).date()
+        body_cutoff = (
+            (today - timedelta(days=retention_days)).isoformat()
+            if retention_days is not None
+            else None
+        )
+        by_day: Dict[str, List[str]] = {}
+        for day, path in self.segments():
+            by_day.setdefault(day, []).append(path)
+
+        written = 0
+        for day, paths in by_day.items():
+            if day >= today.isoformat():
+                continue
+            strip = body_cutoff is not None and day < body_cutoff
+            target = LITE_SUFFIX if strip else COMPACT_SUFFIX
+            if len(paths) == 1 and paths[0].endswith(target):
+                continue  # already in its final form
+            if not strip and any(p.endswith(LITE_SUFFIX) for p in paths):
+                target = LITE_SUFFIX  # bodies are already gone for part of the day
+                strip = True
+            events: List[Dict[str, Any]] = []
+            for path in paths:
+                events.extend(self._iter_segment(path))
+            if strip:
+                events = [strip_bodies(evt) for evt in events]
+            new_path = self._write_segment(day, target, events)
+            for path in paths:
+                if path != new_path:
+                    self._remove(path)
+            written += 1
+            logger.info("EventSegments: compacted %s (%d events) into %s", day, len(events), new_path)
+        return written
@@ -0,0 +1,286 @@
+"""
+Event store selection and the optional SQLite backend.
+
+Two backends implement the same small interface (``exists``, ``append``,
+``append_many``, ``iter_events``, ``read_events``, ``query``, ``rewrite``,
+``compact``):
+
+* ``SegmentedEventLog`` – append-only daily NDJSON segments (default)
+* ``SqliteEventStore`` – a WAL-mode SQLite database with indexes on
+  (source_channel_id, message_id), timestamp and dest_channel_id, so the
+  admin read paths can filter and limit without scanning the history.
+
+Set ``EVENT_STORE=sqlite`` to switch the bot and the admin app to SQLite.
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from translator.config import (
+    EVENT_STORE,
+    EVENTS_DB_PATH,
+    EVENTS_DIR,
+    EVENTS_FSYNC,
+    EVENTS_LOG_PATH,
+    EVENTS_PATH,
+)
+from translator.services.event_log import filter_events, load_events
+from translator.services.event_segments import BODY_FIELDS, SegmentedEventLog
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT,
+    event_type TEXT,
+    source_channel_id TEXT,
+    message_id TEXT,
+    dest_channel_id TEXT,
+    dest_message_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_source ON events(source_channel_id, message_id);
+CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events(timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_dest ON events(dest_channel_id);
+"""
+
+
+def _key(value: Any) -> Optional[str]:
+    """Ids are stored as text so ints and strings from old events compare equal."""
+    if value is None or value == "":
+        return None
+    return str(value)
+
+
+class SqliteEventStore:
+    """Message events in an indexed SQLite table (one JSON blob per row)."""
+
+    def __init__(self, path: str, fsync: bool = True) -> None:
+        self.path = path
+        self.fsync = fsync
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # FULL syncs the WAL on every commit; NORMAL only at checkpoints
+            conn.execute(f"PRAGMA synchronous={'FULL' if self.fsync else 'NORMAL'}")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def _row(evt: Dict[str, Any]) -> tuple:
+        return (
+            evt.get("timestamp") or None,
+            evt.get("event_type") or evt.get("event") or None,
+            _key(evt.get("source_channel_id", evt.get("source_channel"))),
+            _key(evt.get("message_id")),
+            _key(evt.get("dest_channel_id", evt.get("dest_channel"))),
+            _key(evt.get("dest_message_id")),
+            json.dumps(evt, ensure_ascii=False),
+        )
+
+    def append(self, event: Dict[str, Any]) -> None:
+        self.append_many([event])
+
+    def append_many(self, events: Iterable[Dict[str, Any]]) -> None:
+        """One transaction; ``events`` may be a generator and is not held in memory."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO events (timestamp, event_type, source_channel_id, message_id,"
+                    " dest_channel_id, dest_message_id, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (self._row(evt) for evt in events),
+                )
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def query(
+        self,
+        source_channel_id: Any = None,
+        message_id: Any = None,
+        dest_channel_id: Any = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: Optional[int] = None,
+        newest_first: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return events matching all given filters, in write order (or newest
+        first). ``since``/``until`` are ISO timestamps, ``since`` inclusive.
+        """
+        clauses, params = [], []
+        for column, value in (
+            ("source_channel_id", source_channel_id),
+            ("message_id", message_id),
+            ("dest_channel_id", dest_channel_id),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(str(value))
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        sql = "SELECT data FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id DESC" if newest_first else " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def iter_events(self) -> Iterator[Dict[str, Any]]:
+        if not self.exists():
+            return iter(())
+        return iter(self.query())
+
+    def read_events(self) -> List[Dict[str, Any]]:
+        return list(self.iter_events())
+
+    def tail(self, n: int) -> Tuple[List[Dict[str, Any]], str]:
+        """Last ``n`` events (oldest first) and the last row id as cursor."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id, data FROM events ORDER BY id DESC LIMIT ?", (int(n),)
+            ).fetchall()
+            if not rows:
+                last = self._connect().execute("SELECT MAX(id) FROM events").fetchone()[0]
+        rows.reverse()
+        cursor = str(rows[-1][0] if rows else last or 0)
+        return [json.loads(data) for _, data in rows], cursor
+
+    def read_since(self, cursor: str) -> Tuple[List[Dict[str, Any]], str]:
+        """Events inserted after row id ``cursor`` and the new cursor."""
+        last = int(cursor or 0)
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id, data FROM events WHERE id > ? ORDER BY id", (last,)
+            ).fetchall()
+        if rows:
+            last = rows[-1][0]
+        return [json.loads(data) for _, data in rows], str(last)
+
+    def compact(self, retention_days: Optional[int] = None, today: Any = None) -> int:
+        """Blank message bodies of events older than ``retention_days``."""
+        if retention_days is None:
+            return 0
+        today = today or datetime.now(timezone.utc).date()
+        cutoff = (today - timedelta(days=retention_days)).isoformat()
+        assignments = ", ".join(f"'$.{field}', ''" for field in BODY_FIELDS)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                cur = conn.execute(
+                    f"UPDATE events SET data = json_set(data, {assignments}) "
+                    "WHERE timestamp < ? AND (" + " OR ".join(
+                        f"json_extract(data, '$.{field}') != ''" for field in BODY_FIELDS
+                    ) + ")",
+                    (cutoff,),
+                )
+        return cur.rowcount
+
+    def rewrite(self, events: Iterable[Dict[str, Any]]) -> None:
+        """Replace all rows in one transaction (admin edits only)."""
+        rows = [self._row(evt) for evt in events]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM events")
+                conn.executemany(
+                    "INSERT INTO events (timestamp, event_type, source_channel_id, message_id,"
+                    " dest_channel_id, dest_message_id, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+
+
+def open_event_store(kind: Optional[str] = None):
+    """Return the configured event store (``EVENT_STORE`` env, default ndjson)."""
+    kind = (kind or EVENT_STORE).lower()
+    fsync = EVENTS_FSYNC != "off"
+    if kind == "sqlite":
+        return SqliteEventStore(EVENTS_DB_PATH, fsync=fsync)
+    return SegmentedEventLog(EVENTS_DIR, fsync=fsync)
+
+
+def query_events(store=None, **filters: Any) -> List[Dict[str, Any]]:
+    """
+    Query the configured store. Before the store has been created (i.e. the
+    bot has not yet migrated), scans the single NDJSON log or legacy events.json.
+
+    Raises:
+        FileNotFoundError: If no event data exists at all.
+    """
+    store = store or open_event_store()
+    if store.exists():
+        return store.query(**filters)
+    return filter_events(load_events(EVENTS_LOG_PATH, legacy_path=EVENTS_PATH), **filters)
+
+
+def migrate_into_store(store) -> int:
+    """
+    Fill an empty store from the history it replaces: the daily segments
+    (compressed and active) when switching to SQLite, otherwise the single
+    NDJSON log (or the legacy events.json). Returns the number of imported
+    events.
+    """
+    if isinstance(store, SqliteEventStore):
+        if store.count():
+            return 0
+        segments = SegmentedEventLog(EVENTS_DIR)
+        if segments.exists():
+            return _import_events(store, segments.iter_events(), segments.directory)
+    elif store.exists():
+        return 0
+    try:
+        events = load_events(EVENTS_LOG_PATH, legacy_path=EVENTS_PATH)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.info("EventStore: nothing to import into %s: %s", store.path, e)
+        return 0
+    return _import_events(store, events, EVENTS_LOG_PATH)
+
+
+def _import_events(store, events: Iterable[Dict[str, Any]], source: str) -> int:
+    imported = 0
+
+    def counted() -> Iterator[Dict[str, Any]]:
+        nonlocal imported
+        for evt in events:
+            imported += 1
+            yield evt
+
+    try:
+        store.append_many(counted())
+    except (OSError, json.JSONDecodeError) as e:
+        # Not fatal: the bot starts with the store as it is
+        logger.error("EventStore: import from %s failed: %s", source, e)
+        return 0
+    logger.info("EventStore: imported %d events from %s into %s", imported, source, store.path)
+    return imported
@@ -0,0 +1,185 @@
+"""
+Background group-commit writer for message events.
+
+``submit()`` only puts the event into a bounded in-memory queue, so the
+message handler never waits for disk I/O; when the disk cannot keep up and
+the buffer is full, the event is dropped and counted in ``overflowed``. A daemon thread drains the queue
+and commits events to the store in groups: as soon as ``max_batch`` events
+are waiting or ``max_delay`` seconds after the first one arrived, whichever
+comes first. Durability of each group follows the store's fsync policy.
+An optional ``prepare`` hook (e.g. moving bodies to the blob store) also
+runs on that thread, just before the group is committed.
+"""
+
+import queue
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class EventWriter:
+    def __init__(
+        self,
+        store: Any,
+        max_batch: int = 50,
+        max_delay: float = 0.5,
+        max_buffer: int = 10000,
+        commit_attempts: int = 3,
+        on_commit: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        prepare: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    ) -> None:
+        self.store = store
+        # Called on each event in the writer thread before it is stored
+        self.prepare = prepare
+        # Called with each committed group, e.g. to update the rollups
+        self.on_commit = on_commit
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.commit_attempts = commit_attempts
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_buffer)
+        self._thread: Optional[threading.Thread] = None
+        self.committed = 0
+        self.batches = 0
+        # Lost after failed commits / rejected by a full buffer
+        self.dropped = 0
+        self.overflowed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "EventWriter":
+        if not self.running:
+            self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, event: Dict[str, Any]) -> None:
+        """
+        Queue an event for the next group commit. Never blocks: with the
+        buffer full, i.e. the disk not keeping up at all, the event is dropped.
+        """
+        if not self.running:
+            # Not started (or already closed): fall back to a direct write
+            event = self._prepare([event])[0]
+            self.store.append(event)
+            self._notify([event])
+            return
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed += 1
+            if self.overflowed == 1 or self.overflowed % 1000 == 0:
+                logger.error("EventWriter: buffer full (%d), %d events dropped so far",
+                             self._queue.maxsize, self.overflowed)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Commit everything submitted so far. Returns False on timeout."""
+        if not self.running:
+            return True
+        # Set by the writer thread once everything queued before it is stored
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Flush-on-shutdown: commit pending events and stop the thread."""
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)  # type: ignore[union-attr]
+        if self.running:
+            logger.error("EventWriter: did not stop within %.1fs, %d events pending",
+                         timeout or 0, self._queue.qsize())
+        else:
+            logger.info("EventWriter: closed after %d events in %d batches",
+                        self.committed, self.batches)
+
+    def _collect(self) -> tuple:
+        """Block for the first item, then gather a group until size or deadline."""
+        batch: List[Dict[str, Any]] = []
+        flushes: List[threading.Event] = []
+        stop = False
+        item = self._queue.get()
+        deadline = time.monotonic() + self.max_delay
+        while True:
+            if item is _STOP:
+                stop = True
+                break
+            if isinstance(item, threading.Event):
+                flushes.append(item)
+                break
+            batch.append(item)
+            if len(batch) >= self.max_batch:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        return batch, flushes, stop
+
+    def _prepare(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.prepare is None:
+            return batch
+        prepared = []
+        for event in batch:
+            try:
+                prepared.append(self.prepare(event))
+            except Exception as e:
+                # Store it as it is rather than lose it
+                logger.error("EventWriter: prepare hook failed: %s", e)
+                prepared.append(event)
+        return prepared
+
+    def _commit(self, batch: List[Dict[str, Any]]) -> None:
+        batch = self._prepare(batch)
+        for attempt in range(1, self.commit_attempts + 1):
+            try:
+                self.store.append_many(batch)
+                self.committed += len(batch)
+                self.batches += 1
+                self._notify(batch)
+                return
+            except Exception as e:
+                logger.error("EventWriter: commit of %d events failed (attempt %d): %s",
+                             len(batch), attempt, e)
+                time.sleep(0.1 * attempt)
+        self.dropped += len(batch)
+        logger.error("EventWriter: dropped %d events after %d attempts", len(batch), self.commit_attempts)
+
+    def _notify(self, batch: List[Dict[str, Any]]) -> None:
+        if self.on_commit is None:
+            return
+        try:
+            self.on_commit(batch)
+        except Exception as e:
+            logger.error("EventWriter: commit hook failed: %s", e)
+
+    def _run(self) -> None:
+        while True:
+            batch, flushes, stop = self._collect()
+            if stop:
+                # Drain whatever was queued before the stop request
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, threading.Event):
+                        flushes.append(item)
+                    elif item is not _STOP:
+                        batch.append(item)
+            if batch:
+                self._commit(batch)
+            for done in flushes:
+                done.set()
+            if stop:
+                return
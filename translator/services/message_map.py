@@ -0,0 +1,169 @@
+"""
+Source → destination message mapping index.
+
+Keeps ``(source_channel_id, source_message_id) -> [dest_message_id, ...]``
+in memory so edit handling can find the translated post in O(1). The index
+is persisted as a compact tab-separated journal (one line per successful
+send) and rebuilt from the event history when the journal is missing.
+"""
+
+import os
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from translator.config import MESSAGE_MAP_PATH
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[str, str]
+
+
+def _mapping_from_event(evt: Dict[str, Any]) -> Optional[Tuple[str, str, str]]:
+    """Extract (source_channel_id, message_id, dest_message_id) from an event."""
+    src = evt.get("source_channel_id", evt.get("source_channel"))
+    msg_id = evt.get("message_id")
+    dest_id = evt.get("dest_message_id")
+    if src in (None, "") or msg_id in (None, "") or dest_id in (None, ""):
+        return None
+    return str(src), str(msg_id), str(dest_id)
+
+
+class MessageMap:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._map: Dict[Key, List[str]] = {}
+        self._offset = 0
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def _remember(self, src: str, msg_id: str, dest_id: str) -> bool:
+        dests = self._map.setdefault((src, msg_id), [])
+        if dests and dests[-1] == dest_id:
+            return False
+        if dest_id in dests:
+            dests.remove(dest_id)
+        dests.append(dest_id)
+        return True
+
+    def load(self) -> bool:
+        """Load the journal from disk. Returns False if there is none."""
+        if not os.path.exists(self.path):
+            return False
+        self._map.clear()
+        self._offset = 0
+        self._read_new_lines()
+        logger.info("MessageMap: loaded %d mappings from %s", len(self._map), self.path)
+        return True
+
+    def _read_new_lines(self) -> None:
+        """Replay journal lines appended since the last read (also by other processes)."""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break  # torn line from an interrupted write
+                    self._offset += len(raw)
+                    parts = raw.decode("utf-8").rstrip("\n").split("\t")
+                    if len(parts) == 3:
+                        self._remember(*parts)
+        except FileNotFoundError:
+            pass
+
+    def rebuild(self, events: Iterable[Dict[str, Any]]) -> None:
+        """Rebuild from event history and rewrite a compacted journal."""
+        self._map.clear()
+        for evt in events:
+            mapping = _mapping_from_event(evt)
+            if mapping:
+                self._remember(*mapping)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for (src, msg_id), dests in self._map.items():
+                for dest_id in dests:
+                    f.write(f"{src}\t{msg_id}\t{dest_id}\n")
+        os.replace(tmp_path, self.path)
+        self._offset = os.path.getsize(self.path)
+        logger.info("MessageMap: rebuilt %d mappings into %s", len(self._map), self.path)
+
+    def add(self, source_channel_id: Any, message_id: Any, dest_message_id: Any) -> None:
+        """Record a successful send in memory and append it to the journal."""
+        src, msg_id, dest_id = str(source_channel_id), str(message_id), str(dest_message_id)
+        self._read_new_lines()
+        if not self._remember(src, msg_id, dest_id):
+            return
+        # The offset is not advanced: re-reading our own line is a no-op and
+        # keeps lines appended concurrently by other processes from being skipped
+        append_line(self.path, f"{src}\t{msg_id}\t{dest_id}\n".encode("utf-8"))
+
+    def get(self, source_channel_id: Any, message_id: Any) -> Optional[str]:
+        """Latest destination message id, or None."""
+        dests = self.get_all(source_channel_id, message_id)
+        return dests[-1] if dests else None
+
+    def get_all(self, source_channel_id: Any, message_id: Any) -> List[str]:
+        key = (str(source_channel_id), str(message_id))
+        if key not in self._map:
+            # Another process (the admin app) may have appended since we loaded
+            self._read_new_lines()
+        return list(self._map.get(key, []))
+
+
+def append_line(path: str, line: bytes) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+_message_map: Optional[MessageMap] = None
+
+
+def get_message_map() -> MessageMap:
+    """Process-wide index, loaded from the journal or rebuilt from history."""
+    global _message_map
+    if _message_map is None:
+        mm = MessageMap(MESSAGE_MAP_PATH)
+        if not mm.load():
+            from translator.services.event_store import query_events
+
+            try:
+                mm.rebuild(query_events())
+            except FileNotFoundError:
+                mm.rebuild([])
+        _message_map = mm
+    return _message_map
+
+
+def record_mapping(evt: Dict[str, Any]) -> None:
+    """
+    Called for every finalized event. Successful sends are added to the
+    loaded index, or just appended to the journal when this process has not
+    loaded it (it will be read on the next load).
+    """
+    if not evt.get("posting_success"):
+        return
+    mapping = _mapping_from_event(evt)
+    if mapping:
+        remember_mapping(*mapping)
+
+
+def remember_mapping(source_channel_id: Any, message_id: Any, dest_message_id: Any) -> None:
+    """Record one source → destination pair, e.g. as soon as a post is partly out."""
+    mapping = _mapping_from_event(
+        dict(
+            source_channel_id=source_channel_id,
+            message_id=message_id,
+            dest_message_id=dest_message_id,
+        )
+    )
+    if not mapping:
+        return
+    if _message_map is not None:
+        _message_map.add(*mapping)
+    elif os.path.exists(MESSAGE_MAP_PATH):
+        append_line(MESSAGE_MAP_PATH, ("\t".join(mapping) + "\n").encode("utf-8"))
@@ -0,0 +1,125 @@
+"""
+Durable record of updates that are being processed.
+
+Every accepted post or edit is written here before it is queued, and moves
+through the stages received → translated → sent → posted. The translation is
+kept with the "translated" stage and the destination message id with the
+"sent" one, so after a crash the bot resumes each unfinished update from its
+last completed stage: a received update is translated, a translated one is
+only posted, and a sent one is never posted twice. Updates that fail for good or
+are handed to the parked queue are discarded; posted rows are kept for a
+day for inspection.
+
+Each accepted update gets its own ``seq``, and later stages are written by
+that ``seq``: when a newer edit of the same post replaces the row, finishing
+the older edit cannot touch it.
+"""
+
+import time
+import logging
+from typing import Any, List, Optional, Tuple
+
+from translator.services.sqlite_db import SqliteDB
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_channel_id TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    translated TEXT,
+    dest_message_id TEXT,
+    updated REAL NOT NULL,
+    UNIQUE (source_channel_id, message_id, kind)
+);
+"""
+
+RECEIVED = "received"
+TRANSLATED = "translated"
+SENT = "sent"
+POSTED = "posted"
+
+# Posted rows are pruned after this many seconds
+KEEP_POSTED = 24 * 60 * 60
+
+
+class Outbox(SqliteDB):
+    SCHEMA = _SCHEMA
+
+    def _execute(self, sql: str, params: tuple) -> int:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return conn.execute(sql, params).lastrowid
+
+    def receive(self, source_channel_id: Any, message_id: Any, kind: str) -> int:
+        """
+        Record an accepted update (``kind`` is "new" or "edit") and return its
+        ``seq``. Receiving it again replaces the older row and starts it over
+        at the back of the queue.
+        """
+        return self._execute(
+            "INSERT OR REPLACE INTO outbox"
+            " (source_channel_id, message_id, kind, stage, translated, dest_message_id, updated)"
+            " VALUES (?, ?, ?, ?, NULL, NULL, ?)",
+            (str(source_channel_id), str(message_id), kind, RECEIVED, time.time()),
+        )
+
+    def translated(self, seq: Optional[int], text: str) -> None:
+        """The translation is done; keep it so it is never requested twice."""
+        if seq is None:
+            return
+        self._execute(
+            "UPDATE outbox SET stage = ?, translated = ?, updated = ? WHERE seq = ?",
+            (TRANSLATED, text, time.time(), seq),
+        )
+
+    def sent(self, seq: Optional[int], dest_message_id: Any) -> None:
+        """
+        The destination accepted it. Saved right after the send, so a crash
+        before the update is finished cannot publish it a second time.
+        """
+        if seq is None:
+            return
+        self._execute(
+            "UPDATE outbox SET stage = ?, translated = NULL, dest_message_id = ?, updated = ?"
+            " WHERE seq = ?",
+            (SENT, str(dest_message_id), time.time(), seq),
+        )
+
+    def posted(self, seq: Optional[int]) -> None:
+        if seq is None:
+            return
+        self._execute(
+            "UPDATE outbox SET stage = ?, translated = NULL, updated = ? WHERE seq = ?",
+            (POSTED, time.time(), seq),
+        )
+
+    def discard(self, seq: Optional[int]) -> None:
+        """Nothing left to resume (skipped, failed for good, or parked)."""
+        if seq is None:
+            return
+        self._execute("DELETE FROM outbox WHERE seq = ?", (seq,))
+
+    def incomplete(
+        self,
+    ) -> List[Tuple[int, str, str, str, str, Optional[str], Optional[str]]]:
+        """
+        Unfinished updates as (seq, source_channel_id, message_id, kind,
+        stage, translation, dest_message_id), in the order they were received.
+        """
+        with self._lock:
+            return self._connect().execute(
+                "SELECT seq, source_channel_id, message_id, kind, stage, translated,"
+                " dest_message_id FROM outbox WHERE stage != ? ORDER BY seq",
+                (POSTED,),
+            ).fetchall()
+
+    def prune(self, keep_posted: float = KEEP_POSTED) -> None:
+        self._execute(
+            "DELETE FROM outbox WHERE stage = ? AND updated < ?",
+            (POSTED, time.time() - keep_posted),
+        )
@@ -0,0 +1,73 @@
+"""
+Updates held back while translation is unavailable.
+
+When the translation circuit is open, new posts and edits are not dropped:
+``(source_channel_id, message_id, kind)`` is stored in a small WAL-mode
+SQLite table and the message is fetched again from Telegram when the
+circuit closes, so only the current version is ever translated. Rows are
+read back in the order they were parked, which keeps per-channel order.
+"""
+
+import time
+import logging
+from typing import Any, List, Tuple
+
+from translator.services.sqlite_db import SqliteDB
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parked (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_channel_id TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    parked_at REAL NOT NULL,
+    UNIQUE (source_channel_id, message_id, kind)
+);
+"""
+
+
+class ParkedMessages(SqliteDB):
+    SCHEMA = _SCHEMA
+
+    def park(self, source_channel_id: Any, message_id: Any, kind: str) -> None:
+        """
+        Hold back an update (``kind`` is "new" or "edit"). Parking it again
+        moves it to the back of the queue.
+        """
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO parked"
+                    " (source_channel_id, message_id, kind, parked_at) VALUES (?, ?, ?, ?)",
+                    (str(source_channel_id), str(message_id), kind, time.time()),
+                )
+
+    def pending(self) -> List[Tuple[int, str, str, str]]:
+        """All parked updates as (seq, source_channel_id, message_id, kind), oldest first."""
+        with self._lock:
+            return self._connect().execute(
+                "SELECT seq, source_channel_id, message_id, kind FROM parked ORDER BY seq"
+            ).fetchall()
+
+    def has(self, source_channel_id: Any) -> bool:
+        """Whether anything of this channel is still waiting."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT 1 FROM parked WHERE source_channel_id = ? LIMIT 1",
+                (str(source_channel_id),),
+            ).fetchone()
+        return row is not None
+
+    def remove(self, seq: int) -> None:
+        """Drop one entry; a newer parking of the same update has another seq."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM parked WHERE seq = ?", (seq,))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM parked").fetchone()[0]
@@ -0,0 +1,146 @@
+"""
+Last processed version of every source message.
+
+For each ``(source_channel_id, message_id)`` the fingerprint of the text and
+entities that were last translated is kept in a small WAL-mode SQLite table,
+so an edit that does not change the text (reactions, buttons, media) can be
+recognised before any LLM or Bot API call. The source paragraphs and their
+translations are kept next to it, so an edit only retranslates the
+paragraphs that changed. Per channel, the highest message id accepted so far
+marks where a catch-up after downtime starts.
+"""
+
+import json
+import time
+import sqlite3
+import logging
+from typing import Any, List, Optional, Tuple
+
+from translator.services.sqlite_db import SqliteDB
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    source_channel_id TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (source_channel_id, message_id)
+);
+CREATE TABLE IF NOT EXISTS paragraphs (
+    source_channel_id TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    sources TEXT NOT NULL,
+    translations TEXT NOT NULL,
+    PRIMARY KEY (source_channel_id, message_id)
+);
+CREATE TABLE IF NOT EXISTS channels (
+    source_channel_id TEXT PRIMARY KEY,
+    last_message_id INTEGER NOT NULL
+);
+"""
+
+
+class SourceVersions(SqliteDB):
+    SCHEMA = _SCHEMA
+
+    def fingerprint(self, source_channel_id: Any, message_id: Any) -> Optional[str]:
+        """Fingerprint of the last processed version, or None if unknown."""
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT fingerprint FROM sources WHERE source_channel_id = ? AND message_id = ?",
+                    (str(source_channel_id), str(message_id)),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("SourceVersions: lookup failed: %s", e)
+            return None
+        return row[0] if row else None
+
+    def remember(self, source_channel_id: Any, message_id: Any, fingerprint: str) -> None:
+        """Record the version that was just translated and posted."""
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO sources"
+                        " (source_channel_id, message_id, fingerprint, updated) VALUES (?, ?, ?, ?)",
+                        (str(source_channel_id), str(message_id), fingerprint, time.time()),
+                    )
+        except sqlite3.Error as e:
+            logger.warning("SourceVersions: store failed: %s", e)
+
+    def paragraphs(
+        self, source_channel_id: Any, message_id: Any
+    ) -> Optional[Tuple[List[str], List[str]]]:
+        """(source paragraphs, their translations) of the last version, or None."""
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT sources, translations FROM paragraphs"
+                    " WHERE source_channel_id = ? AND message_id = ?",
+                    (str(source_channel_id), str(message_id)),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("SourceVersions: lookup failed: %s", e)
+            return None
+        if not row:
+            return None
+        return json.loads(row[0]), json.loads(row[1])
+
+    def remember_paragraphs(
+        self,
+        source_channel_id: Any,
+        message_id: Any,
+        sources: List[str],
+        translations: List[str],
+    ) -> None:
+        """Store paragraph pairs; ``sources[i]`` was translated as ``translations[i]``."""
+        if len(sources) != len(translations):
+            raise ValueError("sources and translations must be aligned")
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO paragraphs"
+                        " (source_channel_id, message_id, sources, translations) VALUES (?, ?, ?, ?)",
+                        (
+                            str(source_channel_id),
+                            str(message_id),
+                            json.dumps(sources, ensure_ascii=False),
+                            json.dumps(translations, ensure_ascii=False),
+                        ),
+                    )
+        except sqlite3.Error as e:
+            logger.warning("SourceVersions: store failed: %s", e)
+
+    def last_message_id(self, source_channel_id: Any) -> Optional[int]:
+        """Highest message id accepted from the channel, or None before the first."""
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT last_message_id FROM channels WHERE source_channel_id = ?",
+                    (str(source_channel_id),),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("SourceVersions: lookup failed: %s", e)
+            return None
+        return row[0] if row else None
+
+    def advance(self, source_channel_id: Any, message_id: Any) -> None:
+        """Move the channel's position forward to ``message_id`` (never back)."""
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute(
+                        "INSERT INTO channels (source_channel_id, last_message_id) VALUES (?, ?)"
+                        " ON CONFLICT (source_channel_id) DO UPDATE SET last_message_id ="
+                        " MAX(last_message_id, excluded.last_message_id)",
+                        (str(source_channel_id), int(message_id)),
+                    )
+        except sqlite3.Error as e:
+            logger.warning("SourceVersions: store failed: %s", e)
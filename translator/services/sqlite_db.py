@@ -0,0 +1,38 @@
+"""
+Shared plumbing for the bot's small local SQLite tables.
+
+Each store opens one WAL-mode connection lazily on first use, creates its
+``SCHEMA`` there, and serialises access with a lock, so the same instance
+can be used from the event loop and from ``asyncio.to_thread`` workers.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+
+class SqliteDB:
+    # CREATE statements run when the connection is opened
+    SCHEMA = ""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
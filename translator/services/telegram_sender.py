@@ -1,15 +1,129 @@
+import asyncio
 import logging
-from typing import List, Optional, Tuple, Any
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple, Any
 
-import requests
+import httpx
 from dotenv import load_dotenv
-from translator.config import CHANNEL_CONFIGS, BOT_TOKEN
+from translator.config import (
+    CHANNEL_CONFIGS,
+    BOT_TOKEN,
+    TELEGRAM_MAX_CONNECTIONS,
+    TELEGRAM_TIMEOUT,
+    TELEGRAM_CONNECT_TIMEOUT,
+    STREAM_EDIT_INTERVAL,
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_EDIT_RATE,
+    TELEGRAM_CHAT_BURST,
+)
 from translator.services.event_logger import EventRecorder
+from translator.services.message_map import remember_mapping
+from translator.utils.utils_html import html_safe_prefix
+from translator.utils.rate_limiter import TelegramRateLimiter
 
 
 load_dotenv()
 
-_SESSION = requests.Session()
+
+class TelegramTransport:
+    """
+    Pooled keep-alive HTTP client for the Bot API.
+
+    httpx connections belong to the event loop that opened them, so a new
+    pool is created when called from a different loop (the admin app runs
+    each send in its own ``asyncio.run``). Each pool is closed on its own
+    loop: by ``close()``, or when ``asyncio.run`` shuts that loop down and
+    cancels the task that holds it.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = TELEGRAM_MAX_CONNECTIONS,
+        timeout: float = TELEGRAM_TIMEOUT,
+        connect_timeout: float = TELEGRAM_CONNECT_TIMEOUT,
+    ) -> None:
+        self.max_connections = max_connections
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._http: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Closes the pool when its loop cancels the task at shutdown
+        self._closer: Optional[asyncio.Task] = None
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http.is_closed or self._loop is not loop:
+            self._release()
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+            self._loop = loop
+            self._closer = loop.create_task(_close_on_cancel(self._http))
+        return self._http
+
+    def _release(self) -> None:
+        """Hand the pool of another, still running loop back to it for closing."""
+        old, old_loop = self._http, self._loop
+        if old is None or old.is_closed or old_loop is None or not old_loop.is_running():
+            return
+        if old_loop is asyncio.get_running_loop():
+            return
+        asyncio.run_coroutine_threadsafe(old.aclose(), old_loop)
+
+    async def post(
+        self,
+        url: str,
+        *,
+        data: Optional[dict] = None,
+        json: Optional[dict] = None,
+        timeout: Optional[float] = None,
+    ) -> httpx.Response:
+        kwargs = {} if timeout is None else {"timeout": timeout}
+        return await self._client().post(url, data=data, json=json, **kwargs)
+
+    async def warm_up(self, connections: int = 2) -> None:
+        """Open keep-alive connections (TLS handshake included) before the first send."""
+        url = f"https://api.telegram.org/bot{BOT_TOKEN}/getMe"
+        client = self._client()
+        results = await asyncio.gather(
+            *(client.get(url) for _ in range(max(1, connections))),
+            return_exceptions=True,
+        )
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            logging.warning("TelegramTransport: warm-up failed: %s", failed[0])
+        else:
+            logging.info("TelegramTransport: warmed up %d connection(s)", len(results))
+
+    async def close(self) -> None:
+        if self._closer is not None:
+            self._closer.cancel()
+            self._closer = None
+        if self._http is not None and not self._http.is_closed:
+            await self._http.aclose()
+        self._http = None
+
+
+async def _close_on_cancel(client: httpx.AsyncClient) -> None:
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await client.aclose()
+
+
+_TRANSPORT = TelegramTransport()
+# Shared like the transport: Bot API limits are per bot token, not per sender
+_LIMITER = TelegramRateLimiter(
+    global_rate=TELEGRAM_GLOBAL_RATE,
+    chat_rate=TELEGRAM_CHAT_RATE / 60,
+    chat_burst=TELEGRAM_CHAT_BURST,
+    edit_chat_rate=TELEGRAM_EDIT_RATE / 60,
+    edit_chat_burst=TELEGRAM_CHAT_BURST,
+)
 
 
 def sanitize_html(text: str) -> str:
@@ -152,10 +266,63 @@ def get_channel_config(target: str):
     return cfg, None
 
 
+class TelegramAPIError(Exception):
+    """A Bot API call that failed; ``status_code`` is the HTTP status if any."""
+
+    def __init__(self, description: str, status_code: Optional[int] = None) -> None:
+        super().__init__(description)
+        self.status_code = status_code
+
+
+async def checked(send: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+    """
+    Await a TelegramSender call that reports failure by returning False and
+    raise it as TelegramAPIError (from what it recorded on the recorder, its
+    last argument), so the retry policy can classify it.
+    """
+    result = await send(*args)
+    if result is False:
+        code, message = args[-1].get("api_error_code", "exception_message")
+        raise TelegramAPIError(
+            message or f"{send.__name__} failed", code if isinstance(code, int) else None
+        )
+    return result
+
+
+def _rate_limit_kind(url: str) -> Optional[str]:
+    """Bucket for a Bot API method: "send", "edit" or None (not paced)."""
+    method = url.rsplit("/", 1)[-1]
+    if method.startswith("edit"):
+        return "edit"
+    if method.startswith("send") or method.startswith("copy") or method.startswith("forward"):
+        return "send"
+    return None
+
+
+def _retry_after(r: httpx.Response) -> Optional[float]:
+    try:
+        return float(r.json().get("parameters", {}).get("retry_after"))
+    except Exception:
+        return None
+
+
 class TelegramSender:
-    def __init__(self):
+    def __init__(
+        self,
+        transport: Optional[TelegramTransport] = None,
+        limiter: Optional[TelegramRateLimiter] = None,
+    ):
         self.configs = CHANNEL_CONFIGS
         self.MAX_MESSAGE_LENGTH = 4096
+        # Shared pool by default, so every sender reuses the same connections
+        self.transport = transport or _TRANSPORT
+        self.limiter = limiter or _LIMITER
+
+    async def warm_up(self) -> None:
+        await self.transport.warm_up()
+
+    async def close(self) -> None:
+        await self.transport.close()
 
     def split_message(self, text: str) -> List[str]:
         """Split into <=4096‑char chunks, preserving lines."""
@@ -243,20 +410,34 @@ class TelegramSender:
             # Note: Message storage functionality would go here
             # Currently disabled to avoid recursion issue
 
-    def _post_telegram(
-        self, url: str, *, data: Optional[dict] = None, json: Optional[dict] = None
-    ) -> Tuple[bool, Optional[requests.Response], Optional[str]]:
+    async def _post_telegram(
+        self,
+        url: str,
+        *,
+        data: Optional[dict] = None,
+        json: Optional[dict] = None,
+        timeout: Optional[float] = None,
+    ) -> Tuple[bool, Optional[httpx.Response], Optional[str]]:
         """
-        Send a POST request to the Telegram Bot API.
+        Send a POST request to the Telegram Bot API over the pooled transport.
 
         Returns:
             (success, response, error_message)
             - success: True if status_code is 200, else False
-            - response: requests.Response object if available, else None
+            - response: httpx.Response object if available, else None
             - error_message: error description or exception string if failed, else None
         """
+        kind = _rate_limit_kind(url)
+        chat_id = (json or data or {}).get("chat_id")
         try:
-            r = _SESSION.post(url, data=data, json=json, timeout=10)
+            if kind:
+                # Queue for a slot instead of running into a 429 flood wait
+                await self.limiter.acquire(kind, chat_id)
+            r = await self.transport.post(url, data=data, json=json, timeout=timeout)
+            if r.status_code == 429 and kind:
+                retry_after = _retry_after(r)
+                if retry_after:
+                    self.limiter.penalize(kind, chat_id, retry_after)
             if r.status_code != 200:
                 desc = None
                 try:
@@ -282,7 +463,7 @@ class TelegramSender:
         for chunk in chunks:
             sanitized_chunk = sanitize_html(chunk)
             logging.info("Send message: Sending chunk to %s (chat_id %s)…", target, dest_channel_id)
-            success, r, err = self._post_telegram(
+            success, r, err = await self._post_telegram(
                 url,
                 json={
                     "chat_id": dest_channel_id,
@@ -303,7 +484,7 @@ class TelegramSender:
                 recorder.set(
                     dest_message_id=sent_msg_id,
                     posting_success=posting_success,
-                    api_error_code=err,
+                    api_error_code=r.status_code if r is not None else None,
                     exception_message=exception_message,
                 )
                 logging.error(
@@ -340,7 +521,7 @@ class TelegramSender:
         sent_msg_id, posting_success = None, False
 
         logging.info("Sending photo to %s (chat_id %s)…", target, cfg.channel_id)
-        success, r, err = self._post_telegram(
+        success, r, err = await self._post_telegram(
             url,
             data={
                 "chat_id": dest_channel_id,
@@ -453,7 +634,7 @@ class TelegramSender:
         exception_message = None
         sent_msg_id = None
 
-        success, resp, err = self._post_telegram(url, data=payload)
+        success, resp, err = await self._post_telegram(url, data=payload)
         
         if not success or resp is None:
             # Handle specific "message is not modified" error
@@ -498,3 +679,101 @@ class TelegramSender:
             exception_message=exception_message,
         )
         return posting_success
+
+    async def _send_text(self, chat_id: Any, text: str) -> int:
+        """sendMessage one HTML text and return its message id; raises on failure."""
+        url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+        success, r, err = await self._post_telegram(
+            url, json={"chat_id": chat_id, "text": sanitize_html(text), "parse_mode": "HTML"}
+        )
+        if not success or r is None:
+            raise RuntimeError(f"sendMessage failed: {err}")
+        return r.json().get("result", {}).get("message_id")
+
+    async def _edit_text(self, chat_id: Any, message_id: Any, text: str) -> None:
+        """editMessageText; an unchanged text is not an error."""
+        url = f"https://api.telegram.org/bot{BOT_TOKEN}/editMessageText"
+        success, r, err = await self._post_telegram(
+            url,
+            json={
+                "chat_id": chat_id,
+                "message_id": message_id,
+                "text": sanitize_html(text),
+                "parse_mode": "HTML",
+            },
+        )
+        if not success and "message is not modified" not in str(err).lower():
+            raise RuntimeError(f"editMessageText failed: {err}")
+
+    async def publish_stream(
+        self,
+        texts: AsyncIterator[str],
+        recorder: EventRecorder,
+        interval: float = STREAM_EDIT_INTERVAL,
+    ) -> str:
+        """
+        Publish a translation while it is generated. ``texts`` yields the
+        translation so far; the first complete, tag-balanced paragraphs are
+        posted as soon as they exist and the post is extended with
+        editMessageText at most every ``interval`` seconds. Once the text
+        outgrows one Telegram message, progressive edits stop; the rest is
+        posted as extra messages when the stream ends. Returns the full text.
+        """
+        target, chat_id = recorder.get("dest_channel_name", "dest_channel_id")
+        text, published = "", ""
+        first_msg_id = None
+        last_publish = 0.0
+        progressive = True
+        try:
+            async for text in texts:
+                if not progressive:
+                    continue
+                if len(text) > self.MAX_MESSAGE_LENGTH:
+                    logging.info("Stream to %s exceeds one message; stop progressive edits", target)
+                    progressive = False
+                    continue
+                safe = html_safe_prefix(text)
+                now = time.monotonic()
+                if not safe or safe == published:
+                    continue
+                if first_msg_id is None:
+                    first_msg_id = await self._send_text(chat_id, safe)
+                    # Edits must find the post even if the stream breaks off
+                    recorder.set(dest_message_id=first_msg_id)
+                    await asyncio.to_thread(
+                        remember_mapping,
+                        *recorder.get("source_channel_id", "message_id"),
+                        first_msg_id,
+                    )
+                elif now - last_publish >= interval:
+                    await self._edit_text(chat_id, first_msg_id, safe)
+                else:
+                    continue
+                published, last_publish = safe, now
+
+            if first_msg_id is None:
+                # Nothing was published early: a plain send
+                await self.send_message(text, recorder)
+                return text
+            chunks = self.split_message(text)
+            if chunks[0] != published:
+                await self._edit_text(chat_id, first_msg_id, chunks[0])
+            for chunk in chunks[1:]:
+                await self._send_text(chat_id, chunk)
+        except Exception as e:
+            logging.error("Stream publish to %s failed: %s", target, e)
+            recorder.set(
+                dest_message_id=first_msg_id,
+                posting_success=False,
+                api_error_code=None,
+                exception_message=str(e),
+            )
+            raise
+        recorder.set(
+            dest_message_id=first_msg_id,
+            posting_success=True,
+            api_error_code=None,
+            exception_message=None,
+        )
+        logging.info("Stream publish: sent %d chunk(s) to %s", len(chunks), target)
+        return text
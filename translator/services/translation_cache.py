@@ -0,0 +1,101 @@
+"""
+Persistent cache of finished translations.
+
+Reposts, no-op edits and admin retranslations send byte-identical HTML to
+Anthropic again. Translations are stored in a small WAL-mode SQLite table
+keyed by a hash of (model, prompt template version, normalised HTML), so
+the bot and the admin app share one cache across restarts. Entries expire
+``ttl_days`` after they were stored and the table is trimmed to
+``max_entries`` by least recent use.
+"""
+
+import time
+import sqlite3
+import logging
+from typing import Optional
+
+from translator.services.sqlite_db import SqliteDB
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    key TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations(last_used);
+"""
+
+# Trim the table every N stores rather than on every write
+EVICT_EVERY = 100
+
+
+class TranslationCache(SqliteDB):
+    SCHEMA = _SCHEMA
+
+    def __init__(self, path: str, max_entries: int = 5000, ttl_days: float = 30) -> None:
+        super().__init__(path)
+        self.max_entries = max_entries
+        self.ttl = ttl_days * 86400
+        self._puts = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached translation for ``key``, or None if missing or expired."""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT text, created FROM translations WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                with conn:
+                    if row[1] < now - self.ttl:
+                        conn.execute("DELETE FROM translations WHERE key = ?", (key,))
+                        return None
+                    conn.execute(
+                        "UPDATE translations SET last_used = ? WHERE key = ?", (now, key)
+                    )
+                return row[0]
+        except sqlite3.Error as e:
+            # A broken cache must never stop a translation
+            logger.warning("TranslationCache: lookup failed: %s", e)
+            return None
+
+    def put(self, key: str, text: str) -> None:
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO translations (key, text, created, last_used)"
+                        " VALUES (?, ?, ?, ?)",
+                        (key, text, now, now),
+                    )
+                self._puts += 1
+                if self._puts % EVICT_EVERY == 0:
+                    self._evict(conn, now)
+        except sqlite3.Error as e:
+            logger.warning("TranslationCache: store failed: %s", e)
+
+    def evict(self) -> None:
+        """Drop expired entries and trim to ``max_entries`` by least recent use."""
+        with self._lock:
+            self._evict(self._connect(), time.time())
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        with conn:
+            conn.execute("DELETE FROM translations WHERE created < ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM translations WHERE key IN (SELECT key FROM translations"
+                " ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM translations").fetchone()[0]
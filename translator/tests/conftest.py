@@ -0,0 +1,15 @@
+import pytest
+
+from translator.services import telegram_sender
+from translator.utils.rate_limiter import TelegramRateLimiter
+
+
+@pytest.fixture(autouse=True)
+def unpaced_telegram_sender(monkeypatch):
+    # Tests send many messages to the same fake chat; don't pace them
+    monkeypatch.setattr(
+        telegram_sender,
+        "_LIMITER",
+        TelegramRateLimiter(global_rate=1e6, chat_rate=1e6, chat_burst=1e6,
+                            edit_chat_rate=1e6, edit_chat_burst=1e6),
+    )
@@ -0,0 +1,63 @@
+import os
+import time
+from unittest.mock import patch
+
+from translator.services.blob_store import (
+    BlobStore,
+    body_hash,
+    externalize_bodies,
+    message_body,
+)
+from translator.services.event_logger import EventRecorder
+
+
+def test_put_get_roundtrip_and_dedupe(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    digest = blobs.put("&lt;b&gt;Привет&lt;/b&gt;")
+    assert digest == body_hash("&lt;b&gt;Привет&lt;/b&gt;")
+    assert blobs.put("&lt;b&gt;Привет&lt;/b&gt;") == digest
+    assert blobs.get(digest) == "&lt;b&gt;Привет&lt;/b&gt;"
+    files = [f for _, _, fs in os.walk(tmp_path) for f in fs]
+    assert files == [digest + ".z"]
+
+
+def test_get_rejects_unknown_and_malformed_hashes(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    assert blobs.get("0" * 64) is None
+    assert blobs.get("../../etc/passwd") is None
+
+
+def test_externalize_and_resolve_bodies(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    evt = externalize_bodies({"source_message": "src", "translated_message": ""}, blobs)
+    assert evt["source_message"] == ""
+    assert evt["source_message_hash"] == body_hash("src")
+    assert "translated_message_hash" not in evt
+    assert message_body(evt, "source_message", blobs) == "src"
+    # Events written before the blob store keep their inline bodies
+    assert message_body({"source_message": "old"}, "source_message", blobs) == "old"
+
+
+def test_prune_keeps_recently_reused_bodies(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    old = blobs.put("old")
+    reused = blobs.put("reused")
+    month_ago = time.time() - 30 * 86400
+    for digest in (old, reused):
+        os.utime(blobs._path(digest), (month_ago, month_ago))
+    blobs.put("reused")
+    assert blobs.prune(older_than_days=7) == 1
+    assert blobs.get(old) is None
+    assert blobs.get(reused) == "reused"
+
+
+def test_recorder_stores_only_hashes(tmp_path):
+    with patch("translator.services.event_store.EVENTS_DIR", str(tmp_path / "events")), \
+         patch("translator.services.event_logger.BLOBS_DIR", str(tmp_path / "blobs")):
+        recorder = EventRecorder()
+        recorder.set(timestamp="2025-07-05T10:00:00+00:00", event_type="create",
+                     source_message="hello", translated_message="привет")
+        recorder.finalize()
+        evt = recorder.store.read_events()[-1]
+    assert evt["source_message"] == "" and evt["translated_message"] == ""
+    assert BlobStore(str(tmp_path / "blobs")).get(evt["translated_message_hash"]) == "привет"
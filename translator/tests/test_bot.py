@@ -3,11 +3,38 @@ import asyncio
 import types
 from unittest.mock import MagicMock
 from pyrogram.client import Client
-from anthropic import Anthropic
+from anthropic import Anthropic, AsyncAnthropic
 from telegram.ext import Application, ApplicationBuilder
 from translator.services.telegram_sender import TelegramSender
 from translator.services.event_logger import EventRecorder
+from translator.models import MetadataRequest
 from translator import bot
+from translator.utils import translation_utils
+from translator.utils.translation_utils import split_paragraphs
+from translator.utils.ttl_cache import AsyncTTLCache
+from translator.services.source_versions import SourceVersions
+from translator.services.parked_messages import ParkedMessages
+from translator.services.outbox import Outbox
+from translator.services.message_map import MessageMap
+from translator.utils.circuit_breaker import CircuitBreaker
+
+
+@pytest.fixture(autouse=True)
+def fresh_chat_cache(monkeypatch):
+    # Keep get_chat results out of the real cache file and between tests
+    monkeypatch.setattr(bot, "chat_cache", AsyncTTLCache(60))
+
+
+@pytest.fixture(autouse=True)
+def fresh_source_versions(monkeypatch, tmp_path):
+    monkeypatch.setattr(bot, "source_versions", SourceVersions(str(tmp_path / "sources.sqlite3")))
+
+
+@pytest.fixture(autouse=True)
+def fresh_breaker(monkeypatch, tmp_path):
+    monkeypatch.setattr(bot, "translation_breaker", CircuitBreaker(2, probe_delay=0.01))
+    monkeypatch.setattr(bot, "parked_messages", ParkedMessages(str(tmp_path / "parked.sqlite3")))
+    monkeypatch.setattr(bot, "outbox", Outbox(str(tmp_path / "outbox.sqlite3")))
 
 
 def test_import_bot_module():
@@ -21,7 +48,7 @@ def test_init_clients_smoke(monkeypatch):
         def __init__(self, *args, **kwargs):
             pass
 
-    class DummyAnthropic(Anthropic):
+    class DummyAnthropic(AsyncAnthropic):
         def __init__(self, *args, **kwargs):
             pass
 
@@ -56,7 +83,7 @@ def test_init_clients_smoke(monkeypatch):
 
     monkeypatch.setattr(bot, "Client", DummyClient)
     monkeypatch.setattr(bot, "Application", DummyApp)
-    monkeypatch.setattr(bot, "Anthropic", DummyAnthropic)
+    monkeypatch.setattr(bot, "AsyncAnthropic", DummyAnthropic)
     monkeypatch.setattr(bot, "TelegramSender", DummySender)
     monkeypatch.setattr(bot, "EventRecorder", DummyEventRecorder)
 
@@ -182,3 +209,431 @@ def test_main_async_signature():
     assert hasattr(bot, "main_async")
     assert callable(bot.main_async)
     assert bot.main_async.__code__.co_flags & 0x80  # CO_COROUTINE
+
+
+@pytest.mark.asyncio
+async def test_fetch_metadata_runs_lookups_concurrently():
+    log = []
+    both_started = asyncio.Event()
+
+    async def overlap(name):
+        # Only returns once the other lookup has started as well
+        log.append(("start", name))
+        if len(log) == 2:
+            both_started.set()
+        await asyncio.wait_for(both_started.wait(), 1)
+        log.append(("end", name))
+
+    class SlowBot:
+        token = "T"
+
+        async def get_chat(self, chat_id):
+            await overlap("chat")
+            return types.SimpleNamespace(to_dict=lambda: {"id": chat_id}, username=None)
+
+        async def get_file(self, file_id):
+            await overlap("file")
+            return types.SimpleNamespace(to_dict=lambda: {"file_path": "a/b"}, file_path="a/b")
+
+    req = MetadataRequest(1, 2, "f")
+    meta = await bot.fetch_metadata(SlowBot(), req)
+    # Both lookups were in flight before either finished
+    assert [step for step, _ in log] == ["start", "start", "end", "end"]
+    assert meta["chat"] == {"id": 1}
+    assert meta["file_download_link"] == "https://api.telegram.org/file/botT/a/b"
+    assert "enqueued_at" not in meta and "response" not in meta
+
+
+@pytest.mark.asyncio
+async def test_ptb_worker_pool_records_queue_wait(monkeypatch):
+    in_flight = []
+    all_started = asyncio.Event()
+
+    class SlowBot:
+        token = "T"
+
+        async def get_chat(self, chat_id):
+            # Returns only once all three requests are being served at once
+            in_flight.append(chat_id)
+            if len(in_flight) == 3:
+                all_started.set()
+            await asyncio.wait_for(all_started.wait(), 1)
+            return types.SimpleNamespace(to_dict=lambda: {"id": chat_id}, username=None)
+
+    class DummyApp(Application):
+        def __init__(self):
+            self.bot = SlowBot()
+
+    monkeypatch.setattr(bot, "query_queue", asyncio.Queue())
+    stop_event = asyncio.Event()
+    workers = bot.start_ptb_workers(DummyApp(), stop_event, count=3)
+    reqs = [MetadataRequest(i, i) for i in range(3)]
+    for req in reqs:
+        await bot.query_queue.put(req)
+    metas = await asyncio.gather(*(req.response for req in reqs))
+    # Three workers serve three requests side by side
+    assert sorted(in_flight) == [0, 1, 2]
+    assert [m["chat"] for m in metas] == [{"id": 0}, {"id": 1}, {"id": 2}]
+    assert all(m["queue_wait"] >= 0 for m in metas)
+    stop_event.set()
+    for task in workers:
+        task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_local_metadata_prefers_cached_chat():
+    msg = types.SimpleNamespace(chat=types.SimpleNamespace(username="src"))
+    req = MetadataRequest(5, 7)
+    meta = bot.local_metadata(req, msg)
+    assert meta["chat_link"] == "https://t.me/src"
+    assert meta["queue_wait"] == 0.0
+
+    bot.chat_cache.set(5, {"chat": {"id": 5}, "chat_link": "https://t.me/cached"})
+    meta = bot.local_metadata(req, msg)
+    assert meta["chat"] == {"id": 5}
+    assert meta["chat_link"] == "https://t.me/cached"
+
+
+class CapturingPyro:
+    """Registers nothing, just keeps the handler functions."""
+
+    def __init__(self):
+        self.handlers = {}
+        # Current version of every message, for get_messages
+        self.messages = {}
+        # Number of get_messages calls that fail before it works again
+        self.failing_fetches = 0
+
+    async def get_messages(self, chat_id, message_ids):
+        if self.failing_fetches:
+            self.failing_fetches -= 1
+            raise ConnectionError("Telegram unreachable")
+        return [self.messages.get(i) for i in message_ids]
+
+    def on_message(self, filt):
+        def deco(fn):
+            self.handlers["message"] = fn
+            return fn
+        return deco
+
+    def on_edited_message(self, filt):
+        def deco(fn):
+            self.handlers["edit"] = fn
+            return fn
+        return deco
+
+
+class RecordingContext:
+    recorded = None
+
+    def __init__(self):
+        self.payload = {}
+
+    def set(self, **kwargs):
+        self.payload.update(kwargs)
+
+    def get(self, field):
+        return self.payload.get(field)
+
+    def finalize(self):
+        self.recorded.append(self.payload)
+
+
+def make_msg(msg_id=10, text="Привет", entities=None):
+    return types.SimpleNamespace(
+        id=msg_id,
+        chat=types.SimpleNamespace(id=1, title="Src", username="src"),
+        text=text,
+        caption=None,
+        entities=entities,
+        caption_entities=None,
+        photo=None, video=None, document=None, audio=None, voice=None,
+        animation=None, sticker=None, video_note=None,
+    )
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """register_handlers wired to a fake translator and sender."""
+    recorded = []
+    RecordingContext.recorded = recorded
+    calls = types.SimpleNamespace(
+        translated=[], sent=[], edited=[], recorded=recorded, failure=None, recovered=False
+    )
+
+    async def fake_translate(client, payload, usage=None):
+        # Keeps the paragraph structure, like the real prompt asks for
+        calls.translated.append(payload["Html"])
+        if calls.failure is not None:
+            raise calls.failure
+        return "\n\n".join("EN " + p for p in split_paragraphs(payload["Html"]))
+
+    async def send_message(translated, rec):
+        calls.sent.append(translated)
+        rec.set(posting_success=True, dest_message_id="100")
+
+    async def edit_message(channel_id, message_id, translated, rec):
+        calls.edited.append((message_id, translated))
+        rec.set(posting_success=True)
+
+    async def fake_translate_paragraph(client, paragraph, post_html, usage=None):
+        calls.translated.append(paragraph)
+        if calls.failure is not None:
+            raise calls.failure
+        return "EN " + paragraph
+
+    sender = types.SimpleNamespace(send_message=send_message, edit_message=edit_message)
+    monkeypatch.setattr(bot, "translate_html", fake_translate)
+    monkeypatch.setattr(translation_utils, "translate_html", fake_translate)
+    monkeypatch.setattr(translation_utils, "translate_paragraph", fake_translate_paragraph)
+    monkeypatch.setattr(bot, "query_queue", asyncio.Queue())
+    monkeypatch.setattr(bot.filters, "chat", lambda ids: bot.filters.channel)
+    monkeypatch.setattr(bot.CONFIG, "get_source_channel_ids", lambda: [1])
+    monkeypatch.setattr(bot.CONFIG, "get_destination_id", lambda src: "2")
+    monkeypatch.setattr(bot.CONFIG, "get_channel_name", lambda dest: "dest")
+    monkeypatch.setattr(bot.CONFIG, "get_destination_msg_id", lambda src, msg: "100")
+
+    pyro = CapturingPyro()
+    recorder = types.SimpleNamespace(context=RecordingContext)
+    executor, recover = bot.register_handlers(pyro, None, sender, recorder)
+
+    async def deliver(kind, msg):
+        if not calls.recovered:
+            calls.recovered = True
+            await recover()
+        pyro.messages[msg.id] = msg
+        await pyro.handlers[kind](None, msg)
+        assert await executor.join(1)
+
+    calls.deliver = deliver
+    calls.pyro = pyro
+    calls.sender = sender
+    calls.recover = recover
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_text_message_skips_metadata_queue(pipeline):
+    await pipeline.deliver("message", make_msg())
+
+    assert bot.query_queue.empty()
+    assert pipeline.sent == ["EN Привет\n\nEN Source channel: <a href=\"https://t.me/src\">Src</a>"]
+    assert pipeline.recorded[0]["end_to_end_time"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_unchanged_edit_is_skipped(pipeline):
+    await pipeline.deliver("message", make_msg(text="Привет"))
+    # Reaction/button-only edit: same text and entities
+    await pipeline.deliver("edit", make_msg(text="Привет "))
+    assert pipeline.translated == ["Привет\n\nSource channel: <a href=\"https://t.me/src\">Src</a>"]
+    assert pipeline.edited == []
+    skipped = pipeline.recorded[-1]
+    assert skipped["event_type"] == "edit_skipped"
+    assert skipped["posting_success"] is None
+
+    await pipeline.deliver("edit", make_msg(text="Привет, мир"))
+    assert len(pipeline.edited) == 1
+    # The new version is remembered, so repeating it is a no-op again
+    await pipeline.deliver("edit", make_msg(text="Привет, мир"))
+    assert len(pipeline.edited) == 1
+
+
+@pytest.mark.asyncio
+async def test_edit_retranslates_only_changed_paragraphs(pipeline, monkeypatch):
+    async def format_like_the_prompt(client, payload, usage=None):
+        # Bold lead, then <p> paragraphs, as the full-post rules ask for
+        pipeline.translated.append(payload["Html"])
+        lead, *rest = split_paragraphs(payload["Html"])
+        return "\n\n".join([f"<b>EN {lead}</b>"] + [f"<p>EN {p}</p>" for p in rest])
+
+    monkeypatch.setattr(bot, "translate_html", format_like_the_prompt)
+    text = "Первый абзац.\n\nВторой абзац.\n\nТретий абзац."
+    await pipeline.deliver("message", make_msg(text=text))
+    assert len(pipeline.translated) == 1
+
+    await pipeline.deliver("edit", make_msg(text=text.replace("Второй", "Второй, исправленный")))
+    assert pipeline.translated[1:] == ["Второй, исправленный абзац."]
+    dest_id, translated = pipeline.edited[0]
+    # Stitched into the post's formatting, not formatted as a new lead
+    assert translated.split("\n\n")[:3] == [
+        "<b>EN Первый абзац.</b>",
+        "<p>EN Второй, исправленный абзац.</p>",
+        "<p>EN Третий абзац.</p>",
+    ]
+
+    # Rewriting most of the post falls back to one full translation
+    await pipeline.deliver("edit", make_msg(text="Новый текст.\n\nСовсем другой."))
+    assert pipeline.translated[-1].startswith("Новый текст.\n\nСовсем другой.")
+
+
+class Overloaded(Exception):
+    status_code = 529
+
+
+@pytest.mark.asyncio
+async def test_messages_are_parked_while_translation_is_down(pipeline, monkeypatch):
+    monkeypatch.setattr(bot, "RETRY_BUDGET", 0)
+    pipeline.failure = Overloaded("overloaded")
+    for msg_id in (10, 11, 12):
+        await pipeline.deliver("message", make_msg(msg_id, text=f"Пост {msg_id}"))
+
+    # The second failure opens the circuit; later posts never reach Anthropic
+    assert len(pipeline.translated) == 2
+    assert bot.translation_breaker.is_open
+    assert [e["event_type"] for e in pipeline.recorded] == ["create", "parked", "parked"]
+    assert [row[2] for row in bot.parked_messages.pending()] == ["11", "12"]
+
+    pipeline.failure = None
+    probes = []
+
+    async def probe():
+        probes.append(1)
+
+    stop = asyncio.Event()
+    assert await bot.translation_breaker.recover(probe, stop)
+    assert pipeline.sent == [
+        f"EN Пост {i}\n\nEN Source channel: <a href=\"https://t.me/src\">Src</a>" for i in (11, 12)
+    ]
+    assert bot.parked_messages.count() == 0
+
+
+@pytest.mark.asyncio
+async def test_updates_wait_behind_parked_ones(pipeline):
+    pipeline.recovered = True
+    await pipeline.recover()
+    bot.parked_messages.park(1, 10, "new")
+    pipeline.pyro.messages[10] = make_msg(10, text="Старый пост")
+    # The circuit closed, but the parked post cannot be fetched yet
+    pipeline.pyro.failing_fetches = 1
+    await bot.translation_breaker.on_close()
+    await pipeline.deliver("message", make_msg(11, text="Новый пост"))
+    assert pipeline.sent == []
+
+    # The drain is retried with backoff and keeps the channel's order
+    for _ in range(100):
+        if len(pipeline.sent) == 2:
+            break
+        await asyncio.sleep(0.01)
+    assert [s.split("\n\n")[0] for s in pipeline.sent] == ["EN Старый пост", "EN Новый пост"]
+    assert bot.parked_messages.count() == 0
+
+
+@pytest.mark.asyncio
+async def test_leftover_parked_rows_do_not_hold_back_live_posts(pipeline):
+    pipeline.recovered = True
+    await pipeline.recover()
+    # Nothing is draining and the circuit is closed
+    bot.parked_messages.park(1, 10, "new")
+    await pipeline.deliver("message", make_msg(11, text="Новый пост"))
+    assert [s.split("\n\n")[0] for s in pipeline.sent] == ["EN Новый пост"]
+
+
+@pytest.mark.asyncio
+async def test_unfinished_updates_resume_from_their_last_stage(pipeline, monkeypatch, tmp_path):
+    mapping = MessageMap(str(tmp_path / "message_map.tsv"))
+    monkeypatch.setattr(bot, "get_message_map", lambda: mapping)
+    # Left behind by a run that crashed: one post never translated, one
+    # translated but not posted, one that went out before it was finished
+    bot.outbox.receive(1, 10, "new")
+    bot.outbox.translated(bot.outbox.receive(1, 11, "new"), "EN saved")
+    bot.outbox.sent(bot.outbox.receive(1, 12, "new"), 120)
+    for msg_id in (10, 11, 12):
+        pipeline.pyro.messages[msg_id] = make_msg(msg_id, text=f"Пост {msg_id}")
+
+    await pipeline.deliver("message", make_msg(13, text="Пост 13"))
+
+    # Only the received post and the live one are translated
+    assert [t.split("\n\n")[0] for t in pipeline.translated] == ["Пост 10", "Пост 13"]
+    assert [s.split("\n\n")[0] for s in pipeline.sent] == ["EN Пост 10", "EN saved", "EN Пост 13"]
+    assert bot.outbox.incomplete() == []
+    assert mapping.get(1, 12) == "120"
+
+
+@pytest.mark.asyncio
+async def test_post_sent_right_before_a_crash_is_not_sent_again(pipeline, monkeypatch, tmp_path):
+    mapping = MessageMap(str(tmp_path / "message_map.tsv"))
+    monkeypatch.setattr(bot, "get_message_map", lambda: mapping)
+    posted = bot.outbox.posted
+    crashing = True
+
+    def crash_or_post(seq):
+        # The process dies between the send and finishing the update
+        if crashing:
+            raise RuntimeError("killed")
+        posted(seq)
+
+    monkeypatch.setattr(bot.outbox, "posted", crash_or_post)
+    await pipeline.deliver("message", make_msg(10, text="Пост"))
+    assert len(pipeline.sent) == 1
+    assert pipeline.recorded == []
+
+    # Next start: the post is finished without a second send
+    crashing = False
+    recorder = types.SimpleNamespace(context=RecordingContext)
+    _, recover = bot.register_handlers(pipeline.pyro, None, pipeline.sender, recorder)
+    await recover()
+    assert len(pipeline.sent) == 1
+    assert mapping.get(1, 10) == "100"
+    assert bot.outbox.incomplete() == []
+
+
+@pytest.mark.asyncio
+async def test_catch_up_looks_past_a_run_of_deleted_posts():
+    pyro = CapturingPyro()
+    # Over 200 ids in a row deleted between two posts
+    for msg_id in (5, 450):
+        pyro.messages[msg_id] = make_msg(msg_id)
+    missed = await bot.fetch_since(pyro, 1, 0)
+    assert [m.id for m in missed] == [5, 450]
+
+
+@pytest.mark.asyncio
+async def test_posts_missed_while_down_are_caught_up_first(pipeline, monkeypatch):
+    bot.source_versions.advance(1, 10)
+    for msg_id in (11, 12, 13):
+        pipeline.pyro.messages[msg_id] = make_msg(msg_id, text=f"Пост {msg_id}")
+    # A service message in the gap is not a post
+    pipeline.pyro.messages[14] = types.SimpleNamespace(
+        id=14, chat=types.SimpleNamespace(id=1), service="pinned_message"
+    )
+    monkeypatch.setattr(bot, "CATCHUP_LIMIT", 2)
+
+    await pipeline.deliver("message", make_msg(15, text="Пост 15"))
+    # Pyrogram may still deliver a post the catch-up already took in
+    await pipeline.deliver("message", make_msg(13, text="Пост 13"))
+
+    # Only the newest CATCHUP_LIMIT missed posts, before the live one
+    assert [s.split("\n\n")[0] for s in pipeline.sent] == [
+        "EN Пост 12", "EN Пост 13", "EN Пост 15"
+    ]
+    assert bot.source_versions.last_message_id(1) == 15
+
+
+@pytest.mark.asyncio
+async def test_stream_failing_before_posting_falls_back_to_a_plain_send(pipeline, monkeypatch):
+    monkeypatch.setattr(bot, "TRANSLATION_STREAMING", True)
+    published = []
+
+    async def publish_stream(texts, rec):
+        await texts.aclose()
+        if published:
+            # Part of the post is out: it must not be sent again
+            rec.set(dest_message_id="99", posting_success=False)
+        raise RuntimeError("stream dropped")
+
+    monkeypatch.setattr(bot, "stream_translation", lambda client, payload, usage: _texts())
+    pipeline.sender.publish_stream = publish_stream
+
+    await pipeline.deliver("message", make_msg(10, text="Пост"))
+    assert len(pipeline.sent) == 1
+    assert pipeline.recorded[-1]["posting_success"] is True
+
+    published.append(1)
+    await pipeline.deliver("message", make_msg(11, text="Другой пост"))
+    assert len(pipeline.sent) == 1
+    assert pipeline.recorded[-1]["exception_message"] == "stream dropped"
+
+
+async def _texts():
+    yield "EN"
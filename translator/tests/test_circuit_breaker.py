@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from translator.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class Unavailable(Exception):
+    status_code = 503
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+async def fail(exc):
+    raise exc
+
+
+async def ok():
+    return "ok"
+
+
+@pytest.mark.asyncio
+async def test_trips_on_consecutive_transient_failures():
+    breaker = CircuitBreaker(failure_threshold=2)
+    with pytest.raises(Unavailable):
+        await breaker.call(fail, Unavailable())
+    # A success in between resets the count
+    assert await breaker.call(ok) == "ok"
+    with pytest.raises(Unavailable):
+        await breaker.call(fail, Unavailable())
+    # Client errors say nothing about the service
+    with pytest.raises(BadRequest):
+        await breaker.call(fail, BadRequest())
+    assert not breaker.is_open
+
+    with pytest.raises(Unavailable):
+        await breaker.call(fail, Unavailable())
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(ok)
+
+
+@pytest.mark.asyncio
+async def test_recover_probes_with_backoff_then_closes(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, probe_delay=0.01, max_probe_delay=0.02)
+    breaker.open()
+    probes = []
+    closed = []
+
+    async def probe():
+        probes.append(1)
+        if len(probes) < 3:
+            raise Unavailable("still down")
+
+    async def on_close():
+        closed.append(breaker.is_open)
+
+    breaker.on_close = on_close
+    assert await breaker.recover(probe, asyncio.Event())
+    assert len(probes) == 3
+    assert closed == [False]
+    assert await breaker.call(ok) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_wait_open_and_recover_stop_on_shutdown():
+    breaker = CircuitBreaker(probe_delay=60)
+    stop = asyncio.Event()
+    stop.set()
+    assert await breaker.wait_open(stop) is False
+    breaker.open()
+    assert await breaker.recover(lambda: ok(), stop) is False
+    assert breaker.is_open
@@ -0,0 +1,71 @@
+import json
+import pytest
+from translator.services.event_log import (
+    EventLog,
+    load_events,
+    migrate_legacy_events,
+)
+
+
+def test_append_and_read(tmp_path):
+    log = EventLog(str(tmp_path / "events.ndjson"))
+    log.append({"message_id": "1"})
+    log.append_many([{"message_id": "2"}, {"message_id": "3"}])
+    assert [e["message_id"] for e in log.read_events()] == ["1", "2", "3"]
+
+
+def test_append_keeps_unicode(tmp_path):
+    path = tmp_path / "events.ndjson"
+    EventLog(str(path)).append({"source_channel_name": "Христиане"})
+    assert "Христиане" in path.read_text(encoding="utf-8")
+
+
+def test_partial_trailing_line_is_ignored_and_recovered(tmp_path):
+    path = tmp_path / "events.ndjson"
+    path.write_text('{"message_id": "1"}\n{"message_id": "2', encoding="utf-8")
+    log = EventLog(str(path))
+    # Readers skip the torn line
+    assert log.read_events() == [{"message_id": "1"}]
+    # The next append truncates it first
+    log.append({"message_id": "3"})
+    assert path.read_text(encoding="utf-8") == '{"message_id": "1"}\n{"message_id": "3"}\n'
+
+
+def test_recover_without_any_newline(tmp_path):
+    path = tmp_path / "events.ndjson"
+    path.write_text('{"message_id"', encoding="utf-8")
+    log = EventLog(str(path))
+    assert log.recover() == len('{"message_id"')
+    assert path.read_text(encoding="utf-8") == ""
+
+
+def test_corrupt_line_is_skipped(tmp_path):
+    path = tmp_path / "events.ndjson"
+    path.write_text('{"message_id": "1"}\nnot json\n{"message_id": "2"}\n', encoding="utf-8")
+    assert [e["message_id"] for e in EventLog(str(path)).read_events()] == ["1", "2"]
+
+
+def test_load_events_legacy_fallback(tmp_path):
+    legacy = tmp_path / "events.json"
+    legacy.write_text(json.dumps({"messages": [{"message_id": "1"}]}), encoding="utf-8")
+    assert load_events(str(tmp_path / "events.ndjson"), str(legacy)) == [{"message_id": "1"}]
+
+
+def test_load_events_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_events(str(tmp_path / "events.ndjson"), str(tmp_path / "events.json"))
+
+
+def test_migrate_legacy_events(tmp_path):
+    legacy = tmp_path / "events.json"
+    log_path = tmp_path / "events.ndjson"
+    legacy.write_text(
+        json.dumps({"messages": [{"message_id": "1"}, {"message_id": "2"}]}),
+        encoding="utf-8",
+    )
+    assert migrate_legacy_events(str(legacy), str(log_path)) == 2
+    assert not legacy.exists()
+    assert (tmp_path / "events.json.migrated").exists()
+    assert [e["message_id"] for e in EventLog(str(log_path)).read_events()] == ["1", "2"]
+    # Second run is a no-op
+    assert migrate_legacy_events(str(legacy), str(log_path)) == 0
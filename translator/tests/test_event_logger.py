@@ -25,7 +25,9 @@ def mock_channel_cache(tmp_path):
 
 def test_event_recorder_init():
     """Test EventRecorder initialization"""
-    with patch('translator.services.event_logger.EVENTS_PATH', 'nonexistent.json'):
+    with patch('translator.services.event_logger.EVENTS_PATH', 'nonexistent.json'), \
+         patch('translator.services.event_logger.EVENTS_LOG_PATH', 'nonexistent.ndjson'), \
+         patch('translator.services.event_store.EVENTS_DIR', 'nonexistent_dir'):
         recorder = EventRecorder()
         assert isinstance(recorder.stats, dict)
         assert "messages" in recorder.stats
@@ -33,7 +35,9 @@ def test_event_recorder_init():
 
 def test_event_recorder_load_base_file_not_found():
     """Test loading base stats with missing file"""
-    with patch('translator.services.event_logger.EVENTS_PATH', 'nonexistent.json'):
+    with patch('translator.services.event_logger.EVENTS_PATH', 'nonexistent.json'), \
+         patch('translator.services.event_logger.EVENTS_LOG_PATH', 'nonexistent.ndjson'), \
+         patch('translator.services.event_store.EVENTS_DIR', 'nonexistent_dir'):
         recorder = EventRecorder()
         assert recorder.stats == {"messages": []}
 
@@ -87,44 +91,73 @@ def test_event_recorder_get_empty_fields():
     with pytest.raises(ValueError):
         recorder.get()
 
-@patch('os.path.dirname')
-@patch('json.dump')
-def test_event_recorder_finalize(mock_dump, mock_dirname, tmp_path):
-    """Test finalizing and saving event"""
-    mock_dirname.return_value = str(tmp_path)
-    
-    recorder = EventRecorder()
-    recorder.set(
-        timestamp="2025-07-05",
-        event_type="create",
-        source_channel_id="123",
-        dest_channel_id="456"
-    )
-    
-    recorder.finalize()
-    
-    # Verify json.dump was called
-    mock_dump.assert_called_once()
-    
-    # Verify stats were updated
-    assert len(recorder.stats["messages"]) == 1
-    assert recorder.stats["messages"][0]["event_type"] == "create"
-
-def test_event_recorder_finalize_auto_event_type():
+def test_event_recorder_finalize(tmp_path):
+    """Test finalizing appends one line to the day's segment"""
+    events_dir = tmp_path / "events"
+    with patch('translator.services.event_store.EVENTS_DIR', str(events_dir)):
+        recorder = EventRecorder()
+        recorder.set(
+            timestamp="2025-07-05T10:00:00+00:00",
+            event_type="create",
+            source_channel_id="123",
+            dest_channel_id="456"
+        )
+
+        recorder.finalize()
+
+        # Exactly one NDJSON line was written to the 2025-07-05 segment
+        lines = (events_dir / "2025-07-05.ndjson").read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 1
+        assert json.loads(lines[0])["event_type"] == "create"
+
+        # Stats are read back from the store
+        assert len(recorder.stats["messages"]) == 1
+        assert recorder.stats["messages"][0]["event_type"] == "create"
+
+def test_event_recorder_finalize_does_not_load_history(tmp_path):
+    """Test finalize appends without reading the existing history"""
+    events_dir = tmp_path / "events"
+    events_dir.mkdir()
+    segment = events_dir / "2025-07-05.ndjson"
+    segment.write_text('{"event_type": "create"}\n' * 3, encoding="utf-8")
+    with patch('translator.services.event_store.EVENTS_DIR', str(events_dir)), \
+         patch('translator.services.event_logger.load_events') as mock_load:
+        recorder = EventRecorder()
+        recorder.set(timestamp="2025-07-05T11:00:00+00:00", event_type="create")
+        recorder.finalize()
+        mock_load.assert_not_called()
+    assert len(segment.read_text(encoding="utf-8").splitlines()) == 4
+
+def test_event_recorder_finalize_auto_event_type(tmp_path):
     """Test event_type is automatically set in finalize"""
-    recorder = EventRecorder()
-    recorder.set(
-        timestamp="2025-07-05",
-        event_type=None,  # Let it be auto-determined
-        edit_timestamp="2025-07-05",  # This should make it an edit event
-        source_channel_id="123",
-        dest_channel_id="456"
-    )
-    
-    with patch('builtins.open', mock_open()):
+    with patch('translator.services.event_store.EVENTS_DIR', str(tmp_path / "events")):
+        recorder = EventRecorder()
+        recorder.set(
+            timestamp="2025-07-05",
+            event_type=None,  # Let it be auto-determined
+            edit_timestamp="2025-07-05",  # This should make it an edit event
+            source_channel_id="123",
+            dest_channel_id="456"
+        )
+
+        recorder.finalize()
+
+        assert recorder.stats["messages"][-1]["event_type"] == "edit"
+
+def test_event_recorder_rewrite(tmp_path):
+    """Test rewrite replaces the whole history"""
+    with patch('translator.services.event_store.EVENTS_DIR', str(tmp_path / "events")), \
+         patch('translator.services.event_logger.ROLLUPS_PATH', str(tmp_path / "rollups.json")):
+        recorder = EventRecorder()
+        recorder.set(timestamp="2025-07-05", event_type="create")
         recorder.finalize()
-        
-    assert recorder.stats["messages"][-1]["event_type"] == "edit"
+        recorder.rewrite([
+            {"timestamp": "2025-07-01", "message_id": "1"},
+            {"timestamp": "2025-07-02", "message_id": "2"},
+        ])
+        assert [m["message_id"] for m in recorder.stats["messages"]] == ["1", "2"]
+        assert [m["message_id"] for m in EventRecorder().stats["messages"]] == ["1", "2"]
+        assert json.loads((tmp_path / "rollups.json").read_text())["totals"]["latest_timestamp"] == "2025-07-02"
 
 def test_get_channel_cache_success(mock_channel_cache):
     """Test successful channel cache retrieval"""
@@ -155,3 +188,27 @@ def test_event_recorder_str_representation():
     str_repr = str(recorder)
     assert "event_type: 'create'" in str_repr
     assert "timestamp: '2025-07-05'" in str_repr
+
+@pytest.mark.asyncio
+async def test_event_contexts_do_not_mix_under_concurrency(tmp_path):
+    """Overlapping handlers each record into their own context"""
+    import asyncio
+    with patch('translator.services.event_store.EVENTS_DIR', str(tmp_path / "events")):
+        recorder = EventRecorder()
+
+        async def handle(msg_id, delay):
+            rec = recorder.context()
+            rec.set(timestamp="2025-07-05T10:00:00+00:00", event_type="create",
+                    message_id=str(msg_id), source_channel_id="-1")
+            await asyncio.sleep(delay)
+            rec.set(dest_message_id=str(msg_id * 10), posting_success=True)
+            rec.finalize()
+
+        await asyncio.gather(handle(1, 0.02), handle(2, 0.0), handle(3, 0.01))
+        events = recorder.store.read_events()
+
+    assert sorted((e["message_id"], e["dest_message_id"]) for e in events) == [
+        ("1", "10"), ("2", "20"), ("3", "30"),
+    ]
+    # The recorder's own payload is untouched
+    assert recorder.payload["message_id"] == ""
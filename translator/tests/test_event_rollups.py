@@ -0,0 +1,93 @@
+import json
+
+from translator.services.event_rollups import EventRollups, load_rollups, read_rollups
+from translator.services.event_segments import SegmentedEventLog
+from translator.services.event_writer import EventWriter
+
+
+def _evt(ts, success=True, latency=1.0, size=100, event_type="create",
+         src="Source", dest="Dest"):
+    return {
+        "timestamp": ts,
+        "event_type": event_type,
+        "source_channel_name": src,
+        "dest_channel_name": dest,
+        "posting_success": success,
+        "translation_time": latency,
+        "original_size": size,
+    }
+
+
+EVENTS = [
+    _evt("2025-07-07T10:15:00+00:00", latency=1.0, size=100),  # Monday
+    _evt("2025-07-07T10:45:00+00:00", success=False, latency=3.0, size=300),
+    _evt("2025-07-08T23:00:00+00:00", event_type="edit", src="Other"),
+]
+
+
+def test_kpis_match_full_scan(tmp_path):
+    rollups = EventRollups(str(tmp_path / "rollups.json"))
+    rollups.add_many(EVENTS)
+    stats = rollups.kpis()
+    assert stats["total_posts"] == 3
+    assert stats["successful_posts"] == 2
+    assert stats["failed_posts"] == 1
+    assert stats["error_count"] == 1
+    assert stats["success_rate"] == 66.7
+    assert stats["avg_latency"] == round(5.0 / 3, 2)
+    assert stats["avg_msg_size"] == 167
+    assert stats["latest_timestamp"] == "2025-07-08T23:00:00+00:00"
+    assert stats["busiest_pair"] == "Source → Dest"
+    assert stats["busiest_pair_percent"] == 67
+
+
+def test_day_and_hour_buckets(tmp_path):
+    rollups = EventRollups(str(tmp_path / "rollups.json"))
+    rollups.add_many(EVENTS)
+    assert rollups.day("2025-07-07")["count"] == 2
+    assert rollups.day("2025-07-08")["channels"] == {"Other": 1}
+    assert rollups.day("2025-07-09")["count"] == 0
+    # edits are not part of the heatmap
+    assert rollups.hours_of_week(["2025-07-07", "2025-07-08"]) == {("10", "Mon"): 2}
+
+
+def test_update_persists_and_reloads_after_external_rebuild(tmp_path):
+    path = str(tmp_path / "rollups.json")
+    rollups = EventRollups(path)
+    rollups.update(EVENTS[:1])
+    assert read_rollups(path).kpis()["total_posts"] == 1
+
+    # Another process (admin edit) rebuilds the file from a new history
+    EventRollups(path).rebuild(EVENTS[1:])
+    rollups.update([EVENTS[0]])
+    assert read_rollups(path).kpis()["total_posts"] == 3
+
+
+def test_read_rollups_missing_or_outdated(tmp_path):
+    path = tmp_path / "rollups.json"
+    assert read_rollups(str(path)) is None
+    path.write_text(json.dumps({"version": 0}))
+    assert read_rollups(str(path)) is None
+
+
+def test_load_rollups_rebuilds_and_catches_up(tmp_path):
+    store = SegmentedEventLog(str(tmp_path / "events"), fsync=False)
+    path = str(tmp_path / "rollups.json")
+    store.append_many(EVENTS[:2])
+    assert load_rollups(store, path).kpis()["total_posts"] == 2
+
+    # Committed but not counted, e.g. a crash between the two writes
+    store.append(EVENTS[2])
+    rollups = load_rollups(store, path)
+    assert rollups.kpis()["total_posts"] == 3
+    assert read_rollups(path).kpis()["total_posts"] == 3
+
+
+def test_writer_updates_rollups_on_commit(tmp_path):
+    store = SegmentedEventLog(str(tmp_path / "events"), fsync=False)
+    rollups = EventRollups(str(tmp_path / "rollups.json"))
+    writer = EventWriter(store, max_batch=10, max_delay=60, on_commit=rollups.update).start()
+    for evt in EVENTS:
+        writer.submit(evt)
+    writer.close(timeout=5)
+    assert read_rollups(rollups.path).kpis()["total_posts"] == 3
@@ -0,0 +1,120 @@
+import os
+import gzip
+import json
+from datetime import date
+from unittest.mock import patch
+from translator.services.event_segments import SegmentedEventLog, event_day
+
+
+def make_event(day, n, **extra):
+    return {
+        "timestamp": f"{day}T10:00:0{n}+00:00",
+        "message_id": f"{day}-{n}",
+        "source_message": "<b>src</b>",
+        "translated_message": "<b>dst</b>",
+        "original_size": 10,
+        "translation_time": 1.25,
+        **extra,
+    }
+
+
+def test_event_day_uses_utc():
+    assert event_day({"timestamp": "2025-07-05T23:30:00-02:00"}) == "2025-07-06"
+    assert event_day({"timestamp": "2025-06-04T09:33:03"}) == "2025-06-04"
+
+
+def test_append_splits_by_day(tmp_path):
+    log = SegmentedEventLog(str(tmp_path))
+    log.append_many([make_event("2025-07-01", 1), make_event("2025-07-02", 1)])
+    log.append(make_event("2025-07-02", 2))
+    assert sorted(os.listdir(tmp_path)) == ["2025-07-01.ndjson", "2025-07-02.ndjson"]
+    assert [e["message_id"] for e in log.read_events()] == [
+        "2025-07-01-1", "2025-07-02-1", "2025-07-02-2",
+    ]
+
+
+def test_window_opens_only_overlapping_segments(tmp_path):
+    log = SegmentedEventLog(str(tmp_path))
+    log.append_many([make_event(f"2025-07-0{d}", 1) for d in range(1, 6)])
+    opened = []
+    real = SegmentedEventLog._iter_segment
+
+    def spy(path):
+        opened.append(os.path.basename(path))
+        return real(path)
+
+    with patch.object(SegmentedEventLog, "_iter_segment", staticmethod(spy)):
+        result = log.query(since="2025-07-03", until="2025-07-05")
+    assert [e["message_id"] for e in result] == ["2025-07-03-1", "2025-07-04-1"]
+    assert opened == ["2025-07-03.ndjson", "2025-07-04.ndjson"]
+
+
+def test_compact_rotates_finished_days(tmp_path):
+    log = SegmentedEventLog(str(tmp_path))
+    log.append_many([make_event("2025-07-01", 1), make_event("2025-07-10", 1)])
+    assert log.compact(today=date(2025, 7, 10)) == 1
+    assert sorted(os.listdir(tmp_path)) == ["2025-07-01.ndjson.gz", "2025-07-10.ndjson"]
+    compacted = tmp_path / "2025-07-01.ndjson.gz"
+    assert oct(compacted.stat().st_mode & 0o777) == oct(0o444)
+    with gzip.open(compacted, "rt", encoding="utf-8") as f:
+        assert json.loads(f.readline())["source_message"] == "<b>src</b>"
+    # Nothing left to do on a second run
+    assert log.compact(today=date(2025, 7, 10)) == 0
+    assert len(log.read_events()) == 2
+
+
+def test_compact_retention_drops_bodies_keeps_numbers(tmp_path):
+    log = SegmentedEventLog(str(tmp_path))
+    log.append_many([make_event("2025-06-01", 1), make_event("2025-07-09", 1)])
+    log.compact(retention_days=30, today=date(2025, 7, 10))
+    assert sorted(os.listdir(tmp_path)) == ["2025-06-01.lite.ndjson.gz", "2025-07-09.ndjson.gz"]
+    old, recent = log.read_events()
+    assert old["source_message"] == "" and old["translated_message"] == ""
+    assert old["original_size"] == 10 and old["translation_time"] == 1.25
+    assert recent["source_message"] == "<b>src</b>"
+
+
+def test_late_event_is_merged_into_compacted_day(tmp_path):
+    log = SegmentedEventLog(str(tmp_path))
+    log.append(make_event("2025-07-01", 1))
+    log.compact(today=date(2025, 7, 10))
+    log.append(make_event("2025-07-01", 2))
+    # The compacted data is read before the late active segment
+    assert [e["message_id"] for e in log.read_events()] == ["2025-07-01-1", "2025-07-01-2"]
+    log.compact(today=date(2025, 7, 10))
+    assert os.listdir(tmp_path) == ["2025-07-01.ndjson.gz"]
+    assert len(log.read_events()) == 2
+
+
+def test_rewrite_replaces_compacted_segments(tmp_path):
+    log = SegmentedEventLog(str(tmp_path))
+    log.append_many([make_event("2025-07-01", 1), make_event("2025-07-02", 1)])
+    log.compact(today=date(2025, 7, 10))
+    log.rewrite([make_event("2025-07-02", 1)])
+    assert os.listdir(tmp_path) == ["2025-07-02.ndjson"]
+
+
+def test_tail_spans_segments_and_polls_with_cursor(tmp_path):
+    log = SegmentedEventLog(str(tmp_path))
+    log.append_many([make_event("2025-07-01", i) for i in range(1, 4)])
+    log.compact(today=date(2025, 7, 2))
+    log.append_many([make_event("2025-07-02", 1)])
+
+    events, cursor = log.tail(2)
+    assert [e["message_id"] for e in events] == ["2025-07-01-3", "2025-07-02-1"]
+    assert log.read_since(cursor) == ([], cursor)
+
+    log.append_many([make_event("2025-07-02", 2), make_event("2025-07-03", 1)])
+    new, cursor = log.read_since(cursor)
+    assert [e["message_id"] for e in new] == ["2025-07-02-2", "2025-07-03-1"]
+    assert log.read_since(cursor)[0] == []
+
+
+def test_tail_of_compacted_only_history(tmp_path):
+    log = SegmentedEventLog(str(tmp_path))
+    log.append_many([make_event("2025-07-01", 1)])
+    log.compact(today=date(2025, 7, 2))
+    events, cursor = log.tail(10)
+    assert [e["message_id"] for e in events] == ["2025-07-01-1"]
+    log.append_many([make_event("2025-07-02", 1)])
+    assert [e["message_id"] for e in log.read_since(cursor)[0]] == ["2025-07-02-1"]
@@ -0,0 +1,145 @@
+import json
+import sqlite3
+from datetime import date
+import pytest
+from unittest.mock import patch
+from translator.services.event_store import (
+    SqliteEventStore,
+    migrate_into_store,
+    open_event_store,
+    query_events,
+)
+from translator.services.event_log import EventLog
+from translator.services.event_segments import SegmentedEventLog
+
+
+def make_event(i, channel="-100", dest="-200", ts=None):
+    return {
+        "timestamp": ts or f"2025-07-0{i}T10:00:00+00:00",
+        "event_type": "create",
+        "source_channel_id": channel,
+        "message_id": str(i),
+        "dest_channel_id": dest,
+        "dest_message_id": str(100 + i),
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = SqliteEventStore(str(tmp_path / "events.sqlite3"))
+    yield s
+    s.close()
+
+
+def test_sqlite_store_uses_wal(store):
+    store.append(make_event(1))
+    conn = sqlite3.connect(store.path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+
+def test_sqlite_store_append_and_read(store):
+    store.append_many([make_event(1), make_event(2)])
+    store.append(make_event(3))
+    assert [e["message_id"] for e in store.read_events()] == ["1", "2", "3"]
+    assert store.count() == 3
+
+
+def test_sqlite_store_query_filters(store):
+    store.append_many([
+        make_event(1, channel="-100"),
+        make_event(2, channel="-101", dest="-201"),
+        make_event(3, channel="-100"),
+    ])
+    # int ids match string ids
+    assert [e["message_id"] for e in store.query(source_channel_id=-100)] == ["1", "3"]
+    assert [e["message_id"] for e in store.query(source_channel_id="-100", message_id=3)] == ["3"]
+    assert [e["message_id"] for e in store.query(dest_channel_id="-201")] == ["2"]
+
+
+def test_sqlite_store_query_range_and_limit(store):
+    store.append_many([make_event(i) for i in range(1, 6)])
+    ranged = store.query(since="2025-07-02", until="2025-07-04")
+    assert [e["message_id"] for e in ranged] == ["2", "3"]
+    newest = store.query(limit=2, newest_first=True)
+    assert [e["message_id"] for e in newest] == ["5", "4"]
+
+
+def test_sqlite_store_matches_ndjson_query(store, tmp_path):
+    events = [make_event(i, channel="-100" if i % 2 else "-101") for i in range(1, 7)]
+    log = EventLog(str(tmp_path / "events.ndjson"))
+    log.append_many(events)
+    store.append_many(events)
+    for filters in (
+        {"source_channel_id": "-100"},
+        {"since": "2025-07-03", "limit": 2},
+        {"newest_first": True, "limit": 3},
+    ):
+        assert log.query(**filters) == store.query(**filters)
+
+
+def test_sqlite_store_rewrite(store):
+    store.append_many([make_event(1), make_event(2)])
+    store.rewrite([make_event(3)])
+    assert [e["message_id"] for e in store.read_events()] == ["3"]
+
+
+def test_open_event_store_kinds():
+    assert isinstance(open_event_store("sqlite"), SqliteEventStore)
+    assert isinstance(open_event_store("ndjson"), SegmentedEventLog)
+
+
+def test_migrate_into_store(store, tmp_path):
+    log_path = tmp_path / "events.ndjson"
+    EventLog(str(log_path)).append_many([make_event(1), make_event(2)])
+    with patch("translator.services.event_store.EVENTS_LOG_PATH", str(log_path)):
+        assert migrate_into_store(store) == 2
+        # Store no longer empty: second run is a no-op
+        assert migrate_into_store(store) == 0
+    assert store.count() == 2
+
+
+def test_migrate_segments_into_sqlite(store, tmp_path):
+    segments = SegmentedEventLog(str(tmp_path / "events"))
+    segments.append_many([make_event(1), make_event(2), make_event(3)])
+    # Finished days are gzip segments, today's is still active
+    assert segments.compact(today=date(2025, 7, 3)) == 2
+    with patch("translator.services.event_store.EVENTS_DIR", segments.directory), \
+         patch("translator.services.event_store.EVENTS_LOG_PATH", str(tmp_path / "none.ndjson")):
+        assert migrate_into_store(store) == 3
+        assert migrate_into_store(store) == 0
+    assert [e["message_id"] for e in store.read_events()] == ["1", "2", "3"]
+
+
+def test_query_events_falls_back_to_legacy(tmp_path):
+    legacy = tmp_path / "events.json"
+    legacy.write_text(json.dumps({"messages": [make_event(1), make_event(2)]}), encoding="utf-8")
+    missing = SqliteEventStore(str(tmp_path / "missing.sqlite3"))
+    with patch("translator.services.event_store.EVENTS_LOG_PATH", str(tmp_path / "events.ndjson")), \
+         patch("translator.services.event_store.EVENTS_PATH", str(legacy)):
+        result = query_events(missing, message_id="2")
+    assert [e["message_id"] for e in result] == ["2"]
+    # Reading must not create the database
+    assert not missing.exists()
+
+
+def test_sqlite_store_compact_strips_old_bodies(store):
+    old = dict(make_event(1), source_message="src", translated_message="dst", translation_time=1.5)
+    new = dict(make_event(9), source_message="src", translated_message="dst")
+    store.append_many([old, new])
+    assert store.compact(retention_days=5, today=date(2025, 7, 10)) == 1
+    stripped, kept = store.read_events()
+    assert stripped["source_message"] == "" and stripped["translated_message"] == ""
+    assert stripped["translation_time"] == 1.5
+    assert kept["source_message"] == "src"
+
+
+def test_sqlite_store_tail_and_cursor(store):
+    store.append_many([make_event(i) for i in range(1, 6)])
+    events, cursor = store.tail(2)
+    assert [e["message_id"] for e in events] == ["4", "5"]
+    assert store.read_since(cursor) == ([], cursor)
+    store.append(make_event(6))
+    new, cursor = store.read_since(cursor)
+    assert [e["message_id"] for e in new] == ["6"]
+    assert cursor == "6"
@@ -0,0 +1,177 @@
+import time
+import threading
+from unittest.mock import patch
+
+from translator.services.event_logger import EventRecorder
+from translator.services.event_segments import SegmentedEventLog
+from translator.services.event_writer import EventWriter
+from translator.services.blob_store import BlobStore
+
+
+class FakeStore:
+    def __init__(self, fail=0):
+        self.batches = []
+        self.appended = []
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def append(self, evt):
+        self.appended.append(evt)
+
+    def append_many(self, events):
+        with self.lock:
+            if self.fail:
+                self.fail -= 1
+                raise OSError("disk full")
+            self.batches.append(list(events))
+
+    @property
+    def events(self):
+        return [e for batch in self.batches for e in batch]
+
+
+def test_batches_up_to_max_batch():
+    store = FakeStore()
+    writer = EventWriter(store, max_batch=3, max_delay=10).start()
+    for i in range(7):
+        writer.submit({"n": i})
+    assert writer.flush(timeout=5)
+    writer.close()
+    assert [e["n"] for e in store.events] == list(range(7))
+    assert all(len(b) <= 3 for b in store.batches)
+    assert writer.committed == 7
+
+
+def test_commits_after_max_delay():
+    store = FakeStore()
+    writer = EventWriter(store, max_batch=100, max_delay=0.05).start()
+    writer.submit({"n": 1})
+    deadline = time.monotonic() + 5
+    while not store.batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store.events == [{"n": 1}]
+    writer.close()
+
+
+def test_close_flushes_pending_events():
+    store = FakeStore()
+    writer = EventWriter(store, max_batch=1000, max_delay=60).start()
+    for i in range(5):
+        writer.submit({"n": i})
+    writer.close(timeout=5)
+    assert not writer.running
+    assert len(store.events) == 5
+
+
+def test_full_buffer_drops_instead_of_blocking():
+    store = FakeStore()
+    release = threading.Event()
+    store_append_many = store.append_many
+
+    def slow_append_many(events):
+        release.wait(5)
+        store_append_many(events)
+
+    store.append_many = slow_append_many
+    writer = EventWriter(store, max_batch=1, max_delay=0, max_buffer=2).start()
+    writer.submit({"n": 0})
+    # The writer thread is stuck in the first commit; two fit in the buffer
+    deadline = time.monotonic() + 5
+    while writer._queue.qsize() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    start = time.monotonic()
+    for i in range(1, 5):
+        writer.submit({"n": i})
+    assert time.monotonic() - start < 1
+    assert writer.overflowed == 2
+    release.set()
+    assert writer.flush(timeout=5)
+    writer.close()
+    assert [e["n"] for e in store.events] == [0, 1, 2]
+
+
+def test_flush_times_out_while_the_disk_is_stuck():
+    store = FakeStore()
+    release = threading.Event()
+    store_append_many = store.append_many
+    store.append_many = lambda events: (release.wait(5), store_append_many(events))
+    writer = EventWriter(store, max_batch=1, max_delay=0).start()
+    writer.submit({"n": 1})
+    assert writer.flush(timeout=0.05) is False
+    release.set()
+    assert writer.flush(timeout=5) is True
+    writer.close()
+
+
+def test_submit_without_thread_writes_directly():
+    store = FakeStore()
+    writer = EventWriter(store)
+    writer.submit({"n": 1})
+    assert store.appended == [{"n": 1}]
+    assert writer.flush() is True
+
+
+def test_failed_commit_is_retried():
+    store = FakeStore(fail=1)
+    writer = EventWriter(store, max_batch=1, max_delay=0).start()
+    writer.submit({"n": 1})
+    writer.close(timeout=5)
+    assert store.events == [{"n": 1}]
+    assert writer.dropped == 0
+
+
+def test_recorder_finalize_goes_through_writer(tmp_path):
+    with patch("translator.services.event_store.EVENTS_DIR", str(tmp_path / "events")):
+        recorder = EventRecorder()
+    writer = EventWriter(recorder.store, max_batch=10, max_delay=60).start()
+    recorder.writer = writer
+    recorder.set(event_type="create", source_channel_id="-1", message_id=1,
+                 timestamp="2024-01-01T00:00:00+00:00")
+    recorder.finalize()
+    writer.close(timeout=5)
+    events = SegmentedEventLog(str(tmp_path / "events")).read_events()
+    assert [e["message_id"] for e in events] == [1]
+
+
+def test_prepare_runs_on_the_writer_thread():
+    store = FakeStore()
+    threads = []
+
+    def prepare(evt):
+        threads.append(threading.current_thread().name)
+        return {**evt, "prepared": True}
+
+    writer = EventWriter(store, max_batch=2, max_delay=60, prepare=prepare).start()
+    writer.submit({"n": 1})
+    writer.submit({"n": 2})
+    writer.close(timeout=5)
+    assert store.events == [{"n": 1, "prepared": True}, {"n": 2, "prepared": True}]
+    assert threads == ["event-writer", "event-writer"]
+
+
+def test_recorder_moves_bodies_to_blobs_in_the_writer(tmp_path):
+    with patch("translator.services.event_store.EVENTS_DIR", str(tmp_path / "events")):
+        recorder = EventRecorder()
+    recorder.blobs = BlobStore(str(tmp_path / "blobs"))
+    puts = []
+    put = recorder.blobs.put
+
+    def recording_put(text):
+        puts.append(threading.current_thread().name)
+        return put(text)
+
+    recorder.blobs.put = recording_put
+    writer = EventWriter(
+        recorder.store, max_batch=10, max_delay=60, prepare=recorder.externalize
+    ).start()
+    recorder.writer = writer
+    recorder.set(event_type="create", source_channel_id="-1", message_id=1,
+                 timestamp="2024-01-01T00:00:00+00:00", source_message="Привет")
+    recorder.finalize()
+    # Nothing was written on the caller's thread
+    assert puts == []
+    writer.close(timeout=5)
+    assert puts == ["event-writer"]
+    events = SegmentedEventLog(str(tmp_path / "events")).read_events()
+    assert events[0]["source_message"] == ""
+    assert events[0]["source_message_hash"]
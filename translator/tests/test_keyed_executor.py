@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from translator.utils.keyed_executor import KeyedExecutor
+
+
+@pytest.mark.asyncio
+async def test_jobs_of_one_key_run_in_order():
+    executor = KeyedExecutor(max_concurrency=4)
+    done = []
+
+    async def job(n, delay):
+        await asyncio.sleep(delay)
+        done.append(n)
+        return n
+
+    futures = [executor.submit("a", job, n, 0.02 - n * 0.005) for n in range(4)]
+    assert await asyncio.gather(*futures) == [0, 1, 2, 3]
+    assert done == [0, 1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_keys_run_in_parallel():
+    executor = KeyedExecutor(max_concurrency=4)
+    done = []
+
+    async def job(key, delay):
+        await asyncio.sleep(delay)
+        done.append(key)
+
+    executor.submit("slow", job, "slow", 0.05)
+    executor.submit("fast", job, "fast", 0)
+    assert await executor.join(1)
+    # The slow channel does not hold back the other one
+    assert done == ["fast", "slow"]
+
+
+@pytest.mark.asyncio
+async def test_global_and_per_key_limits():
+    executor = KeyedExecutor(max_concurrency=2, per_key_concurrency=2)
+    running = 0
+    peak = 0
+
+    async def job():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    for key in ("a", "b", "c"):
+        for _ in range(3):
+            executor.submit(key, job)
+    assert await executor.join(1)
+    assert peak == 2
+    assert executor.queued() == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_job_does_not_block_its_key():
+    executor = KeyedExecutor()
+
+    async def boom():
+        raise RuntimeError("boom")
+
+    async def ok():
+        return "ok"
+
+    failed = executor.submit("a", boom)
+    assert await executor.run("a", ok) == "ok"
+    with pytest.raises(RuntimeError):
+        await failed
+
+
+@pytest.mark.asyncio
+async def test_join_times_out():
+    executor = KeyedExecutor()
+    executor.submit("a", asyncio.sleep, 1)
+    assert await executor.join(0.01) is False
@@ -1,103 +1,131 @@
 import pytest
 import json
-import os
-from pathlib import Path
-from translator.config import CONFIG, EVENTS_PATH
-import logging
+from translator.config import CONFIG
+from translator.services import message_map
+from translator.services.message_map import MessageMap, record_mapping
 
-def test_get_destination_msg_id_basic(tmp_path, monkeypatch):
+
+@pytest.fixture
+def mapping(tmp_path, monkeypatch):
+    """Install an empty mapping index backed by a temporary journal"""
+    mm = MessageMap(str(tmp_path / "message_map.tsv"))
+    monkeypatch.setattr(message_map, "_message_map", mm)
+    monkeypatch.setattr(message_map, "MESSAGE_MAP_PATH", mm.path)
+    return mm
+
+
+def test_get_destination_msg_id_basic(mapping):
     """Test basic message ID mapping functionality"""
-    # Create a temporary events.json for testing
-    events_data = {
-        "messages": [
-            {
-                "source_channel_id": "-1002657093374",  # Match real channel ID format
-                "message_id": "100",
-                "dest_message_id": "200",
-                "event_type": "create"
-            },
-            {
-                "source_channel_id": "-1002657093374",
-                "message_id": "100",
-                "dest_message_id": "201",  # More recent mapping
-                "event_type": "edit"
-            }
-        ]
-    }
-    
-    events_path = tmp_path / "events.json"
-    with open(events_path, "w", encoding="utf-8") as f:
-        json.dump(events_data, f, indent=2)
-
-    # Mock EVENTS_PATH directly in config module
-    monkeypatch.setattr('translator.config.EVENTS_PATH', str(events_path))
-    
+    mapping.rebuild([
+        {
+            "source_channel_id": "-1002657093374",  # Match real channel ID format
+            "message_id": "100",
+            "dest_message_id": "200",
+            "event_type": "create"
+        },
+        {
+            "source_channel_id": "-1002657093374",
+            "message_id": "100",
+            "dest_message_id": "201",  # More recent mapping
+            "event_type": "edit"
+        }
+    ])
+
     # Should return the most recent mapping (201)
     result = CONFIG.get_destination_msg_id(-1002657093374, "100")
     assert result == "201", f"Expected dest_message_id '201' but got {result}"
 
 
-def test_get_destination_msg_id_edge_cases(tmp_path, monkeypatch):
+def test_get_destination_msg_id_edge_cases(mapping):
     """Test various edge cases for message ID mapping"""
-    events_data = {
-        "messages": [
-            {
-                "source_channel_id": "-1002657093374",
-                "message_id": "100",
-                "dest_message_id": "200",
-                "event_type": "create"
-            },
-            {
-                "source_channel_id": "-1002657093374",
-                "message_id": "101",
-                "dest_message_id": None,  # Test null dest_message_id
-                "event_type": "create"
-            }
-        ]
-    }
-    
-    events_path = tmp_path / "events.json"
-    with open(events_path, "w", encoding="utf-8") as f:
-        json.dump(events_data, f, indent=2)
-
-    monkeypatch.setattr('translator.config.EVENTS_PATH', str(events_path))
-    
+    mapping.rebuild([
+        {
+            "source_channel_id": "-1002657093374",
+            "message_id": "100",
+            "dest_message_id": "200",
+            "event_type": "create"
+        },
+        {
+            "source_channel_id": "-1002657093374",
+            "message_id": "101",
+            "dest_message_id": None,  # Test null dest_message_id
+            "event_type": "create"
+        }
+    ])
+
     # Non-existent message should return None
     assert CONFIG.get_destination_msg_id(-1002657093374, "999") is None
-    
+
     # Invalid source channel should return None
     assert CONFIG.get_destination_msg_id(-999999999999, "100") is None
-    
+
     # Message with null dest_message_id should return None
     assert CONFIG.get_destination_msg_id(-1002657093374, "101") is None
 
     # Invalid input types should raise ValueError
     with pytest.raises(ValueError):
         CONFIG.get_destination_msg_id("not_an_int", "100")  # type: ignore
-    
+
     with pytest.raises(ValueError):
         CONFIG.get_destination_msg_id(-1002657093374, "")  # Empty message_id
 
 
-def test_get_destination_msg_id_file_handling(tmp_path, monkeypatch):
-    """Test file handling edge cases"""
-    events_path = tmp_path / "nonexistent.json"
-    monkeypatch.setattr('translator.config.EVENTS_PATH', str(events_path))
+def test_mapping_journal_roundtrip(tmp_path):
+    """The journal reloads to the same index and tolerates a torn last line"""
+    path = tmp_path / "message_map.tsv"
+    mm = MessageMap(str(path))
+    mm.rebuild([{"source_channel_id": -1, "message_id": 1, "dest_message_id": 10}])
+    mm.add(-1, 2, 20)
+    mm.add(-1, 2, 21)
+    with open(path, "ab") as f:
+        f.write(b"-1\t3\t3")  # interrupted write
+
+    reloaded = MessageMap(str(path))
+    assert reloaded.load()
+    assert reloaded.get(-1, 1) == "10"
+    assert reloaded.get_all(-1, 2) == ["20", "21"]
+    assert reloaded.get(-1, 3) is None
+
+
+def test_mapping_sees_lines_from_other_process(tmp_path):
+    """A miss re-reads lines appended to the journal by another writer"""
+    path = tmp_path / "message_map.tsv"
+    mm = MessageMap(str(path))
+    mm.rebuild([])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("-1\t5\t50\n")
+    assert mm.get(-1, 5) == "50"
+
+
+def test_record_mapping_only_successful_sends(mapping):
+    mapping.rebuild([])
+    record_mapping({"source_channel_id": -1, "message_id": 7, "dest_message_id": 70,
+                    "posting_success": False})
+    assert mapping.get(-1, 7) is None
+    record_mapping({"source_channel_id": -1, "message_id": 7, "dest_message_id": 71,
+                    "posting_success": True})
+    assert CONFIG.get_destination_msg_id(-1, "7") == "71"
 
-    # Missing file should return None
-    assert CONFIG.get_destination_msg_id(-1002657093374, "100") is None
 
-    # Create invalid JSON file
-    with open(events_path, "w") as f:
-        f.write("{ invalid json }")
+def test_record_mapping_appends_when_not_loaded(tmp_path, monkeypatch):
+    path = tmp_path / "message_map.tsv"
+    MessageMap(str(path)).rebuild([])
+    monkeypatch.setattr(message_map, "_message_map", None)
+    monkeypatch.setattr(message_map, "MESSAGE_MAP_PATH", str(path))
+    record_mapping({"source_channel_id": -1, "message_id": 8, "dest_message_id": 80,
+                    "posting_success": True})
+    assert path.read_text(encoding="utf-8") == "-1\t8\t80\n"
 
-    # Invalid JSON should raise JSONDecodeError
-    with pytest.raises(json.JSONDecodeError):
-        CONFIG.get_destination_msg_id(-1002657093374, "100")
 
-    # Create empty but valid JSON
-    with open(events_path, "w") as f:
-        json.dump({"messages": []}, f)
+def test_get_message_map_rebuilds_from_history(tmp_path, monkeypatch):
+    log_path = tmp_path / "events.ndjson"
+    log_path.write_text(json.dumps({"source_channel_id": "-1", "message_id": "9",
+                                    "dest_message_id": "90"}) + "\n", encoding="utf-8")
+    monkeypatch.setattr(message_map, "_message_map", None)
+    monkeypatch.setattr(message_map, "MESSAGE_MAP_PATH", str(tmp_path / "message_map.tsv"))
+    monkeypatch.setattr("translator.services.event_store.EVENT_STORE", "ndjson")
+    monkeypatch.setattr("translator.services.event_store.EVENTS_DIR", str(tmp_path / "events"))
+    monkeypatch.setattr("translator.services.event_store.EVENTS_LOG_PATH", str(log_path))
 
-    # Empty messages list should return None
-    assert CONFIG.get_destination_msg_id(-1002657093374, "100") is None
+    assert message_map.get_message_map().get(-1, 9) == "90"
+    assert (tmp_path / "message_map.tsv").read_text(encoding="utf-8") == "-1\t9\t90\n"
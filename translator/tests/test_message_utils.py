@@ -40,3 +40,14 @@ def test_build_payload_includes_channel_link():
     )
     res = build_payload(m, "<b>Test</b>", {})
     assert "Source channel:" in res["Html"]
+
+
+def test_message_fingerprint_ignores_surrounding_whitespace_only():
+    from types import SimpleNamespace
+    from translator.utils.message_utils import message_fingerprint
+
+    bold = SimpleNamespace(type="MessageEntityType.BOLD", offset=0, length=3, url=None)
+    base = message_fingerprint("Hey there", [bold])
+    assert base == message_fingerprint(" Hey there\n", [{"type": "MessageEntityType.BOLD", "offset": 0, "length": 3}])
+    assert base != message_fingerprint("Hey there", [])
+    assert base != message_fingerprint("Hey there!", [bold])
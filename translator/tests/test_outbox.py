@@ -0,0 +1,55 @@
+from translator.services.outbox import Outbox
+
+
+def test_stages_survive_restart(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    outbox = Outbox(path)
+    first = outbox.receive(-100, 1, "new")
+    second = outbox.receive(-100, 2, "new")
+    outbox.translated(second, "<b>Hello</b>")
+    outbox.posted(outbox.receive(-100, 3, "new"))
+    outbox.discard(outbox.receive(-100, 4, "new"))
+    outbox.close()
+
+    outbox = Outbox(path)
+    assert outbox.incomplete() == [
+        (first, "-100", "1", "new", "received", None, None),
+        (second, "-100", "2", "new", "translated", "<b>Hello</b>", None),
+    ]
+
+
+def test_older_update_cannot_touch_a_newer_one(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.sqlite3"))
+    first_edit = outbox.receive(-100, 1, "edit")
+    post = outbox.receive(-100, 2, "new")
+    # A newer edit of the same post replaces the row and goes to the back
+    second_edit = outbox.receive(-100, 1, "edit")
+    assert second_edit != first_edit
+
+    # The first edit finishing later leaves the second one alone
+    outbox.translated(first_edit, "stale translation")
+    outbox.posted(first_edit)
+    outbox.discard(first_edit)
+    assert outbox.incomplete() == [
+        (post, "-100", "2", "new", "received", None, None),
+        (second_edit, "-100", "1", "edit", "received", None, None),
+    ]
+
+
+def test_posted_rows_are_pruned(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.sqlite3"))
+    outbox.posted(outbox.receive(-100, 1, "new"))
+    outbox.prune(keep_posted=3600)
+    assert outbox._connect().execute("SELECT COUNT(*) FROM outbox").fetchone()[0] == 1
+    outbox.prune(keep_posted=-1)
+    assert outbox._connect().execute("SELECT COUNT(*) FROM outbox").fetchone()[0] == 0
+
+
+def test_sent_update_keeps_its_destination(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.sqlite3"))
+    seq = outbox.receive(-100, 1, "new")
+    outbox.translated(seq, "<b>Hello</b>")
+    outbox.sent(seq, 77)
+    assert outbox.incomplete() == [(seq, "-100", "1", "new", "sent", None, "77")]
+    outbox.posted(seq)
+    assert outbox.incomplete() == []
@@ -0,0 +1,28 @@
+from translator.services.parked_messages import ParkedMessages
+
+
+def test_parked_updates_keep_order_and_survive_restart(tmp_path):
+    path = str(tmp_path / "parked.sqlite3")
+    parked = ParkedMessages(path)
+    parked.park(-100, 1, "new")
+    parked.park(-200, 5, "new")
+    parked.park(-100, 2, "new")
+    parked.park(-100, 1, "edit")
+    parked.close()
+
+    parked = ParkedMessages(path)
+    rows = parked.pending()
+    assert [(r[1], r[2], r[3]) for r in rows] == [
+        ("-100", "1", "new"),
+        ("-200", "5", "new"),
+        ("-100", "2", "new"),
+        ("-100", "1", "edit"),
+    ]
+    assert parked.has(-200) and not parked.has(-300)
+
+    # Parking again moves the update to the back; the old seq is gone
+    first_seq = rows[0][0]
+    parked.park(-100, 1, "new")
+    parked.remove(first_seq)
+    assert parked.count() == 4
+    assert parked.pending()[-1][1:] == ("-100", "1", "new")
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import pytest
+
+from translator.utils.rate_limiter import TelegramRateLimiter, TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_bucket_paces_to_rate_after_burst():
+    bucket = TokenBucket(rate=50, capacity=2)
+    start = time.monotonic()
+    for _ in range(7):
+        await bucket.acquire()
+    elapsed = time.monotonic() - start
+    # 2 immediately, then 5 more at 50/s
+    assert 0.08 <= elapsed < 0.3
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_in_arrival_order():
+    bucket = TokenBucket(rate=100, capacity=1)
+    order = []
+
+    async def take(n):
+        await bucket.acquire()
+        order.append(n)
+
+    await asyncio.gather(*(take(n) for n in range(5)))
+    assert order == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_chats_and_kinds_have_separate_buckets():
+    limiter = TelegramRateLimiter(global_rate=1000, chat_rate=1, chat_burst=1,
+                                  edit_chat_rate=1, edit_chat_burst=1)
+    await limiter.acquire("send", 1)
+    # Another chat, and an edit in the same chat, are not held back
+    assert await asyncio.wait_for(limiter.acquire("send", 2), 0.1) < 0.05
+    assert await asyncio.wait_for(limiter.acquire("edit", 1), 0.1) < 0.05
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(limiter.acquire("send", 1), 0.1)
+
+
+@pytest.mark.asyncio
+async def test_penalize_applies_flood_wait():
+    limiter = TelegramRateLimiter(global_rate=1000, chat_rate=1000, chat_burst=10)
+    limiter.penalize("send", 1, 0.1)
+    waited = await limiter.acquire("send", 1)
+    assert waited >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_sends_and_edits_share_the_global_limit():
+    limiter = TelegramRateLimiter(global_rate=2, chat_rate=1000, chat_burst=10,
+                                  edit_chat_rate=1000, edit_chat_burst=10)
+    await limiter.acquire("send", 1)
+    await limiter.acquire("send", 2)
+    # The global budget is spent, whatever the kind or chat
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(limiter.acquire("edit", 3), 0.1)
@@ -0,0 +1,24 @@
+from translator.services.source_versions import SourceVersions
+
+
+def test_channel_position_only_moves_forward(tmp_path):
+    path = str(tmp_path / "sources.sqlite3")
+    versions = SourceVersions(path)
+    assert versions.last_message_id(-100) is None
+    versions.advance(-100, 5)
+    versions.advance(-100, 3)
+    versions.advance("-200", 7)
+    versions.close()
+
+    versions = SourceVersions(path)
+    assert versions.last_message_id(-100) == 5
+    assert versions.last_message_id(-200) == 7
+
+
+def test_fingerprints_and_paragraphs_round_trip(tmp_path):
+    versions = SourceVersions(str(tmp_path / "sources.sqlite3"))
+    versions.remember(-100, 1, "abc")
+    versions.remember_paragraphs(-100, 1, ["a", "b"], ["A", "B"])
+    assert versions.fingerprint(-100, 1) == "abc"
+    assert versions.fingerprint(-100, 2) is None
+    assert versions.paragraphs(-100, 1) == (["a", "b"], ["A", "B"])
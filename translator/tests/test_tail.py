@@ -0,0 +1,56 @@
+from translator.utils.tail import read_since, tail_lines, tail_text
+
+
+def test_tail_lines_returns_last_n(tmp_path):
+    path = tmp_path / "bot.log"
+    path.write_bytes(b"".join(b"line %d\n" % i for i in range(1000)))
+    lines, end = tail_lines(str(path), 3)
+    assert lines == [b"line 997", b"line 998", b"line 999"]
+    assert end == path.stat().st_size
+
+
+def test_tail_lines_short_and_empty_files(tmp_path):
+    path = tmp_path / "bot.log"
+    assert tail_lines(str(path), 5) == ([], 0)
+    path.write_bytes(b"")
+    assert tail_lines(str(path), 5) == ([], 0)
+    path.write_bytes(b"\nonly\n")
+    assert tail_lines(str(path), 5) == ([b"", b"only"], 6)
+
+
+def test_tail_ignores_partial_last_line(tmp_path):
+    path = tmp_path / "events.ndjson"
+    path.write_bytes(b"a\nb\npartial")
+    lines, end = tail_lines(str(path), 5)
+    assert lines == [b"a", b"b"]
+    assert end == 4
+
+
+def test_read_since_cursor(tmp_path):
+    path = tmp_path / "bot.log"
+    path.write_bytes(b"one\ntwo\n")
+    _, offset = tail_lines(str(path), 10)
+    assert read_since(str(path), offset) == ([], offset)
+
+    with open(path, "ab") as f:
+        f.write(b"three\nfour\nfi")
+    lines, offset = read_since(str(path), offset)
+    assert lines == [b"three", b"four"]
+
+    with open(path, "ab") as f:
+        f.write(b"ve\n")
+    assert read_since(str(path), offset)[0] == [b"five"]
+
+
+def test_read_since_restarts_after_truncation(tmp_path):
+    path = tmp_path / "bot.log"
+    path.write_bytes(b"old line\n" * 10)
+    _, offset = tail_lines(str(path), 1)
+    path.write_bytes(b"new\n")
+    assert read_since(str(path), offset) == ([b"new"], 4)
+
+
+def test_tail_text_decodes(tmp_path):
+    path = tmp_path / "bot.log"
+    path.write_bytes("привет\n".encode("utf-8"))
+    assert tail_text(str(path), 1) == (["привет"], len("привет\n".encode("utf-8")))
@@ -1,8 +1,12 @@
+import time
 import pytest
-from unittest.mock import patch, MagicMock
-from translator.services.telegram_sender import TelegramSender
+from unittest.mock import patch, MagicMock, AsyncMock
+from translator.services.telegram_sender import TelegramSender, TelegramAPIError, checked
 from translator.models import ChannelConfig
 from translator.services.event_logger import EventRecorder
+from translator.services import message_map
+from translator.services.message_map import MessageMap
+from translator.utils.utils_async import RetryPolicy
 
 # Test configurations
 TEST_CHANNEL_ID = 123
@@ -25,7 +29,7 @@ def test_split_message_long():
 
 @pytest.mark.asyncio
 @patch("translator.config.CHANNEL_CONFIGS", {})
-@patch("requests.Session.post")
+@patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=MagicMock())
 async def test_send_message_unknown_channel(mock_post):
     sender = TelegramSender()
     recorder = EventRecorder()
@@ -39,7 +43,7 @@ async def test_send_message_unknown_channel(mock_post):
     "translator.config.CHANNEL_CONFIGS",
     {"test": ChannelConfig(channel_id=0, bot_token=TEST_BOT_TOKEN)},
 )
-@patch("requests.Session.post")
+@patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=MagicMock())
 async def test_send_message_no_channel_id(mock_post):
     sender = TelegramSender()
     recorder = EventRecorder()
@@ -53,7 +57,7 @@ async def test_send_message_no_channel_id(mock_post):
     "translator.config.CHANNEL_CONFIGS",
     {"test": ChannelConfig(channel_id=TEST_CHANNEL_ID, bot_token=TEST_BOT_TOKEN)},
 )
-@patch("requests.Session.post")
+@patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=MagicMock())
 async def test_send_message_api_error(mock_post):
     mock_post.return_value.status_code = 400
     mock_post.return_value.json.return_value = {"description": "fail"}
@@ -69,7 +73,7 @@ async def test_send_message_api_error(mock_post):
     "translator.config.CHANNEL_CONFIGS",
     {"test": ChannelConfig(channel_id=TEST_CHANNEL_ID, bot_token=TEST_BOT_TOKEN)},
 )
-@patch("requests.Session.post")
+@patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=MagicMock())
 async def test_send_message_success(mock_post):
     mock_post.return_value.status_code = 200
     mock_post.return_value.json.return_value = {"ok": True, "result": {"message_id": 123}}
@@ -78,3 +82,228 @@ async def test_send_message_success(mock_post):
     recorder.set(dest_channel_name="test", dest_channel_id=TEST_CHANNEL_ID)
     success = await sender.send_message("text", recorder)
     assert success
+
+
+def test_transport_pool_is_per_event_loop():
+    import asyncio
+    from translator.services.telegram_sender import TelegramTransport
+
+    transport = TelegramTransport(max_connections=4)
+
+    async def clients():
+        return transport._client(), transport._client()
+
+    first, again = asyncio.run(clients())
+    assert first is again
+    second, _ = asyncio.run(clients())
+    assert second is not first
+    # Each pool was closed when its loop shut down, not left open
+    assert first.is_closed
+    assert second.is_closed
+
+
+def test_pool_of_a_running_loop_is_closed_on_that_loop():
+    import asyncio
+    import threading
+    from translator.services.telegram_sender import TelegramTransport
+
+    transport = TelegramTransport(max_connections=4)
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever, daemon=True)
+    thread.start()
+
+    async def client():
+        return transport._client()
+
+    try:
+        first = asyncio.run_coroutine_threadsafe(client(), other).result(5)
+        asyncio.run(client())
+        deadline = time.monotonic() + 5
+        while not first.is_closed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert first.is_closed
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        thread.join(5)
+        other.close()
+
+
+def test_transport_close_releases_the_pool():
+    import asyncio
+    from translator.services.telegram_sender import TelegramTransport
+
+    transport = TelegramTransport(max_connections=4)
+
+    async def use_and_close():
+        client = transport._client()
+        await transport.close()
+        # Nothing left pending on the loop
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        await asyncio.sleep(0)
+        return client, [t for t in pending if not t.done()]
+
+    client, pending = asyncio.run(use_and_close())
+    assert client.is_closed
+    assert pending == []
+
+
+@pytest.mark.asyncio
+@patch(
+    "translator.config.CHANNEL_CONFIGS",
+    {"test": ChannelConfig(channel_id=TEST_CHANNEL_ID, bot_token=TEST_BOT_TOKEN)},
+)
+async def test_sends_to_different_channels_overlap():
+    import asyncio
+    in_flight, peak = 0, 0
+
+    async def slow_post(self, url, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"ok": True, "result": {"message_id": 1}}
+        return response
+
+    sender = TelegramSender()
+    recorders = []
+    for chat_id in (1, 2, 3):
+        recorder = EventRecorder()
+        recorder.set(dest_channel_name="test", dest_channel_id=chat_id)
+        recorders.append(recorder)
+    with patch("httpx.AsyncClient.post", slow_post):
+        results = await asyncio.gather(*(sender.send_message("hi", r) for r in recorders))
+    assert all(results)
+    assert peak == 3
+
+
+class _Recorder:
+    def __init__(self, **fields):
+        self.payload = dict(fields)
+
+    def set(self, **kwargs):
+        self.payload.update(kwargs)
+
+    def get(self, *fields):
+        values = [self.payload.get(f) for f in fields]
+        return values[0] if len(fields) == 1 else tuple(values)
+
+
+async def _texts(*values):
+    for value in values:
+        yield value
+
+
+@pytest.mark.asyncio
+async def test_publish_stream_posts_early_then_edits():
+    sender = TelegramSender()
+    calls = []
+
+    async def fake_post(url, *, data=None, json=None, timeout=None):
+        calls.append((url.rsplit("/", 1)[-1], json["text"]))
+        resp = MagicMock(status_code=200)
+        resp.json.return_value = {"result": {"message_id": 55}}
+        return True, resp, None
+
+    sender._post_telegram = fake_post
+    rec = _Recorder(dest_channel_name="dest", dest_channel_id=-1)
+    full = await sender.publish_stream(
+        _texts("<b>Hi", "<b>Hi</b>\n\nSecond", "<b>Hi</b>\n\nSecond para\n\nThi", "<b>Hi</b>\n\nSecond para\n\nThird"),
+        rec,
+        interval=0,
+    )
+    assert full == "<b>Hi</b>\n\nSecond para\n\nThird"
+    assert calls == [
+        ("sendMessage", "<b>Hi</b>"),
+        ("editMessageText", "<b>Hi</b>\n\nSecond para"),
+        ("editMessageText", "<b>Hi</b>\n\nSecond para\n\nThird"),
+    ]
+    assert rec.payload["dest_message_id"] == 55
+    assert rec.payload["posting_success"] is True
+
+
+@pytest.mark.asyncio
+async def test_partly_published_stream_keeps_its_mapping(monkeypatch, tmp_path):
+    mapping = MessageMap(str(tmp_path / "message_map.tsv"))
+    monkeypatch.setattr(message_map, "_message_map", mapping)
+    sender = TelegramSender()
+
+    async def fake_post(url, *, data=None, json=None, timeout=None):
+        resp = MagicMock(status_code=200)
+        resp.json.return_value = {"result": {"message_id": 55}}
+        return True, resp, None
+
+    async def dropped_stream():
+        yield "<b>Hi</b>\n\nSec"
+        raise ConnectionError("stream dropped")
+
+    sender._post_telegram = fake_post
+    rec = _Recorder(
+        dest_channel_name="dest", dest_channel_id=-1, source_channel_id=-7, message_id=3
+    )
+    with pytest.raises(ConnectionError):
+        await sender.publish_stream(dropped_stream(), rec, interval=0)
+    assert rec.payload["posting_success"] is False
+    # Edits of the source post can still reach the published part
+    assert mapping.get(-7, 3) == "55"
+
+
+@pytest.mark.asyncio
+async def test_publish_stream_stops_editing_past_length_limit():
+    sender = TelegramSender()
+    sender.MAX_MESSAGE_LENGTH = 20
+    calls = []
+
+    async def fake_post(url, *, data=None, json=None, timeout=None):
+        calls.append((url.rsplit("/", 1)[-1], json["text"]))
+        resp = MagicMock(status_code=200)
+        resp.json.return_value = {"result": {"message_id": len(calls)}}
+        return True, resp, None
+
+    sender._post_telegram = fake_post
+    rec = _Recorder(dest_channel_name="dest", dest_channel_id=-1)
+    long_text = "First line\n\nsecond line\nthird line"
+    await sender.publish_stream(_texts("First line\n\nsec", long_text + " more", long_text), rec, interval=0)
+    # One early post, no edits while over the limit, then the overflow as new messages
+    assert calls == [
+        ("sendMessage", "First line"),
+        ("sendMessage", "second line"),
+        ("sendMessage", "third line"),
+    ]
+    assert rec.payload["dest_message_id"] == 1
+
+
+@pytest.mark.asyncio
+async def test_flood_wait_response_pauses_the_chat():
+    limiter = MagicMock()
+    limiter.acquire = AsyncMock(return_value=0)
+    resp = MagicMock(status_code=429)
+    resp.json.return_value = {"ok": False, "description": "Too Many Requests", "parameters": {"retry_after": 7}}
+    transport = MagicMock()
+    transport.post = AsyncMock(return_value=resp)
+    sender = TelegramSender(transport=transport, limiter=limiter)
+
+    ok, _, err = await sender._post_telegram(
+        "https://api.telegram.org/botT/sendMessage", json={"chat_id": -5, "text": "x"}
+    )
+    assert not ok and err == "Too Many Requests"
+    limiter.acquire.assert_awaited_once_with("send", -5)
+    limiter.penalize.assert_called_once_with("send", -5, 7.0)
+
+    await sender._post_telegram("https://api.telegram.org/botT/getMe")
+    assert limiter.acquire.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_checked_raises_recorded_failure():
+    rec = EventRecorder()
+
+    async def failing_send(text, recorder):
+        recorder.set(api_error_code=429, exception_message="Too Many Requests: retry after 2")
+        return False
+
+    with pytest.raises(TelegramAPIError) as info:
+        await checked(failing_send, "hi", rec)
+    assert info.value.status_code == 429
+    assert RetryPolicy().classify(info.value) == (True, 2.0)
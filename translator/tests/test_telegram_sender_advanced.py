@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import patch, MagicMock, PropertyMock
+from unittest.mock import patch, MagicMock, PropertyMock, AsyncMock
 from translator.services.telegram_sender import TelegramSender
 from translator.models import ChannelConfig
 from translator.services.event_logger import EventRecorder
@@ -136,7 +136,7 @@ async def test_send_photo_message_success():
     )
     
     with patch("translator.services.telegram_sender.CHANNEL_CONFIGS", TEST_CONFIGS), \
-         patch("requests.Session.post") as mock_post:
+         patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=MagicMock()) as mock_post:
         mock_post.return_value.status_code = 200
         mock_post.return_value.json.return_value = {
             "ok": True,
@@ -166,7 +166,7 @@ async def test_send_photo_message_api_error():
     )
     
     with patch("translator.services.telegram_sender.CHANNEL_CONFIGS", TEST_CONFIGS), \
-         patch("requests.Session.post") as mock_post:
+         patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=MagicMock()) as mock_post:
         mock_post.return_value.status_code = 400
         mock_post.return_value.json.return_value = {
             "ok": False,
@@ -197,7 +197,7 @@ async def test_edit_message_success():
     )
     
     with patch("translator.services.telegram_sender.CHANNEL_CONFIGS", TEST_CONFIGS), \
-         patch("requests.Session.post") as mock_post:
+         patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=MagicMock()) as mock_post:
         mock_post.return_value.status_code = 200
         mock_post.return_value.json.return_value = {
             "ok": True,
@@ -43,7 +43,7 @@ async def test_edit_message_network_error():
     
     with patch("translator.services.telegram_sender.CHANNEL_CONFIGS", {
         "test": ChannelConfig(channel_id=123, bot_token="test_token")
-    }), patch("requests.Session.post") as mock_post:
+    }), patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=MagicMock()) as mock_post:
         mock_post.side_effect = Exception("Network timeout")
         
         success = await sender.edit_message(
@@ -70,7 +70,7 @@ async def test_edit_message_rate_limit():
     
     with patch("translator.services.telegram_sender.CHANNEL_CONFIGS", {
         "test": ChannelConfig(channel_id=123, bot_token="test_token")
-    }), patch("requests.Session.post") as mock_post:
+    }), patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=MagicMock()) as mock_post:
         mock_post.return_value.status_code = 429
         mock_post.return_value.json.return_value = {
             "ok": False,
@@ -100,7 +100,7 @@ async def test_send_photo_large_file():
     
     with patch("translator.services.telegram_sender.CHANNEL_CONFIGS", {
         "test": ChannelConfig(channel_id=123, bot_token="test_token")
-    }), patch("requests.Session.post") as mock_post:
+    }), patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=MagicMock()) as mock_post:
         mock_response = MagicMock()
         mock_response.status_code = 400
         mock_response.json.return_value = {
@@ -132,7 +132,7 @@ async def test_send_photo_invalid_format():
     
     with patch("translator.services.telegram_sender.CHANNEL_CONFIGS", {
         "test": ChannelConfig(channel_id=123, bot_token="test_token")
-    }), patch("requests.Session.post") as mock_post:
+    }), patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=MagicMock()) as mock_post:
         mock_response = MagicMock()
         mock_response.status_code = 400
         mock_response.json.return_value = {
@@ -163,7 +163,7 @@ async def test_edit_message_concurrent():
     
     with patch("translator.services.telegram_sender.CHANNEL_CONFIGS", {
         "test": ChannelConfig(channel_id=123, bot_token="test_token")
-    }), patch("requests.Session.post") as mock_post:
+    }), patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=MagicMock()) as mock_post:
         # First edit succeeds
         mock_post.return_value.status_code = 200
         mock_post.return_value.json.return_value = {
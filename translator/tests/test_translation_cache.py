@@ -0,0 +1,37 @@
+from translator.services import translation_cache
+from translator.services.translation_cache import TranslationCache
+
+
+def test_put_get_roundtrip_and_persistence(tmp_path):
+    path = str(tmp_path / "translations.sqlite3")
+    cache = TranslationCache(path)
+    assert cache.get("k") is None
+    cache.put("k", "<b>Hello</b>")
+    assert cache.get("k") == "<b>Hello</b>"
+    cache.close()
+    assert TranslationCache(path).get("k") == "<b>Hello</b>"
+
+
+def test_expired_entries_are_dropped(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(translation_cache.time, "time", lambda: now[0])
+    cache = TranslationCache(str(tmp_path / "t.sqlite3"), ttl_days=1)
+    cache.put("k", "v")
+    now[0] += 86400 + 1
+    assert cache.get("k") is None
+    assert cache.count() == 0
+
+
+def test_evict_keeps_most_recently_used(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(translation_cache.time, "time", lambda: now[0])
+    cache = TranslationCache(str(tmp_path / "t.sqlite3"), max_entries=2)
+    for key in ("a", "b", "c"):
+        now[0] += 1
+        cache.put(key, key.upper())
+    now[0] += 1
+    assert cache.get("a") == "A"  # touch "a" so "b" is the least recently used
+    cache.evict()
+    assert cache.count() == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
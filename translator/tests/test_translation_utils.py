@@ -3,6 +3,13 @@ from unittest.mock import patch
 from types import SimpleNamespace
 from translator.utils import translation_utils
 from translator.utils.translation_utils import translate_html, build_prompt
+from translator.services.translation_cache import TranslationCache
+
+
+@pytest.fixture(autouse=True)
+def no_translation_cache(monkeypatch):
+    # Each test sees the API; caching is tested with its own database below
+    monkeypatch.setattr(translation_utils, "translation_cache", None)
 
 
 def test_build_prompt_short_message():
@@ -31,3 +38,239 @@ async def test_translate_html_makes_api_call():
     payload = {"Html": "hi", "Channel": "x", "Link": "y"}
     result = await translate_html(FakeClient, payload)
     assert result == "translated!"
+
+
+@pytest.mark.asyncio
+async def test_translate_html_awaits_async_client():
+    calls = []
+
+    class FakeMessages:
+        @staticmethod
+        async def create(**kwargs):
+            calls.append(kwargs)
+            return SimpleNamespace(content=[SimpleNamespace(text="<translation>ok</translation>")])
+
+    class FakeClient:
+        messages = FakeMessages
+
+    payload = {"Html": "hi", "Channel": "x", "Link": "y"}
+    assert await translate_html(FakeClient, payload) == "ok"
+    assert calls[0]["model"] == "claude-3-haiku-20240307"
+
+
+@pytest.mark.asyncio
+async def test_translate_html_sync_client_does_not_block_loop():
+    import asyncio
+    import threading
+    release = threading.Event()
+
+    class FakeMessages:
+        @staticmethod
+        def create(**kwargs):
+            release.wait(5)
+            return SimpleNamespace(content=[SimpleNamespace(text="done")])
+
+    class FakeClient:
+        messages = FakeMessages
+
+    payload = {"Html": "hi", "Channel": "x", "Link": "y"}
+    task = asyncio.create_task(translate_html(FakeClient, payload))
+    await asyncio.sleep(0.05)  # the loop keeps running while the call is in flight
+    assert not task.done()
+    release.set()
+    assert await task == "done"
+
+
+def test_translation_key_ignores_whitespace_but_not_prompt_version():
+    key = translation_utils.translation_key("<b>Hi</b>  there\r\n")
+    assert key == translation_utils.translation_key("<b>Hi</b> there")
+    assert key != translation_utils.translation_key("<b>Hi</b> there", prompt_version="other")
+    assert key != translation_utils.translation_key("<b>Hi</b> there!")
+
+
+@pytest.mark.asyncio
+async def test_translate_html_cache_and_single_flight(tmp_path, monkeypatch):
+    import asyncio
+    monkeypatch.setattr(
+        translation_utils, "translation_cache", TranslationCache(str(tmp_path / "t.sqlite3"))
+    )
+    calls = []
+
+    class FakeMessages:
+        @staticmethod
+        async def create(**kwargs):
+            calls.append(kwargs)
+            await asyncio.sleep(0.02)
+            return SimpleNamespace(content=[SimpleNamespace(text="hello")])
+
+    class FakeClient:
+        messages = FakeMessages
+
+    payload = {"Html": "привет", "Channel": "x", "Link": "y"}
+    results = await asyncio.gather(*(translate_html(FakeClient, payload) for _ in range(3)))
+    assert results == ["hello"] * 3
+    assert len(calls) == 1
+    # A later identical request is served from disk
+    assert await translate_html(FakeClient, dict(payload, Html="привет ")) == "hello"
+    assert len(calls) == 1
+
+
+def test_align_paragraphs_requires_same_structure():
+    src = "Раз.\n\nДва.\n \nТри."
+    assert translation_utils.align_paragraphs(src, "One.\n\nTwo.\n\nThree.") == (
+        ["Раз.", "Два.", "Три."],
+        ["One.", "Two.", "Three."],
+    )
+    assert translation_utils.align_paragraphs(src, "<p>One.</p><p>Two.</p><p>Three.</p>") is None
+
+
+@pytest.mark.asyncio
+async def test_retranslate_changed_skips_known_paragraphs(monkeypatch):
+    sent = []
+
+    async def fake_translate(client, paragraph, post_html, usage=None):
+        sent.append(paragraph)
+        return "NEW"
+
+    monkeypatch.setattr(translation_utils, "translate_paragraph", fake_translate)
+    payload = {"Html": "A\n\nB2\n\nC\n\nD", "Channel": "x", "Link": "y"}
+    result = await translation_utils.retranslate_changed(
+        None, payload, ["A", "B", "C", "D"], ["a", "b", "c", "d"]
+    )
+    assert sent == ["B2"]
+    assert result == ("a\n\nNEW\n\nc\n\nd", ["A", "B2", "C", "D"], ["a", "NEW", "c", "d"])
+
+    payload["Html"] = "X\n\nY\n\nC\n\nD"
+    sent.clear()
+    assert await translation_utils.retranslate_changed(
+        None, payload, ["A", "B", "C", "D"], ["a", "b", "c", "d"]
+    ) == ("NEW\n\nNEW\n\nc\n\nd", ["X", "Y", "C", "D"], ["NEW", "NEW", "c", "d"])
+    payload["Html"] = "X\n\nY\n\nZ\n\nD"
+    assert await translation_utils.retranslate_changed(
+        None, payload, ["A", "B", "C", "D"], ["a", "b", "c", "d"]
+    ) is None
+
+
+@pytest.mark.asyncio
+async def test_retranslated_paragraphs_keep_the_post_formatting():
+    requests = []
+
+    class FakeMessages:
+        @staticmethod
+        def create(**kwargs):
+            requests.append(kwargs)
+            # The paragraph prompt asks for the bare paragraph
+            text = "<paragraph>Two, fixed.</paragraph>"
+            return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+    class FakeClient:
+        messages = FakeMessages
+
+    payload = {"Html": "Раз.\n\nДва, исправлено.\n\n#тег", "Channel": "x", "Link": "y"}
+    result = await translation_utils.retranslate_changed(
+        FakeClient, payload, ["Раз.", "Два.", "#тег"], ["<b>One.</b>", "<p>Two.</p>", "#тег"]
+    )
+    assert result[0] == "<b>One.</b>\n\n<p>Two, fixed.</p>\n\n#тег"
+    # Sent with the post as context, not as a post of its own
+    prompt = requests[0]["messages"][0]["content"]
+    assert "<paragraph>\nДва, исправлено.\n</paragraph>" in prompt
+    assert "Раз." in prompt
+    assert "system" not in requests[0]
+
+
+def test_build_request_caches_static_prefix(monkeypatch):
+    monkeypatch.setattr(translation_utils, "PROMPT_PREFIX", "RULES <source>\n")
+    monkeypatch.setattr(translation_utils, "PROMPT_SUFFIX", "\n</source>")
+    monkeypatch.setattr(translation_utils, "PROMPT_CACHED", True)
+    post = " ".join(["слово"] * 20)
+    request = translation_utils.build_request(post, "x", "y")
+    assert request["system"] == [
+        {"type": "text", "text": "RULES <source>\n", "cache_control": {"type": "ephemeral"}}
+    ]
+    assert request["messages"] == [{"role": "user", "content": post + "\n</source>"}]
+    # Short posts keep the plain prompt
+    assert "system" not in translation_utils.build_request("hi", "x", "y")
+    # A prefix below the cacheable minimum is not marked
+    monkeypatch.setattr(translation_utils, "PROMPT_CACHED", False)
+    request = translation_utils.build_request(post, "x", "y")
+    assert request["system"] == [{"type": "text", "text": "RULES <source>\n"}]
+
+
+def test_marked_request_that_was_not_cached_is_recorded():
+    usage = {}
+    marked = {"system": [{"type": "text", "text": "RULES", "cache_control": {"type": "ephemeral"}}]}
+    counts = SimpleNamespace(
+        input_tokens=700, output_tokens=50, cache_creation_input_tokens=0, cache_read_input_tokens=0
+    )
+    translation_utils.add_usage(usage, counts, marked)
+    assert translation_utils.usage_event_fields(usage)["prompt_cache"] == "below_min"
+    # Without a marker there is nothing to report
+    usage = {}
+    translation_utils.add_usage(usage, counts, {"system": [{"type": "text", "text": "RULES"}]})
+    assert translation_utils.usage_event_fields(usage)["prompt_cache"] == ""
+
+
+@pytest.mark.asyncio
+async def test_translate_html_sums_usage():
+    class FakeMessages:
+        @staticmethod
+        async def create(**kwargs):
+            return SimpleNamespace(
+                content=[SimpleNamespace(text="ok")],
+                usage=SimpleNamespace(
+                    input_tokens=12,
+                    output_tokens=5,
+                    cache_creation_input_tokens=0,
+                    cache_read_input_tokens=900,
+                ),
+            )
+
+    class FakeClient:
+        messages = FakeMessages
+
+    usage = {}
+    payload = {"Html": "hi", "Channel": "x", "Link": "y"}
+    await translate_html(FakeClient, payload, usage)
+    await translate_html(FakeClient, payload, usage)
+    assert usage["input_tokens"] == 24
+    fields = translation_utils.usage_event_fields(usage)
+    assert fields["cache_read_tokens"] == 1800
+    assert fields["prompt_cache"] == "hit"
+    assert translation_utils.usage_event_fields({}) == {}
+
+
+@pytest.mark.asyncio
+async def test_stream_translation_yields_growing_text():
+    class FakeStream:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        @property
+        async def text_stream(self):
+            for delta in ("<translation>Hel", "lo\n\nWor", "ld</translation>"):
+                yield delta
+
+        async def get_final_message(self):
+            return SimpleNamespace(usage=SimpleNamespace(input_tokens=3, output_tokens=4))
+
+    class FakeMessages:
+        @staticmethod
+        async def create(**kwargs):
+            raise AssertionError("streaming should not call create")
+
+        @staticmethod
+        def stream(**kwargs):
+            return FakeStream()
+
+    class FakeClient:
+        messages = FakeMessages
+
+    usage = {}
+    payload = {"Html": "Привет\n\nМир", "Channel": "x", "Link": "y"}
+    texts = [t async for t in translation_utils.stream_translation(FakeClient, payload, usage)]
+    assert texts[-1] == "Hello\n\nWorld"
+    assert texts[0] == "Hel"
+    assert usage["output_tokens"] == 4
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from translator.utils import ttl_cache
+from translator.utils.ttl_cache import AsyncTTLCache
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    cache = AsyncTTLCache(60)
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"id": 1}
+
+    results = await asyncio.gather(*(cache.get_or_load(1, load) for _ in range(5)))
+    assert results == [{"id": 1}] * 5
+    assert calls == 1
+    assert await cache.get_or_load(1, load) == {"id": 1}
+    assert calls == 1
+    assert cache.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, "time", lambda: now[0])
+    cache = AsyncTTLCache(10)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    now[0] += 11
+    assert cache.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_failed_load_is_not_cached():
+    cache = AsyncTTLCache(60)
+
+    async def boom():
+        raise RuntimeError("down")
+
+    async def ok():
+        return "ok"
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load("k", boom)
+    assert await cache.get_or_load("k", ok) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_persisted_entries_survive_restart(tmp_path):
+    path = tmp_path / "chat_cache.json"
+    cache = AsyncTTLCache(60, str(path))
+
+    async def load():
+        return {"chat": {"id": -100}}
+
+    await cache.get_or_load(-100, load)
+    warm = AsyncTTLCache(60, str(path))
+    assert warm.get(-100) == {"chat": {"id": -100}}
+
+    # Corrupt files are ignored
+    path.write_text("{not json", encoding="utf-8")
+    assert AsyncTTLCache(60, str(path)).get(-100) is None
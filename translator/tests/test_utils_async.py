@@ -1,7 +1,8 @@
 import pytest
 import asyncio
 
-from translator.utils.utils_async import run_with_retries
+from translator.utils import utils_async
+from translator.utils.utils_async import RetryBudget, RetryPolicy, run_with_retries
 
 
 @pytest.mark.asyncio
@@ -19,3 +20,88 @@ async def test_run_with_retries_failure():
 
     with pytest.raises(ValueError):
         await run_with_retries(failer, 0, attempts=2)
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, message="error", retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        if retry_after is not None:
+            self.retry_after = retry_after
+
+
+def test_policy_classifies_errors():
+    policy = RetryPolicy()
+    assert policy.classify(HTTPError(400)) == (False, None)
+    assert policy.classify(HTTPError(503)) == (True, None)
+    assert policy.classify(HTTPError(429, retry_after=5)) == (True, 5.0)
+    # Telegram puts the flood wait in the description
+    assert policy.classify(HTTPError(429, "Too Many Requests: retry after 7")) == (True, 7.0)
+    assert policy.classify(HTTPError(429, retry_after=600))[0] is False
+    assert policy.classify(asyncio.TimeoutError())[0] is True
+    assert policy.classify(KeyError("x"))[0] is False
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1, max_delay=4)
+    for attempt in range(1, 8):
+        assert 0 <= policy.delay(attempt) <= min(4, 2 ** (attempt - 1))
+    assert policy.delay(3, retry_after=9) == 9
+
+
+@pytest.mark.asyncio
+async def test_permanent_error_is_not_retried():
+    calls = 0
+
+    async def bad_request():
+        nonlocal calls
+        calls += 1
+        raise HTTPError(400)
+
+    with pytest.raises(HTTPError):
+        await run_with_retries(bad_request, attempts=5, delay=0)
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_honoured(monkeypatch):
+    slept = []
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+
+    monkeypatch.setattr(utils_async.asyncio, "sleep", fake_sleep)
+    calls = 0
+
+    async def flooded():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise HTTPError(429, retry_after=3)
+        return "ok"
+
+    budget = RetryBudget(4)
+    assert await run_with_retries(flooded, budget=budget) == "ok"
+    assert slept == [3.0]
+    assert budget.used == 1
+
+
+@pytest.mark.asyncio
+async def test_budget_is_shared_across_calls():
+    budget = RetryBudget(2)
+    calls = 0
+
+    async def flaky():
+        nonlocal calls
+        calls += 1
+        raise HTTPError(503)
+
+    with pytest.raises(HTTPError):
+        await run_with_retries(flaky, attempts=5, delay=0, budget=budget)
+    assert calls == 3
+    assert budget.used == 2
+
+    calls = 0
+    with pytest.raises(HTTPError):
+        await run_with_retries(flaky, attempts=5, delay=0, budget=budget)
+    assert calls == 1
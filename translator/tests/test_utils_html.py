@@ -1,6 +1,6 @@
 import pytest
 from types import SimpleNamespace
-from translator.utils.utils_html import entities_to_html
+from translator.utils.utils_html import entities_to_html, html_safe_prefix
 from pyrogram.enums import MessageEntityType
 
 
@@ -64,3 +64,10 @@ def test_entities_to_html_text_mention():
 def test_entities_to_html_unknown_entity_type():
     ents = [ent(0, 4, "notype")]
     assert entities_to_html("Test", ents) == "Test"
+
+
+def test_html_safe_prefix_only_returns_closed_paragraphs():
+    assert html_safe_prefix("<b>Title</b>\n\n<p>Body goes") == "<b>Title</b>"
+    assert html_safe_prefix("<b>Title</b>\n\n<p>One\n\ntwo") == "<b>Title</b>"
+    assert html_safe_prefix("<b>Title</b>\n\n<p>One</p>\n\n<a href='x") == "<b>Title</b>\n\n<p>One</p>"
+    assert html_safe_prefix("<b>Title still going") == ""
@@ -0,0 +1,108 @@
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+from translator.utils.utils_async import DEFAULT_POLICY
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency that is known to be down."""
+
+
+class CircuitBreaker:
+    """
+    Trips after ``failure_threshold`` consecutive transient failures (as
+    classified by the retry policy; a bad request says nothing about the
+    service). While open, ``call`` fails fast with CircuitOpenError and
+    ``recover`` probes the service with exponential backoff; once a probe
+    succeeds the circuit closes and ``on_close`` is awaited.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        probe_delay: float = 10.0,
+        max_probe_delay: float = 300.0,
+        name: str = "circuit",
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.probe_delay = probe_delay
+        self.max_probe_delay = max_probe_delay
+        self.name = name
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        # Awaited after the circuit closes again (e.g. drain what was held back)
+        self.on_close: Optional[Callable[[], Awaitable[Any]]] = None
+        self._opened = asyncio.Event()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    async def call(self, fn: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        if self.is_open:
+            raise CircuitOpenError(f"{self.name} is unavailable")
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            if DEFAULT_POLICY.classify(e)[0]:
+                self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def record_success(self) -> None:
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold and not self.is_open:
+            self.open()
+
+    def open(self) -> None:
+        self.opened_at = time.monotonic()
+        self._opened.set()
+        logger.warning("%s: circuit opened after %d failures", self.name, self.failures)
+
+    def close(self) -> None:
+        if self.is_open:
+            logger.info(
+                "%s: circuit closed after %.0fs", self.name, time.monotonic() - self.opened_at
+            )
+        self.opened_at = None
+        self.failures = 0
+        self._opened.clear()
+
+    async def wait_open(self, stop_event: asyncio.Event) -> bool:
+        """Wait until the circuit opens; False if ``stop_event`` came first."""
+        opened = asyncio.ensure_future(self._opened.wait())
+        stopped = asyncio.ensure_future(stop_event.wait())
+        await asyncio.wait({opened, stopped}, return_when=asyncio.FIRST_COMPLETED)
+        opened.cancel()
+        stopped.cancel()
+        return self.is_open and not stop_event.is_set()
+
+    async def recover(
+        self, probe: Callable[[], Awaitable[Any]], stop_event: asyncio.Event
+    ) -> bool:
+        """Probe with backoff until ``probe()`` succeeds, then close; False on stop."""
+        delay = self.probe_delay
+        while self.is_open:
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=delay)
+                return False
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await probe()
+            except Exception as e:
+                delay = min(self.max_probe_delay, delay * 2)
+                logger.warning("%s: probe failed, next in %.0fs: %s", self.name, delay, e)
+                continue
+            self.close()
+        if self.on_close is not None:
+            await self.on_close()
+        return True
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+Job = Tuple[Callable[..., Awaitable[Any]], tuple, asyncio.Future]
+
+
+class KeyedExecutor:
+    """
+    Run coroutines concurrently across keys while keeping submission order
+    within a key (e.g. one key per source channel).
+
+    At most ``max_concurrency`` jobs run in total and at most
+    ``per_key_concurrency`` per key. With the default of 1 per key, a job
+    starts only after the previous job for the same key has finished, so
+    results land in submission order; a slow job only delays its own key.
+    """
+
+    def __init__(self, max_concurrency: int = 8, per_key_concurrency: int = 1) -> None:
+        self.max_concurrency = max_concurrency
+        self.per_key_concurrency = per_key_concurrency
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._pending: Dict[Hashable, Deque[Job]] = {}
+        self._active: Dict[Hashable, int] = {}
+        self._tasks: "set[asyncio.Task]" = set()
+
+    def submit(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args: Any) -> asyncio.Future:
+        """Queue ``fn(*args)`` behind earlier jobs for ``key``; returns its future."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(key, deque()).append((fn, args, future))
+        self._pump(key)
+        return future
+
+    async def run(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """Submit and wait for the result."""
+        return await self.submit(key, fn, *args)
+
+    def queued(self, key: Hashable = None) -> int:
+        """Jobs waiting to start, for one key or in total."""
+        if key is not None:
+            return len(self._pending.get(key, ()))
+        return sum(len(q) for q in self._pending.values())
+
+    def _pump(self, key: Hashable) -> None:
+        queue = self._pending.get(key)
+        while queue and self._active.get(key, 0) < self.per_key_concurrency:
+            job = queue.popleft()
+            self._active[key] = self._active.get(key, 0) + 1
+            task = asyncio.create_task(self._run(key, job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if not queue:
+            self._pending.pop(key, None)
+
+    async def _run(self, key: Hashable, job: Job) -> None:
+        fn, args, future = job
+        try:
+            async with self._slots:
+                result = await fn(*args)
+            if not future.done():
+                future.set_result(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            logger.error("KeyedExecutor: job for %s failed: %s", key, e)
+            if not future.done():
+                future.set_exception(e)
+            # Nobody may be awaiting fire-and-forget jobs
+            future.exception()
+        finally:
+            self._active[key] -= 1
+            if not self._active[key]:
+                del self._active[key]
+            self._pump(key)
+
+    async def join(self, timeout: float = None) -> bool:
+        """Wait until every queued and running job is done. False on timeout."""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while self._tasks:
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                return False
+            await asyncio.wait(set(self._tasks), timeout=remaining)
+        return True
@@ -1,5 +1,11 @@
+import hashlib
+import json
+import unicodedata
 from typing import Any, Dict, List, Optional, Tuple
 
+# Entity attributes that change how the post renders
+_ENTITY_FIELDS = ("type", "offset", "length", "url", "language", "custom_emoji_id")
+
 def get_media_info(msg, max_size: int) -> Tuple[Optional[str], Optional[int], str]:
     """Extract file_id, file_size_bytes, media_type from message."""
     file_id = None
@@ -49,3 +55,19 @@ def extract_channel_info(
             dst_id = str(k)
             break
     return src_id, src_name, dst_id, dst_name
+
+
+def _entity_key(entity: Any) -> List[Any]:
+    get = entity.get if isinstance(entity, dict) else (lambda f: getattr(entity, f, None))
+    return [str(get(f)) if f == "type" else get(f) for f in _ENTITY_FIELDS]
+
+
+def message_fingerprint(text: str, entities: Optional[List[Any]]) -> str:
+    """
+    Hash of a source post's normalised text and formatting. Edits that only
+    touch reactions, buttons or media keep the same fingerprint.
+    """
+    normalized = unicodedata.normalize("NFC", text or "").strip()
+    keys = [_entity_key(e) for e in entities or []]
+    raw = json.dumps([normalized, keys], ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
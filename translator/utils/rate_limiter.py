@@ -0,0 +1,109 @@
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    ``rate`` tokens per second up to ``capacity``. ``acquire`` waits (in
+    arrival order) for a token instead of failing, sleeping exactly until the
+    next token is due so throughput stays at the limit.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _get_lock(self) -> asyncio.Lock:
+        # Locks belong to one event loop; the admin app uses a new loop per send
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        return self._lock
+
+    async def acquire(self) -> float:
+        """Take one token; returns the seconds spent waiting."""
+        start = time.monotonic()
+        async with self._get_lock():
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return now - start
+                    wait = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller for ``seconds`` (Telegram's retry_after)."""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class TelegramRateLimiter:
+    """
+    Bot API pacing: one global bucket for the whole bot and one bucket per
+    destination chat, kept separately for sends and edits (both kinds draw
+    from the global one). Callers queue until both the chat and the global
+    bucket allow the request.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        chat_rate: float = 20 / 60,
+        chat_burst: float = 3,
+        edit_chat_rate: float = 20 / 60,
+        edit_chat_burst: float = 3,
+    ) -> None:
+        self.global_rate = global_rate
+        self.limits = {
+            "send": (chat_rate, chat_burst),
+            "edit": (edit_chat_rate, edit_chat_burst),
+        }
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: Dict[Tuple[str, str], TokenBucket] = {}
+
+    def _chat_bucket(self, kind: str, chat_id: Any) -> TokenBucket:
+        key = (kind, str(chat_id))
+        bucket = self._chats.get(key)
+        if bucket is None:
+            rate, burst = self.limits[kind]
+            bucket = self._chats[key] = TokenBucket(rate, burst)
+        return bucket
+
+    async def acquire(self, kind: str, chat_id: Any = None) -> float:
+        """Wait for a ``kind`` ("send"/"edit") slot; returns the seconds waited."""
+        waited = 0.0
+        # Chat first, so a busy chat does not hold global tokens while it waits
+        if chat_id is not None:
+            waited += await self._chat_bucket(kind, chat_id).acquire()
+        waited += await self._global.acquire()
+        if waited > 0.5:
+            logger.info("Rate limit: %s to %s waited %.1fs", kind, chat_id, waited)
+        return waited
+
+    def penalize(self, kind: str, chat_id: Any, retry_after: float) -> None:
+        """Apply a 429 flood wait to the chat (or, without a chat, globally)."""
+        if chat_id is not None:
+            self._chat_bucket(kind, chat_id).pause(retry_after)
+        else:
+            self._global.pause(retry_after)
+        logger.warning("Rate limit: flood wait %ss for %s %s", retry_after, kind, chat_id)
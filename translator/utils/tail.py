@@ -0,0 +1,75 @@
+"""
+Tail reading for append-only line files (event segments, bot.log).
+
+``tail_lines`` memory-maps the file and scans backwards for newlines, so
+the cost is proportional to the returned lines, not the file size.
+``read_since`` continues from a byte offset returned by an earlier call,
+which lets the admin UI poll for new lines only.
+"""
+
+import os
+import mmap
+from typing import List, Tuple
+
+
+def _map(f) -> mmap.mmap:
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def tail_lines(path: str, n: int) -> Tuple[List[bytes], int]:
+    """
+    Return the last ``n`` complete lines (without newlines, oldest first) and
+    the offset just after the last complete line, to be used with
+    ``read_since``. A trailing line without a newline is still being
+    written (or was torn) and is not returned.
+    """
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return [], 0
+    if size == 0:
+        return [], 0
+    with open(path, "rb") as f, _map(f) as mm:
+        end = mm.rfind(b"\n") + 1  # 0 when there is no complete line
+        lines: List[bytes] = []
+        pos = end - 1
+        while pos >= 0 and len(lines) < n:
+            start = mm.rfind(b"\n", 0, pos) + 1
+            lines.append(mm[start:pos])
+            pos = start - 1
+        lines.reverse()
+        return lines, end
+
+
+def read_since(path: str, offset: int, max_lines: int = 0) -> Tuple[List[bytes], int]:
+    """
+    Complete lines appended after ``offset`` and the new offset. If the file
+    shrank (cleared or rotated) reading restarts from the beginning.
+    ``max_lines`` > 0 caps the result to the newest lines.
+    """
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return [], 0
+    if offset > size:
+        offset = 0
+    if offset == size:
+        return [], offset
+    with open(path, "rb") as f, _map(f) as mm:
+        end = mm.rfind(b"\n", offset) + 1
+        if end <= offset:
+            return [], offset
+        lines = mm[offset:end - 1].split(b"\n")
+    if max_lines > 0:
+        lines = lines[-max_lines:]
+    return lines, end
+
+
+def tail_text(path: str, n: int) -> Tuple[List[str], int]:
+    lines, end = tail_lines(path, n)
+    return [line.decode("utf-8", errors="replace") for line in lines], end
+
+
+def read_text_since(path: str, offset: int, max_lines: int = 0) -> Tuple[List[str], int]:
+    lines, end = read_since(path, offset, max_lines)
+    return [line.decode("utf-8", errors="replace") for line in lines], end
@@ -1,10 +1,68 @@
-from typing import Any, Dict
-from anthropic import Anthropic
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+from anthropic import Anthropic, AsyncAnthropic
+import asyncio
+import hashlib
+import inspect
 import logging
 import re
-from translator.config import  load_prompt_template
+from translator.config import (
+    load_prompt_template,
+    TRANSLATION_CACHE_PATH,
+    TRANSLATION_CACHE_MAX_ENTRIES,
+    TRANSLATION_CACHE_TTL_DAYS,
+)
+from translator.services.translation_cache import TranslationCache
 
+MODEL = "claude-3-haiku-20240307"
 PROMPT_TEMPLATE = load_prompt_template()
+# Changes whenever the template does, so old translations are not reused
+PROMPT_VERSION = hashlib.sha256(PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:16]
+# Everything before {message_text} is identical for every post and is sent as
+# a cached system prompt; only the post and the closing tags vary
+PROMPT_PREFIX, _, PROMPT_SUFFIX = PROMPT_TEMPLATE.partition("{message_text}")
+# Anthropic caches a prefix only from this many tokens on (Claude 3 Haiku);
+# a shorter one is sent without a cache marker, which would only be ignored
+PROMPT_CACHE_MIN_TOKENS = 2048
+# Rough estimate, low for Cyrillic, so a borderline prefix is not marked
+PROMPT_CACHED = len(PROMPT_PREFIX) // 4 >= PROMPT_CACHE_MIN_TOKENS
+# Anthropic usage counters summed per message
+USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
+
+# Shared by the bot and the admin app; None disables caching
+translation_cache: Optional[TranslationCache] = (
+    TranslationCache(
+        TRANSLATION_CACHE_PATH, TRANSLATION_CACHE_MAX_ENTRIES, TRANSLATION_CACHE_TTL_DAYS
+    )
+    if TRANSLATION_CACHE_MAX_ENTRIES > 0
+    else None
+)
+# Cache key -> future of the translation currently being requested
+_inflight: Dict[str, asyncio.Future] = {}
+# Edits changing more than this share of paragraphs are translated whole
+INCREMENTAL_MAX_CHANGED = 0.5
+# Edited paragraphs are translated on their own, with the post as context;
+# the full-post rules (bold first sentence, blank line after it, <p> marks)
+# would format every one of them as the lead of a new post
+PARAGRAPH_PROMPT = """Translate one paragraph of the Telegram post below from Russian to
+English literally. The whole post is only context: translate nothing but the text inside
+<paragraph>.
+Output the translated paragraph alone. Do not add bold, paragraph tags or blank lines;
+keep its HTML tags, link URLs, hashtags, emoji and punctuation unchanged.
+
+<post>
+{post}
+</post>
+
+<paragraph>
+{paragraph}
+</paragraph>"""
+# Outer tag the full-post prompt puts around a paragraph
+_WRAPPER = re.compile(r"^<(p|b)>(.*)</\1>$", re.S)
 
 def build_prompt(html_text: str, channel: str, link: str) -> str:
     """Build translation prompt for the LLM."""
@@ -17,17 +75,256 @@ def build_prompt(html_text: str, channel: str, link: str) -> str:
     body = html_text if short else PROMPT_TEMPLATE.format(message_text=html_text)
     return f"{intro}\n\n{body}".strip()
 
-async def translate_html(client: Anthropic, payload: Dict[str, Any]) -> str:
-    """Send payload to Anthropic and return translated text."""
-    prompt = build_prompt(payload["Html"], payload["Channel"], payload["Link"])
-    # logging.info(f"Generated prompt: {prompt}")
-    resp = client.messages.create(
-        model="claude-3-haiku-20240307",
-        max_tokens=1500,
-        temperature=0,
-        messages=[{"role": "user", "content": prompt}],
+def build_request(html_text: str, channel: str, link: str) -> Dict[str, Any]:
+    """
+    Messages API arguments; long posts get the template as a system block,
+    marked for prompt caching when it is long enough to be cached.
+    """
+    request: Dict[str, Any] = dict(model=MODEL, max_tokens=1500, temperature=0)
+    short = len(html_text.split()) < 7 or len(html_text) < 20
+    if short or not PROMPT_PREFIX.strip():
+        prompt = build_prompt(html_text, channel, link)
+        request["messages"] = [{"role": "user", "content": prompt}]
+        return request
+    system: Dict[str, Any] = {"type": "text", "text": PROMPT_PREFIX}
+    if PROMPT_CACHED:
+        system["cache_control"] = {"type": "ephemeral"}
+    request["system"] = [system]
+    request["messages"] = [{"role": "user", "content": f"{html_text}{PROMPT_SUFFIX}".strip()}]
+    return request
+
+
+def add_usage(
+    usage: Optional[Dict[str, int]], resp_usage: Any, request: Optional[Dict[str, Any]] = None
+) -> None:
+    """Add the token counts of one response to ``usage``, and whether its request was marked."""
+    if usage is None or resp_usage is None:
+        return
+    if request is not None and any("cache_control" in b for b in request.get("system", ())):
+        usage["cache_marked"] = usage.get("cache_marked", 0) + 1
+    for field in USAGE_FIELDS:
+        usage[field] = usage.get(field, 0) + (getattr(resp_usage, field, 0) or 0)
+
+
+def usage_event_fields(usage: Dict[str, int]) -> Dict[str, Any]:
+    """MessageEvent fields for the summed usage of one message."""
+    if not usage:
+        return {}
+    read = usage.get("cache_read_input_tokens", 0)
+    written = usage.get("cache_creation_input_tokens", 0)
+    return dict(
+        input_tokens=usage.get("input_tokens", 0),
+        output_tokens=usage.get("output_tokens", 0),
+        cache_read_tokens=read,
+        cache_write_tokens=written,
+        prompt_cache=(
+            "hit" if read
+            else "miss" if written
+            # Marked, but the prefix was too short to be cached
+            else "below_min" if usage.get("cache_marked")
+            else ""
+        ),
     )
+
+
+def normalize_html(html_text: str) -> str:
+    """Whitespace-insensitive form of the HTML, used for cache keys."""
+    text = html_text.replace("\r\n", "\n").replace("\r", "\n")
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r" ?\n ?", "\n", text)
+    return text.strip()
+
+
+def translation_key(html_text: str, model: str = MODEL, prompt_version: str = PROMPT_VERSION) -> str:
+    raw = "\0".join((model, prompt_version, normalize_html(html_text)))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def translate_html(
+    client: Union[AsyncAnthropic, Anthropic],
+    payload: Dict[str, Any],
+    usage: Optional[Dict[str, int]] = None,
+) -> str:
+    """
+    Send payload to Anthropic and return translated text.
+
+    Identical HTML is answered from ``translation_cache``, and concurrent
+    requests for the same HTML share one API call. Token usage of the calls
+    made is added to ``usage`` when given.
+    """
+    cache = translation_cache
+    if cache is None:
+        return await _request_translation(client, payload, usage)
+    key = translation_key(payload["Html"])
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        logging.info("Translation cache hit %s", key[:12])
+        return cached
+    inflight = _inflight.get(key)
+    if inflight is not None:
+        return await asyncio.shield(inflight)
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        translated = await _request_translation(client, payload, usage)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Waiters re-raise it; don't warn when there were none
+        future.exception()
+        raise
+    finally:
+        _inflight.pop(key, None)
+    future.set_result(translated)
+    await asyncio.to_thread(cache.put, key, translated)
+    return translated
+
+
+async def _request_translation(
+    client: Union[AsyncAnthropic, Anthropic],
+    payload: Dict[str, Any],
+    usage: Optional[Dict[str, int]] = None,
+) -> str:
+    """
+    One Anthropic round trip. With an AsyncAnthropic client the request is
+    awaited on the shared connection pool; a synchronous client is run in a
+    worker thread so the event loop is never blocked for the LLM round trip.
+    """
+    request = build_request(payload["Html"], payload["Channel"], payload["Link"])
+    return await _create(client, request, usage)
+
+
+async def _create(
+    client: Union[AsyncAnthropic, Anthropic],
+    request: Dict[str, Any],
+    usage: Optional[Dict[str, int]] = None,
+) -> str:
+    if inspect.iscoroutinefunction(client.messages.create):
+        resp = await client.messages.create(**request)
+    else:
+        resp = await asyncio.to_thread(client.messages.create, **request)
+    add_usage(usage, getattr(resp, "usage", None), request)
+    return clean_translation(resp.content[0].text)
+
+
+async def translate_paragraph(
+    client: Union[AsyncAnthropic, Anthropic],
+    paragraph: str,
+    post_html: str,
+    usage: Optional[Dict[str, int]] = None,
+) -> str:
+    """Translate one paragraph of ``post_html`` as it stands, without post formatting."""
+    request: Dict[str, Any] = dict(model=MODEL, max_tokens=1500, temperature=0)
+    prompt = PARAGRAPH_PROMPT.format(post=post_html, paragraph=paragraph)
+    request["messages"] = [{"role": "user", "content": prompt}]
+    return (await _create(client, request, usage)).strip()
+
+
+async def ping(client: Union[AsyncAnthropic, Anthropic]) -> None:
+    """Smallest possible request; raises while the API is unavailable."""
+    request = {"model": MODEL, "max_tokens": 1, "messages": [{"role": "user", "content": "ping"}]}
+    if inspect.iscoroutinefunction(client.messages.create):
+        await client.messages.create(**request)
+    else:
+        await asyncio.to_thread(client.messages.create, **request)
+
+
+def clean_translation(raw: str) -> str:
     # strip out non-HTML tags like <translation>, <example>, <source>, <user>, <instructions>, <system>
-    raw = resp.content[0].text
-    cleaned = re.sub(r"</?(?:translation|example|source|user|instructions|system)>", "", raw)
-    return cleaned
+    return re.sub(
+        r"</?(?:translation|example|source|user|instructions|system|paragraph)>", "", raw
+    )
+
+
+async def stream_translation(
+    client: Union[AsyncAnthropic, Anthropic],
+    payload: Dict[str, Any],
+    usage: Optional[Dict[str, int]] = None,
+) -> AsyncIterator[str]:
+    """
+    Yield the translation so far, growing as the response streams in; the
+    last value is the full translation. Cached translations and synchronous
+    clients yield the finished text once.
+    """
+    cache = translation_cache
+    key = translation_key(payload["Html"])
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            yield cached
+            return
+    if not inspect.iscoroutinefunction(client.messages.create):
+        yield await translate_html(client, payload, usage)
+        return
+    request = build_request(payload["Html"], payload["Channel"], payload["Link"])
+    raw = ""
+    async with client.messages.stream(**request) as stream:
+        async for delta in stream.text_stream:
+            raw += delta
+            yield clean_translation(raw)
+        final = await stream.get_final_message()
+    add_usage(usage, getattr(final, "usage", None), request)
+    if cache is not None:
+        await asyncio.to_thread(cache.put, key, clean_translation(raw))
+
+
+def split_paragraphs(html_text: str) -> List[str]:
+    """Paragraphs separated by blank lines."""
+    return [p.strip() for p in re.split(r"\n[ \t]*\n", html_text.strip()) if p.strip()]
+
+
+def align_paragraphs(source_html: str, translated: str) -> Optional[Tuple[List[str], List[str]]]:
+    """
+    Pair source paragraphs with translated ones, or None when the translation
+    does not keep the paragraph structure (then edits are translated whole).
+    """
+    sources = split_paragraphs(source_html)
+    translations = split_paragraphs(translated)
+    if not sources or len(sources) != len(translations):
+        return None
+    return sources, translations
+
+
+async def retranslate_changed(
+    client: Union[AsyncAnthropic, Anthropic],
+    payload: Dict[str, Any],
+    previous_sources: List[str],
+    previous_translations: List[str],
+    usage: Optional[Dict[str, int]] = None,
+) -> Optional[Tuple[str, List[str], List[str]]]:
+    """
+    Translate only the paragraphs of an edited post that are not in its
+    previous version and stitch them with the earlier translations.
+
+    Returns (translation, source paragraphs, translated paragraphs), or None
+    when too much changed and a full translation is the better call.
+    """
+    known = dict(zip(previous_sources, previous_translations))
+    sources = split_paragraphs(payload["Html"])
+    changed = list(dict.fromkeys(p for p in sources if p not in known))
+    if not sources or len(changed) > INCREMENTAL_MAX_CHANGED * len(sources):
+        return None
+    results = await asyncio.gather(
+        *(translate_paragraph(client, p, payload["Html"], usage) for p in changed)
+    )
+    fresh = dict(zip(changed, results))
+    translations = [
+        known[p] if p in known else _rewrap(fresh[p], previous_translations, i)
+        for i, p in enumerate(sources)
+    ]
+    logging.info(
+        "Retranslated %d of %d paragraphs", len(changed), len(sources)
+    )
+    return "\n\n".join(translations), sources, translations
+
+
+def _rewrap(translated: str, previous_translations: List[str], index: int) -> str:
+    """Give a retranslated paragraph the outer tag of the one it replaces."""
+    if index >= len(previous_translations) or _WRAPPER.match(translated):
+        return translated
+    wrapper = _WRAPPER.match(previous_translations[index])
+    if not wrapper:
+        return translated
+    return f"<{wrapper.group(1)}>{translated}</{wrapper.group(1)}>"
@@ -0,0 +1,102 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTTLCache:
+    """
+    Small asyncio cache whose entries expire ``ttl`` seconds after loading.
+
+    Concurrent misses for the same key share one load (single-flight), and
+    failed loads are not cached. With ``path`` set, entries are kept in a JSON
+    file so a restart starts warm; values must then be JSON-serializable.
+    """
+
+    def __init__(self, ttl: float, path: Optional[str] = None) -> None:
+        self.ttl = ttl
+        self.path = path
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        if path:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("AsyncTTLCache: ignoring unreadable %s: %s", self.path, e)
+            return
+        now = time.time()
+        self._entries = {
+            key: (expires, value)
+            for key, (expires, value) in data.items()
+            if expires > now
+        }
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except (OSError, TypeError) as e:
+            logger.warning("AsyncTTLCache: cannot persist %s: %s", self.path, e)
+
+    def get(self, key: Any) -> Any:
+        """Cached value or None if missing/expired."""
+        entry = self._entries.get(str(key))
+        if entry and entry[0] > time.time():
+            return entry[1]
+        return None
+
+    def set(self, key: Any, value: Any) -> None:
+        self._entries[str(key)] = (time.time() + self.ttl, value)
+        self._save()
+
+    def invalidate(self, key: Any) -> None:
+        if self._entries.pop(str(key), None) is not None:
+            self._save()
+
+    async def get_or_load(self, key: Any, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached value, or the result of ``loader()`` shared by concurrent callers."""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        key = str(key)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            return await asyncio.shield(inflight)
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; don't warn when there were none
+            future.exception()
+            raise
+        else:
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
@@ -1,15 +1,138 @@
 import asyncio
 import logging
+import random
+import re
+from typing import Any, Optional, Tuple
+
+from translator.config import RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY
 
 logger = logging.getLogger("PYRO")
 
-async def run_with_retries(coro, *args, attempts: int = 3, delay: int = 2):
-    """Retry an async coroutine up to N times with delay."""
-    for i in range(attempts):
+# Statuses worth another attempt: timeouts, conflicts, rate limits, server errors
+RETRYABLE_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+# Errors that will fail the same way every time
+PERMANENT_ERRORS = (ValueError, TypeError, KeyError, AttributeError, NotImplementedError)
+
+_RETRY_AFTER_RE = re.compile(r"retry after (\d+(?:\.\d+)?)", re.IGNORECASE)
+
+
+def _status(exc: BaseException) -> Optional[int]:
+    for attr in ("status_code", "status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    """Server-provided wait: an attribute, a Retry-After header or Telegram's text."""
+    value = getattr(exc, "retry_after", None)
+    if value is None:
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        value = headers.get("retry-after") if hasattr(headers, "get") else None
+    if value is None:
+        match = _RETRY_AFTER_RE.search(str(exc))
+        value = match.group(1) if match else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Decides whether a failure is worth retrying and how long to wait:
+    exponential backoff with full jitter, or the server's retry-after.
+    """
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        max_retry_after: float = 120.0,
+    ) -> None:
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def classify(self, exc: BaseException) -> Tuple[bool, Optional[float]]:
+        """(retryable, retry_after seconds or None)."""
+        retry_after = _retry_after(exc)
+        status = _status(exc)
+        if status is not None:
+            retryable = status in RETRYABLE_STATUSES
+        else:
+            retryable = not isinstance(exc, PERMANENT_ERRORS)
+        if retry_after is not None and retry_after > self.max_retry_after:
+            # Waiting that long would stall the channel; fail instead
+            retryable = False
+        return retryable, retry_after
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Wait before retry number ``attempt`` (1-based)."""
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class RetryBudget:
+    """Retries one message may spend across all of its calls."""
+
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.used = 0
+
+    def take(self) -> bool:
+        if self.used >= self.total:
+            return False
+        self.used += 1
+        return True
+
+
+DEFAULT_POLICY = RetryPolicy(RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY)
+
+
+async def run_with_retries(
+    coro,
+    *args: Any,
+    attempts: Optional[int] = None,
+    delay: Optional[float] = None,
+    policy: Optional[RetryPolicy] = None,
+    budget: Optional[RetryBudget] = None,
+):
+    """
+    Call ``coro(*args)``, retrying failures the policy classifies as
+    transient. ``attempts``/``delay`` override the policy's attempt count and
+    base delay; ``budget`` caps retries across all calls for one message and
+    counts them.
+    """
+    policy = policy or DEFAULT_POLICY
+    if attempts is not None or delay is not None:
+        policy = RetryPolicy(
+            attempts or policy.attempts,
+            policy.base_delay if delay is None else delay,
+            policy.max_delay,
+            policy.max_retry_after,
+        )
+    name = getattr(coro, "__name__", repr(coro))
+    for i in range(1, policy.attempts + 1):
         try:
             return await coro(*args)
         except Exception as e:
-            logger.warning("Retry attempt %s for %s: %s", i + 1, coro.__name__, e)
-            if i == attempts - 1:
+            retryable, retry_after = policy.classify(e)
+            if (
+                not retryable
+                or i == policy.attempts
+                or (budget is not None and not budget.take())
+            ):
+                logger.warning(
+                    "Giving up on %s after %d attempt(s)%s: %s",
+                    name, i, "" if retryable else " (not retryable)", e,
+                )
                 raise
-            await asyncio.sleep(delay)
+            wait = policy.delay(i, retry_after)
+            logger.warning("Retry attempt %s for %s in %.1fs: %s", i, name, wait, e)
+            await asyncio.sleep(wait)
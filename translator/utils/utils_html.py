@@ -1,4 +1,5 @@
 import html
+import re
 from typing import Any, List, Optional
 from pyrogram.enums import MessageEntityType
 
@@ -38,3 +39,37 @@ def entities_to_html(text: str, entities: Optional[List[Any]]) -> str:
         escaped = before + open_tag + middle + close_tag + after
 
     return escaped
+
+
+_TAG_RE = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9-]*)[^<>]*?(/?)>")
+
+
+def _tags_balanced(text: str) -> bool:
+    if text.rfind("<") > text.rfind(">"):
+        return False  # a tag is still being written
+    stack: List[str] = []
+    for closing, name, self_closing in _TAG_RE.findall(text):
+        name = name.lower()
+        if self_closing or name == "br":
+            continue
+        if not closing:
+            stack.append(name)
+        elif stack and stack[-1] == name:
+            stack.pop()
+        else:
+            return False
+    return not stack
+
+
+def html_safe_prefix(text: str) -> str:
+    """
+    Longest run of complete paragraphs of a partial HTML text whose tags are
+    all closed, or "" if there is none yet. Safe to publish mid-stream.
+    """
+    end = text.rfind("\n\n")
+    while end > 0:
+        candidate = text[:end].rstrip()
+        if candidate and _tags_balanced(candidate):
+            return candidate
+        end = text.rfind("\n\n", 0, end)
+    return ""